@@ -0,0 +1,288 @@
+"""
+Local BankMOCK stand-in for offline runs and benchmarks
+
+Serves the subset of the BankMOCK API the tools use, under /api/v1:
+  - GET  /balance
+  - GET  /account
+  - GET  /transactions?limit=&page=
+  - GET  /statement?startDate=&endDate=
+  - GET  /cheque/{number}          – 404 unless the number has 6+ digits
+  - POST /generate-otp             – returns the OTP (demo mode)
+  - POST /transfer                 – debits the balance by "amount"
+
+Each customer gets a deterministic account and transaction history seeded
+from the X-Customer-ID header, so repeated runs see the same data.
+
+Latency and failures can be injected per request:
+  - latency_ms / jitter_ms         – base delay and uniform jitter
+  - endpoint_latency_ms            – per-endpoint base delay, e.g. {"/transactions": 120}
+  - error_rate / error_status      – fraction of requests answered with error_status (default 503)
+  - stall_rate / stall_ms          – fraction of requests held for stall_ms, to trip client timeouts
+
+Run standalone and point the tools at it:
+    python bench/bankmock_emulator.py --port 8787 --latency-ms 40 --error-rate 0.01
+    BANKMOCK_BASE=http://127.0.0.1:8787/api/v1
+
+Or embed it:
+    with BankMockEmulator(EmulatorConfig(latency_ms=20)) as emu:
+        os.environ["BANKMOCK_BASE"] = emu.base_url
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import threading
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiohttp import web
+
+API_PREFIX = "/api/v1"
+TRANSACTIONS_PER_CUSTOMER = 240
+HISTORY_DAYS = 180
+DESCRIPTIONS = (
+    ("Salary", "CREDIT", 45000, 90000),
+    ("Grocery Store", "DEBIT", 300, 4000),
+    ("Electricity Bill", "DEBIT", 800, 3500),
+    ("Restaurant", "DEBIT", 250, 2500),
+    ("Fuel", "DEBIT", 500, 3000),
+    ("Online Shopping", "DEBIT", 400, 12000),
+    ("UPI Transfer", "DEBIT", 100, 5000),
+    ("Refund", "CREDIT", 100, 3000),
+    ("Interest Credit", "CREDIT", 50, 800),
+)
+
+
+@dataclass
+class EmulatorConfig:
+    host: str = "127.0.0.1"
+    port: int = 0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    endpoint_latency_ms: dict = field(default_factory=dict)
+    error_rate: float = 0.0
+    error_status: int = 503
+    stall_rate: float = 0.0
+    stall_ms: float = 30000.0
+    seed: int = 7
+
+
+class _Customer:
+    """Deterministic account state for one customer id."""
+
+    def __init__(self, customer_id: str, seed: int):
+        rng = random.Random(zlib.crc32(customer_id.encode()) ^ seed)
+        self.lock = threading.Lock()
+        self.account_number = f"SB{rng.randrange(10 ** 9, 10 ** 10)}"
+        self.balance = round(rng.uniform(5000, 250000), 2)
+        self.account_type = rng.choice(("Savings", "Current"))
+        today = datetime.date.today()
+        txns = []
+        for i in range(TRANSACTIONS_PER_CUSTOMER):
+            description, kind, low, high = rng.choice(DESCRIPTIONS)
+            day = today - datetime.timedelta(days=rng.randrange(HISTORY_DAYS))
+            txns.append({
+                "transactionId": f"TXN{zlib.crc32(customer_id.encode()):08X}{i:05d}",
+                "type": kind,
+                "amount": round(rng.uniform(low, high), 2),
+                "description": description,
+                "timestamp": f"{day.isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00Z",
+            })
+        txns.sort(key=lambda t: t["timestamp"], reverse=True)
+        self.transactions = txns
+
+    def account(self) -> dict:
+        return {
+            "accountNumber": self.account_number,
+            "accountType": self.account_type,
+            "branch": "SwiftBank Main Branch",
+            "ifsc": "SWFT0000001",
+            "accountStatus": "Active",
+        }
+
+
+class BankMockEmulator:
+    """aiohttp server on a background thread that mimics the BankMOCK API."""
+
+    def __init__(self, config: Optional[EmulatorConfig] = None):
+        self.config = config or EmulatorConfig()
+        self.requests = Counter()
+        self.injected = Counter()
+        self._customers: dict = {}
+        self._customers_lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self.port: Optional[int] = None
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.config.host}:{self.port}{API_PREFIX}"
+
+    def start(self) -> str:
+        """Start serving and return the base URL to use as BANKMOCK_BASE."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="bankmock-emulator", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(10)
+        return self.base_url
+
+    async def _start(self) -> None:
+        app = web.Application(middlewares=[self._inject])
+        app.add_routes([
+            web.get(f"{API_PREFIX}/balance", self._balance),
+            web.get(f"{API_PREFIX}/account", self._account),
+            web.get(f"{API_PREFIX}/transactions", self._transactions),
+            web.get(f"{API_PREFIX}/statement", self._statement),
+            web.get(f"{API_PREFIX}/cheque/{{number}}", self._cheque),
+            web.post(f"{API_PREFIX}/generate-otp", self._generate_otp),
+            web.post(f"{API_PREFIX}/transfer", self._transfer),
+        ])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.host, self.config.port, backlog=1024)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop = None
+
+    def __enter__(self) -> "BankMockEmulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests), "injected": dict(self.injected)}
+
+    # ── latency and error injection ──────────────────────────────────────────
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        endpoint = "/" + request.path[len(API_PREFIX):].lstrip("/").split("/", 1)[0]
+        self.requests[endpoint] += 1
+        cfg = self.config
+        delay = cfg.endpoint_latency_ms.get(endpoint, cfg.latency_ms)
+        if cfg.jitter_ms:
+            delay += self._rng.uniform(0, cfg.jitter_ms)
+        if cfg.stall_rate and self._rng.random() < cfg.stall_rate:
+            self.injected["stall"] += 1
+            delay = cfg.stall_ms
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if cfg.error_rate and self._rng.random() < cfg.error_rate:
+            self.injected[str(cfg.error_status)] += 1
+            return web.json_response({"success": False, "message": "Injected failure"}, status=cfg.error_status)
+        return await handler(request)
+
+    # ── handlers ─────────────────────────────────────────────────────────────
+    def _customer(self, request: web.Request) -> _Customer:
+        customer_id = request.headers.get("X-Customer-ID", "anonymous")
+        customer = self._customers.get(customer_id)
+        if customer is None:
+            with self._customers_lock:
+                customer = self._customers.setdefault(customer_id, _Customer(customer_id, self.config.seed))
+        return customer
+
+    @staticmethod
+    def _ok(data) -> web.Response:
+        return web.json_response({"success": True, "data": data})
+
+    async def _balance(self, request: web.Request) -> web.Response:
+        c = self._customer(request)
+        return self._ok({"accountNumber": c.account_number, "balance": c.balance, "currency": "INR"})
+
+    async def _account(self, request: web.Request) -> web.Response:
+        return self._ok(self._customer(request).account())
+
+    async def _transactions(self, request: web.Request) -> web.Response:
+        c = self._customer(request)
+        try:
+            limit = max(1, min(int(request.query.get("limit", 10)), 100))
+            page = max(1, int(request.query.get("page", 1)))
+        except ValueError:
+            return web.json_response({"success": False, "message": "Invalid limit or page"}, status=400)
+        start = (page - 1) * limit
+        txns = c.transactions[start:start + limit]
+        return self._ok({
+            "transactions": txns,
+            "pagination": {"page": page, "limit": limit, "total": len(c.transactions),
+                           "hasMore": start + limit < len(c.transactions)},
+        })
+
+    async def _statement(self, request: web.Request) -> web.Response:
+        c = self._customer(request)
+        lo = request.query.get("startDate", "")[:10]
+        hi = request.query.get("endDate", "9999-12-31")[:10]
+        txns = [t for t in c.transactions if lo <= t["timestamp"][:10] <= hi]
+        return self._ok({"transactions": txns, "startDate": lo, "endDate": hi})
+
+    async def _cheque(self, request: web.Request) -> web.Response:
+        number = request.match_info["number"]
+        if not (number.isdigit() and len(number) >= 6):
+            return web.json_response({"success": False, "message": "Cheque not found"}, status=404)
+        rng = random.Random(zlib.crc32(number.encode()))
+        deposited = datetime.date.today() - datetime.timedelta(days=rng.randrange(5))
+        return self._ok({
+            "chequeNumber": number,
+            "amount": round(rng.uniform(1000, 50000), 2),
+            "status": rng.choice(("Processing", "Cleared", "Pending")),
+            "expectedClearanceDate": (deposited + datetime.timedelta(days=2)).isoformat(),
+        })
+
+    async def _generate_otp(self, request: web.Request) -> web.Response:
+        await request.read()
+        return self._ok({"otp": f"{self._rng.randrange(100000, 1000000)}", "expiresIn": "5 minutes"})
+
+    async def _transfer(self, request: web.Request) -> web.Response:
+        c = self._customer(request)
+        try:
+            body = await request.json()
+            amount = float(body.get("amount") or 0)
+        except (ValueError, AttributeError):
+            return web.json_response({"success": False, "message": "Invalid body"}, status=400)
+        with c.lock:
+            if amount > c.balance:
+                return web.json_response({"success": False, "message": "Insufficient balance"}, status=400)
+            c.balance = round(c.balance - amount, 2)
+            balance = c.balance
+        return self._ok({"status": "COMPLETED", "amount": amount, "balance": balance})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local BankMOCK stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-ms", type=float, default=30000.0)
+    args = parser.parse_args()
+
+    emulator = BankMockEmulator(EmulatorConfig(
+        host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, error_status=args.error_status,
+        stall_rate=args.stall_rate, stall_ms=args.stall_ms,
+    ))
+    print(f"BankMOCK emulator listening – set BANKMOCK_BASE={emulator.start()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
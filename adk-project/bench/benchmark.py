@@ -0,0 +1,176 @@
+"""
+Load benchmark for the SwiftBank tool layer
+
+Starts the local BankMOCK emulator (or uses --base-url), points the tools at
+it through BANKMOCK_BASE, then drives each tool from N concurrent sessions.
+A session is one thread acting for one customer and calling the tool back to
+back, the way concurrent conversations hit a tool-server worker.
+
+For every (tool, sessions) pair it reports p50/p99 latency, calls/sec, error
+replies and the number of upstream requests the emulator served.
+
+    cd adk-project
+    python bench/benchmark.py --sessions 1,10,50 --calls 20 --latency-ms 30
+    python bench/benchmark.py --tools get_account_balance,get_account_snapshot --json
+
+Tools are imported after BANKMOCK_BASE is set, so the BANKMOCK_* variables
+in the environment apply as usual (--no-cache sets BANKMOCK_CACHE_TTL=0).
+Rate limits (rate_limiter.py) are off unless --rate-limit is given, since
+sessions call back to back far faster than a customer would.
+Tool state goes to a throwaway SWIFTBANK_DATA_DIR unless one is already set.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "tools"))
+
+from bankmock_emulator import BankMockEmulator, EmulatorConfig  # noqa: E402
+
+
+def _unlock_with_otp(tool, customer_id: str, i: int) -> str:
+    """unlock_atm_card checks for a verified OTP itself, so verify one first, as OTP_Agent would."""
+    import otp_store
+
+    store = otp_store.get_store()
+    store.issue(customer_id, "000000", "CARD_UNLOCK")
+    store.verify(customer_id, "000000")
+    return tool(customer_id)
+
+
+# Tool name → (module, call(tool, customer_id, i))
+SCENARIOS = {
+    "get_account_balance": ("banking_info_tools", lambda t, cid, i: t(cid)),
+    "get_recent_transactions": ("banking_info_tools", lambda t, cid, i: t(cid, 5)),
+    "get_account_details": ("banking_info_tools", lambda t, cid, i: t(cid)),
+    "get_cheque_status": ("banking_info_tools", lambda t, cid, i: t(cid, f"{100000 + i % 50}")),
+    "get_account_snapshot": ("banking_info_tools", lambda t, cid, i: t(cid, 5)),
+    "get_transaction_history": ("banking_info_tools", lambda t, cid, i: t(cid)),
+    "summarize_transactions": ("banking_info_tools", lambda t, cid, i: t(cid)),
+    "get_card_status": ("card_tools", lambda t, cid, i: t(cid)),
+    "unlock_atm_card": ("card_tools", _unlock_with_otp),
+    "generate_otp": ("otp_tools", lambda t, cid, i: t(cid)),
+}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name: str, sessions: int, calls: int, emulator: Optional[BankMockEmulator] = None) -> dict:
+    """Drive one tool from `sessions` threads, `calls` calls each, and summarise the latencies."""
+    import metrics
+
+    module, call = SCENARIOS[name]
+    tool = getattr(importlib.import_module(module), name)
+    latencies: list = []
+    errors = 0
+    lock = threading.Lock()
+    upstream_before = sum(emulator.requests.values()) if emulator else 0
+
+    def session(s: int) -> None:
+        nonlocal errors
+        customer_id = f"BENCH{s:04d}"
+        local, failed = [], 0
+        for i in range(calls):
+            start = time.perf_counter()
+            try:
+                reply = call(tool, customer_id, i)
+                failed += isinstance(reply, str) and reply.startswith(metrics.ERROR_REPLY_PREFIXES)
+            except Exception:
+                failed += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    return {
+        "tool": name,
+        "sessions": sessions,
+        "calls": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "calls_per_sec": round(len(latencies) / wall, 1) if wall else 0.0,
+        "errors": errors,
+        "upstream_requests": sum(emulator.requests.values()) - upstream_before if emulator else None,
+    }
+
+
+def _print_table(results: list) -> None:
+    emulator_used = all(r["upstream_requests"] is not None for r in results)
+    header = f"{'tool':<26}{'sessions':>9}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}{'calls/s':>10}{'errors':>8}{'upstream':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['tool']:<26}{r['sessions']:>9}{r['calls']:>8}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['calls_per_sec']:>10.1f}{r['errors']:>8}{r['upstream_requests'] if emulator_used else '-':>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the SwiftBank tools against a local BankMOCK emulator.")
+    parser.add_argument("--sessions", default="1,10,50", help="comma-separated concurrent session counts")
+    parser.add_argument("--calls", type=int, default=20, help="calls per session")
+    parser.add_argument("--tools", default=",".join(SCENARIOS), help="comma-separated tool names")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="disable the BankMOCK response cache")
+    parser.add_argument("--rate-limit", action="store_true", help="apply the RATE_LIMIT_* limits to the sessions")
+    parser.add_argument("--base-url", help="benchmark an already running BankMOCK instead of the emulator")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    tools = [t.strip() for t in args.tools.split(",") if t.strip()]
+    unknown = [t for t in tools if t not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown tools: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    emulator = None
+    if args.base_url:
+        os.environ["BANKMOCK_BASE"] = args.base_url
+    else:
+        emulator = BankMockEmulator(EmulatorConfig(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        ))
+        os.environ["BANKMOCK_BASE"] = emulator.start()
+    if args.no_cache:
+        os.environ["BANKMOCK_CACHE_TTL"] = "0"
+    if not args.rate_limit:
+        os.environ["RATE_LIMIT"] = "false"
+    os.environ.setdefault("SWIFTBANK_DATA_DIR", tempfile.mkdtemp(prefix="swiftbank-bench-"))
+
+    results = []
+    try:
+        for sessions in (int(n) for n in args.sessions.split(",")):
+            for name in tools:
+                results.append(run_scenario(name, sessions, args.calls, emulator))
+    finally:
+        if emulator is not None:
+            emulator.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Query latency of the agent console case search
+
+Fills a throwaway SQLite case store with --cases synthetic complaint cases
+(types, statuses, banks, branches and cheque numbers drawn at random, spread
+over the last 90 days) and times case_tools.search_cases for typical console
+queries: a rare and a common word, a phrase, a prefix, type/status/date
+filters with and without text, facet-only counts and deep pages. The search
+index is maintained by triggers while the cases are inserted, so the load
+time also shows the write overhead of indexing.
+
+    cd adk-project
+    python bench/case_search_bench.py --cases 1000000 --runs 20
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "tools"))
+
+TYPES = ("CHEQUE_NOT_CREDITED", "MISSING_TRANSACTION", "CARD_ISSUE", "GENERAL_COMPLAINT")
+STATUSES = ("OPEN", "VERIFIED", "CLOSED", "ESCALATED")
+BANKS = ("HDFC", "ICICI", "SBI", "Axis", "Kotak", "Yes Bank", "PNB", "Canara")
+BRANCHES = ("Andheri", "Bandra", "Powai", "Koramangala", "Whitefield", "Connaught Place", "Salt Lake", "Adyar")
+DESCRIPTIONS = {
+    "CHEQUE_NOT_CREDITED": "Cheque from {bank} deposited at {branch} branch not credited after {days} days",
+    "MISSING_TRANSACTION": "{bank} transfer of Rs {amount} missing from statement",
+    "CARD_ISSUE": "ATM card declined at {bank} ATM near {branch}",
+    "GENERAL_COMPLAINT": "Long queue and unhelpful staff at {branch} branch",
+}
+RESOLUTIONS = ("Credited after clearing confirmation", "Reversal processed", "Card reissued", None)
+
+QUERIES = {
+    "all (counts only)": {},
+    "status=ESCALATED": {"status": "ESCALATED"},
+    "type + last week": {"complaint_type": "CHEQUE_NOT_CREDITED", "newer_than_hours": 7 * 24},
+    "rare word": {"text": "Canara Adyar"},
+    "common word": {"text": "cheque"},
+    "console example": {"text": "HDFC", "complaint_type": "CHEQUE_NOT_CREDITED", "newer_than_hours": 7 * 24},
+    "phrase": {"text": '"not credited" ICICI'},
+    "prefix": {"text": "Korama*"},
+    "cheque number": {"text": "{cheque}"},
+    "relevance": {"text": "HDFC Powai", "order": "relevance"},
+    "page 50": {"text": "SBI", "page": 50},
+}
+
+
+def generate(count: int, seed: int):
+    rng = random.Random(seed)
+    now = datetime.datetime.utcnow()
+    for i in range(count):
+        case_type = rng.choice(TYPES)
+        created = now - datetime.timedelta(seconds=rng.randrange(90 * 24 * 3600))
+        status = rng.choices(STATUSES, weights=(2, 1, 6, 1))[0]
+        yield {
+            "caseId": f"CASE-{i:09d}",
+            "customerId": f"CUST{rng.randrange(count // 4 + 1):07d}",
+            "customerName": "Bench Customer",
+            "type": case_type,
+            "description": DESCRIPTIONS[case_type].format(
+                bank=rng.choice(BANKS), branch=rng.choice(BRANCHES), days=rng.randrange(2, 15),
+                amount=rng.randrange(500, 90000),
+            ),
+            "chequeNumber": f"{rng.randrange(10 ** 6):06d}" if case_type == "CHEQUE_NOT_CREDITED" else None,
+            "status": status,
+            "resolution": rng.choice(RESOLUTIONS) if status == "CLOSED" else None,
+            "assignedAgent": None,
+            "createdAt": created.isoformat() + "Z",
+            "updatedAt": created.isoformat() + "Z",
+        }
+
+
+def load(repo, count: int, seed: int, batch: int = 10000) -> float:
+    from case_repository import CASE_FIELDS
+    from storage import transaction
+
+    conn = repo._db.get()
+    sql = f"INSERT INTO cases ({', '.join(CASE_FIELDS)}) VALUES ({', '.join('?' * len(CASE_FIELDS))})"
+    rows = []
+    start = time.perf_counter()
+    for case in generate(count, seed):
+        rows.append(tuple(case[f] for f in CASE_FIELDS))
+        if len(rows) == batch:
+            with transaction(conn):
+                conn.executemany(sql, rows)
+            rows = []
+    if rows:
+        with transaction(conn):
+            conn.executemany(sql, rows)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time agent console case searches over synthetic cases.")
+    parser.add_argument("--cases", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    os.environ["SWIFTBANK_DATA_DIR"] = tempfile.mkdtemp(prefix="swiftbank-search-")
+    os.environ["CASE_STORE"] = "sqlite"
+    import case_tools
+    from case_repository import get_repository
+
+    repo = get_repository()
+    load_seconds = load(repo, args.cases, args.seed)
+    cheque = repo._db.get().execute(
+        "SELECT chequeNumber FROM cases WHERE chequeNumber IS NOT NULL LIMIT 1").fetchone()[0]
+
+    results = []
+    for name, query in QUERIES.items():
+        query = {k: v.format(cheque=cheque) if isinstance(v, str) else v for k, v in query.items()}
+        case_tools.search_cases(**query)
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = case_tools.search_cases(**query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results.append({
+            "query": name,
+            "total": result["total"],
+            "exact": result["exact"],
+            "p50_ms": round(statistics.median(timings) * 1000, 2),
+            "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 2),
+        })
+
+    if args.json:
+        print(json.dumps({"cases": args.cases, "load_seconds": round(load_seconds, 1), "queries": results}, indent=2))
+        return
+    print(f"{args.cases} cases loaded and indexed in {load_seconds:.1f}s ({args.cases / load_seconds:,.0f} cases/s)\n")
+    print(f"{'query':<22}{'matches':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        matches = f"{r['total']}{'' if r['exact'] else '+'}"
+        print(f"{r['query']:<22}{matches:>10}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    print("\n+ counted up to CASE_SEARCH_COUNT_LIMIT matches")
+
+
+if __name__ == "__main__":
+    main()
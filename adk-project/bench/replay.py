@@ -0,0 +1,396 @@
+"""
+Offline replay of recorded tool traffic
+
+Re-runs a recording made with TRAFFIC_RECORD (see tools/traffic_recorder.py)
+against the tools in this tree. BankMOCK is replaced by a local server that
+answers each request with the body recorded for the same customer, method,
+path and query, as of the recorded call's time. Nothing reaches the real
+BankMOCK.
+
+The replay runs in three steps:
+  1. timed: the calls are started at their recorded offsets, sped up by
+     --speed (0 = back to back), on --concurrency worker threads. Calls of
+     one conversation (of one customer, when the recording has no
+     conversation IDs) still run one after another, in recorded order. Reports
+     per-tool p50/p99 latency next to the recorded latency, calls/s, and how
+     late calls started, waiting for a free worker or for the conversation's
+     previous call.
+  2. regression check: each reply is compared with the recorded one, after
+     masking case IDs, timestamps and OTPs. Replies that depend on local
+     state the recording does not carry (cases, OTPs, idempotency) can
+     differ legitimately; --fail-on-diff makes any change exit non-zero.
+     Case IDs minted by the replay are substituted for the recorded ones in
+     later calls, so a recorded get_complaint_case finds the replayed case.
+  3. --profile DIR: the calls are replayed once more, one at a time, under
+     cProfile. Each call is profiled on its own thread and on the BankMOCK
+     client's event-loop thread, where the async tools do their work.
+     Per-tool stats are written to DIR/<tool>.pstats and the top functions
+     in the tools are printed (--all-functions for everything, including
+     time spent waiting on I/O). Open the files with snakeviz, or turn them
+     into a flame graph with flameprof or gprof2dot.
+
+Local stores (cases, OTPs, idempotency, rate limits) start empty in a
+throwaway data directory; the rate limiter and cheque watcher are off.
+
+    cd adk-project
+    TRAFFIC_RECORD=/var/log/swiftbank/traffic.jsonl ...    # on the tool server
+    python bench/replay.py /var/log/swiftbank/traffic.jsonl --speed 10 --concurrency 16 --profile prof/
+"""
+
+import argparse
+import asyncio
+import cProfile
+import importlib
+import io
+import json
+import os
+import pstats
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from aiohttp import web
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(os.path.dirname(HERE), "tools")
+sys.path.insert(0, TOOLS_DIR)
+
+API_PREFIX = "/api/v1"
+CASE_ID = re.compile(r"CASE-[\w-]+")
+# Recorded statuses for requests that got no response
+NO_RESPONSE_STATUS = {"timeout": 504, "connection_error": 502}
+# Parts of a reply that legitimately change from run to run
+_VOLATILE = (
+    (CASE_ID, "CASE-…"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ][\d:.]+Z?)?"), "<time>"),
+    (re.compile(r"\*\*\d{6}\*\*"), "**<otp>**"),
+)
+
+
+def load(path: str, tools: Optional[set] = None, limit: Optional[int] = None) -> list:
+    """Read a recording, oldest call first. Lines that do not parse (e.g. a torn last line) are skipped."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if tools is None or record.get("tool") in tools:
+                records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+def normalise(reply) -> str:
+    text = reply if isinstance(reply, str) else json.dumps(reply, sort_keys=True, default=str)
+    for pattern, mask in _VOLATILE:
+        text = pattern.sub(mask, text)
+    return text
+
+
+def _request_key(customer_id: str, method: str, path: str, params) -> tuple:
+    query = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None))
+    return customer_id or "", method, "/" + path.lstrip("/").split("?", 1)[0], query
+
+
+class RecordedBankMock:
+    """aiohttp server on a background thread that answers from a recording.
+
+    Each request is answered with the latest response recorded at or before
+    `position` (the recorded time of the call being replayed), or the earliest
+    one when the replay has not reached any yet.
+    """
+
+    def __init__(self, records: list, upstream_latency: bool = False):
+        self.upstream_latency = upstream_latency
+        self.position = records[0]["ts"] if records else 0.0
+        self.served = 0
+        self.missed = Counter()
+        # request key → [(ts, status, body, seconds)], oldest first
+        self._responses = defaultdict(list)
+        for record in records:
+            for x in record.get("upstream") or ():
+                key = _request_key(x.get("customer"), x["method"], x["path"], x.get("params"))
+                self._responses[key].append((record["ts"], x["status"], x.get("body"), x.get("seconds") or 0.0))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def start(self) -> str:
+        """Start serving and return the base URL to use as BANKMOCK_BASE."""
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="recorded-bankmock", daemon=True).start()
+        port = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(10)
+        return f"http://127.0.0.1:{port}{API_PREFIX}"
+
+    async def _start(self) -> int:
+        app = web.Application()
+        app.add_routes([web.route("*", API_PREFIX + "/{tail:.*}", self._answer)])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0, backlog=1024)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+    async def _answer(self, request: web.Request) -> web.Response:
+        path = "/" + request.match_info["tail"]
+        key = _request_key(request.headers.get("X-Customer-ID"), request.method, path, dict(request.query))
+        candidates = self._responses.get(key)
+        if not candidates:
+            self.missed[f"{request.method} /{path.lstrip('/').split('/', 1)[0]}"] += 1
+            return web.json_response({"success": False, "message": "Not in the recording"}, status=404)
+        chosen = candidates[0]
+        for candidate in candidates:
+            if candidate[0] > self.position:
+                break
+            chosen = candidate
+        _, status, body, seconds = chosen
+        self.served += 1
+        if self.upstream_latency and seconds:
+            await asyncio.sleep(seconds)
+        if not isinstance(status, int):
+            status = NO_RESPONSE_STATUS.get(status, 502)
+        return web.Response(status=status, text=body or "", content_type="application/json")
+
+
+class CaseIds:
+    """Recorded case ID → the ID the replay minted for the same case."""
+
+    def __init__(self):
+        self._ids: dict = {}
+
+    def rewrite(self, value):
+        if isinstance(value, str):
+            return CASE_ID.sub(lambda m: self._ids.get(m.group(0), m.group(0)), value)
+        if isinstance(value, list):
+            return [self.rewrite(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self.rewrite(v) for k, v in value.items()}
+        return value
+
+    def learn(self, recorded, replayed) -> None:
+        if not isinstance(recorded, str) or not isinstance(replayed, str):
+            return
+        before, after = CASE_ID.findall(recorded), CASE_ID.findall(replayed)
+        if len(before) == len(after):
+            self._ids.update((b, a) for b, a in zip(before, after) if b != a)
+
+
+def _conversation_of(record: dict) -> str:
+    args, kwargs = record.get("args") or [None], record.get("kwargs") or {}
+    return record.get("conversation") or str(kwargs.get("customer_id") or args[0])
+
+
+def _call(record: dict, case_ids: CaseIds):
+    import traffic_recorder
+
+    fn = getattr(importlib.import_module(record["module"]), record["tool"])
+    args, kwargs = case_ids.rewrite(record.get("args") or []), case_ids.rewrite(record.get("kwargs") or {})
+    with traffic_recorder.conversation(record.get("conversation") or ""):
+        reply = fn(*args, **kwargs)
+    case_ids.learn(record.get("reply"), reply)
+    return reply
+
+
+def run_timed(records: list, server: RecordedBankMock, speed: float, concurrency: int, case_ids: CaseIds) -> dict:
+    """Replay at the recorded pace divided by speed (0 = as fast as possible)."""
+    results = [None] * len(records)
+    # conversation → future of its latest submitted call
+    previous: dict = {}
+
+    def run(i: int, due: float, after) -> None:
+        # The pool is FIFO, so the previous call of the conversation has already started
+        if after is not None:
+            after.exception()
+        started = time.perf_counter()
+        error, reply = None, None
+        try:
+            reply = _call(records[i], case_ids)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        results[i] = (time.perf_counter() - started, reply, error, max(0.0, started - due))
+
+    t0 = time.perf_counter()
+    ts0 = records[0]["ts"]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, record in enumerate(records):
+            if speed > 0:
+                due = t0 + (record["ts"] - ts0) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                due = time.perf_counter()
+            server.position = record["ts"]
+            key = _conversation_of(record)
+            previous[key] = pool.submit(run, i, due, previous.get(key))
+    wall = time.perf_counter() - t0
+    return {"results": results, "wall": wall, "lags": [r[3] for r in results]}
+
+
+async def _toggle(switch) -> None:
+    switch()
+
+
+def run_profiled(records: list, server: RecordedBankMock, case_ids: CaseIds) -> dict:
+    """Replay one call at a time under cProfile. Returns {tool: pstats.Stats}."""
+    import bankmock_client as bankmock
+    import idempotency
+
+    # Start from fresh state, so write tools run for real rather than answering from the timed replay
+    idempotency.set_store(idempotency.MemoryIdempotencyStore())
+    profiles: dict = {}
+    for record in records:
+        server.position = record["ts"]
+        caller, loop = cProfile.Profile(), cProfile.Profile()
+        # The async tools run on the client's event loop thread; profile it for this call too
+        bankmock.run_sync(_toggle(loop.enable))
+        caller.enable()
+        try:
+            _call(record, case_ids)
+        except Exception:
+            pass
+        finally:
+            caller.disable()
+            bankmock.run_sync(_toggle(loop.disable))
+        for profile in (caller, loop):
+            stats = profiles.get(record["tool"])
+            if stats is None:
+                profiles[record["tool"]] = pstats.Stats(profile, stream=io.StringIO())
+            else:
+                stats.add(profile)
+    return profiles
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarise(records: list, timed: dict) -> dict:
+    per_tool: dict = defaultdict(lambda: {"calls": 0, "errors": 0, "changed": 0, "latency": [], "recorded": []})
+    diffs = []
+    for record, (seconds, reply, error, _) in zip(records, timed["results"]):
+        row = per_tool[record["tool"]]
+        row["calls"] += 1
+        row["latency"].append(seconds)
+        row["recorded"].append(record.get("seconds") or 0.0)
+        if error:
+            row["errors"] += 1
+            diffs.append((record, error))
+        elif normalise(reply) != normalise(record.get("reply")):
+            row["changed"] += 1
+            diffs.append((record, reply))
+    tools = {
+        name: {
+            "calls": row["calls"],
+            "errors": row["errors"],
+            "changed": row["changed"],
+            "p50_ms": round(statistics.median(row["latency"]) * 1000, 2),
+            "p99_ms": round(_percentile(row["latency"], 0.99) * 1000, 2),
+            "recorded_p50_ms": round(statistics.median(row["recorded"]) * 1000, 2),
+        }
+        for name, row in sorted(per_tool.items())
+    }
+    return {"tools": tools, "diffs": diffs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded tool traffic against the tools, offline.")
+    parser.add_argument("recording", help="JSONL file written by TRAFFIC_RECORD")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed relative to the recording, e.g. 10; 0 starts calls back to back")
+    parser.add_argument("--concurrency", type=int, default=8, help="worker threads for the timed replay")
+    parser.add_argument("--tools", help="comma-separated tool names to replay (default: all)")
+    parser.add_argument("--limit", type=int, help="replay only the first N calls")
+    parser.add_argument("--upstream-latency", action="store_true",
+                        help="answer each upstream request after its recorded latency")
+    parser.add_argument("--profile", metavar="DIR", help="write per-tool cProfile stats to DIR/<tool>.pstats")
+    parser.add_argument("--top", type=int, default=8, help="functions to print per profiled tool")
+    parser.add_argument("--all-functions", action="store_true",
+                        help="print the top functions of any module, not only the tools'")
+    parser.add_argument("--show-diffs", type=int, default=3, help="changed replies to print")
+    parser.add_argument("--fail-on-diff", action="store_true", help="exit 1 if any reply changed or raised")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    records = load(args.recording, set(args.tools.split(",")) if args.tools else None, args.limit)
+    if not records:
+        parser.error("no recorded calls to replay")
+
+    server = RecordedBankMock(records, args.upstream_latency)
+    os.environ["BANKMOCK_BASE"] = server.start()
+    os.environ["SWIFTBANK_DATA_DIR"] = tempfile.mkdtemp(prefix="swiftbank-replay-")
+    os.environ["RATE_LIMIT"] = "false"
+    os.environ["CHEQUE_WATCHER"] = "false"
+    os.environ.pop("TRAFFIC_RECORD", None)
+    os.environ.pop("SWIFTBANK_WARMUP", None)
+    for module in {r["module"] for r in records}:
+        importlib.import_module(module)
+
+    case_ids = CaseIds()
+    timed = run_timed(records, server, args.speed, max(1, args.concurrency), case_ids)
+    summary = summarise(records, timed)
+    report = {
+        "calls": len(records),
+        "wall_seconds": round(timed["wall"], 3),
+        "calls_per_second": round(len(records) / timed["wall"], 1) if timed["wall"] else None,
+        "recorded_seconds": round(records[-1]["ts"] - records[0]["ts"], 3),
+        "start_lag_p99_ms": round(_percentile(timed["lags"], 0.99) * 1000, 2),
+        "upstream_served": server.served,
+        "upstream_missing": dict(server.missed),
+        "tools": summary["tools"],
+    }
+
+    profiles = run_profiled(records, server, case_ids) if args.profile else {}
+    if profiles:
+        os.makedirs(args.profile, exist_ok=True)
+        for tool, stats in profiles.items():
+            stats.dump_stats(os.path.join(args.profile, f"{tool}.pstats"))
+        report["profiles"] = sorted(os.path.join(args.profile, f"{t}.pstats") for t in profiles)
+    server.stop()
+
+    changed = sum(t["changed"] + t["errors"] for t in summary["tools"].values())
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{len(records)} calls in {report['wall_seconds']}s ({report['calls_per_second']} calls/s); "
+              f"recorded over {report['recorded_seconds']}s; start lag p99 {report['start_lag_p99_ms']} ms")
+        print(f"upstream: {server.served} answered from the recording, "
+              f"{sum(server.missed.values())} not in it {dict(server.missed) or ''}\n")
+        print(f"{'tool':<28}{'calls':>7}{'errors':>8}{'changed':>9}{'p50 ms':>9}{'p99 ms':>9}{'rec p50':>9}")
+        for name, t in summary["tools"].items():
+            print(f"{name:<28}{t['calls']:>7}{t['errors']:>8}{t['changed']:>9}"
+                  f"{t['p50_ms']:>9.2f}{t['p99_ms']:>9.2f}{t['recorded_p50_ms']:>9.2f}")
+        for record, reply in summary["diffs"][:args.show_diffs]:
+            print(f"\n{record['tool']} {record.get('args')} {record.get('kwargs') or ''}")
+            print(f"  recorded: {normalise(record.get('reply'))[:200]!r}")
+            print(f"  replayed: {normalise(reply)[:200]!r}")
+        for tool, stats in sorted(profiles.items()):
+            out = io.StringIO()
+            stats.stream = out
+            restrictions = () if args.all_functions else (re.escape(TOOLS_DIR),)
+            stats.sort_stats("tottime").print_stats(*restrictions, args.top)
+            lines = [line for line in out.getvalue().splitlines() if line.strip()]
+            start = next((i for i, line in enumerate(lines) if line.lstrip().startswith("ncalls")), 0)
+            print(f"\n── {tool} ({os.path.join(args.profile, tool + '.pstats')})")
+            print("\n".join(lines[start:]))
+    sys.exit(1 if args.fail_on_diff and changed else 0)
+
+
+if __name__ == "__main__":
+    main()
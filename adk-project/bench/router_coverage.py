@@ -0,0 +1,155 @@
+"""
+Coverage of the deterministic intent pre-router
+
+Classifies a set of customer messages with tools/intent_router.py (no tool
+is called, no BankMOCK needed) and reports:
+  - each message's decision: the tool it would be dispatched to, or why it
+    falls through to the orchestrator
+  - coverage, the share of messages answered without an LLM turn
+  - classify latency (p50 / p99 microseconds)
+  - estimated LLM time saved, at --llm-turn-seconds per dispatched message
+
+It also checks REQUIRED_MISSES, messages that look like lookups but need an
+agent (fraud, disputes, transfers, account changes). If the router would
+dispatch any of them, they are listed and the script exits 1.
+
+Messages come from --messages (one per line, blank lines and "#" comments
+skipped), e.g. an export of real first turns, or from the built-in sample
+below, which includes the example phrases of the orchestrator's routing
+logic.
+
+    cd adk-project
+    python bench/router_coverage.py --messages first_turns.txt --quiet
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "tools"))
+
+import intent_router  # noqa: E402
+
+SAMPLE = (
+    "What is my balance?",
+    "balance please",
+    "How much money do I have?",
+    "Show me my last 10 transactions",
+    "recent transactions",
+    "What's my account number and IFSC code?",
+    "balance and recent transactions",
+    "What is the status of cheque 123456?",
+    "cheque status",
+    "Has my cheque 456789 cleared?",
+    "My cheque hasn't cleared",
+    "card status",
+    "Block my card",
+    "My ATM card is locked",
+    "Unblock my debit card please",
+    "What is the status of CASE-20250101-AB12C?",
+    "case status",
+    "Show the timeline of case CASE-20250101-AB12C",
+    "I want to raise a complaint",
+    "My cheque was not credited",
+    "There is a wrong charge on my account",
+    "I want to speak to an agent",
+    "How much did I spend last month?",
+    "Can I get my statement for March?",
+    "Hi",
+    "Why is my balance lower than yesterday?",
+    "I deposited a cheque last Monday at the downtown branch and the teller said it would clear in two days",
+)
+
+# Must always fall through to the orchestrator
+REQUIRED_MISSES = (
+    "fraudulent transactions on my account",
+    "unauthorized transactions",
+    "I want to dispute these transactions",
+    "refund transactions",
+    "I was charged twice in my transactions",
+    "transfer balance to savings",
+    "close my account and send balance",
+    "what is the minimum balance required",
+    "change my branch",
+)
+
+
+def load_messages(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def run(messages: list, repeat: int) -> tuple:
+    decisions, timings = [], []
+    for message in messages:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            decision = intent_router.classify(message)
+            samples.append(time.perf_counter() - start)
+        decisions.append(decision)
+        timings.append(statistics.median(samples))
+    return decisions, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report intent pre-router coverage over a set of messages.")
+    parser.add_argument("--messages", help="file with one customer message per line (default: built-in sample)")
+    parser.add_argument("--repeat", type=int, default=200, help="classifications per message for the latency figures")
+    parser.add_argument("--llm-turn-seconds", type=float, default=intent_router.LLM_TURN_SECONDS)
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    messages = load_messages(args.messages) if args.messages else list(SAMPLE)
+    if not messages:
+        parser.error("no messages to classify")
+    decisions, timings = run(messages, args.repeat)
+    leaked = [m for m in REQUIRED_MISSES if intent_router.classify(m).dispatched]
+
+    dispatched = sum(d.dispatched for d in decisions)
+    reasons: dict = {}
+    for d in decisions:
+        if not d.dispatched:
+            reasons[d.reason] = reasons.get(d.reason, 0) + 1
+    micros = sorted(t * 1e6 for t in timings)
+    summary = {
+        "messages": len(messages),
+        "dispatched": dispatched,
+        "coverage": round(dispatched / len(messages), 3),
+        "fallthrough": reasons,
+        "classify_us_p50": round(statistics.median(micros), 1),
+        "classify_us_p99": round(micros[min(len(micros) - 1, int(len(micros) * 0.99))], 1),
+        "llm_seconds_saved": round(dispatched * args.llm_turn_seconds, 1),
+        "required_misses_dispatched": leaked,
+    }
+
+    if args.json:
+        print(json.dumps({
+            "summary": summary,
+            "decisions": [{"message": m, **d._asdict()} for m, d in zip(messages, decisions)],
+        }, indent=2))
+        sys.exit(1 if leaked else 0)
+    if not args.quiet:
+        for message, d in zip(messages, decisions):
+            outcome = f"→ {d.tool.split(':')[1]} {d.arguments or ''}" if d.dispatched else f"LLM ({d.reason}{', ' + d.agent if d.agent else ''})"
+            print(f"{message[:60]:<62}{outcome}")
+        print()
+    print(f"coverage: {dispatched}/{len(messages)} messages dispatched ({summary['coverage']:.0%})")
+    print(f"fall-through: {', '.join(f'{k} {v}' for k, v in sorted(reasons.items())) or 'none'}")
+    print(f"classify: p50 {summary['classify_us_p50']} µs, p99 {summary['classify_us_p99']} µs")
+    print(f"estimated LLM time saved: {summary['llm_seconds_saved']} s ({args.llm_turn_seconds} s per dispatched message)")
+    if leaked:
+        print(f"\nFAIL: {len(leaked)} of {len(REQUIRED_MISSES)} required misses would be dispatched:")
+        for message in leaked:
+            print(f"  {message}")
+        sys.exit(1)
+    print(f"required misses: all {len(REQUIRED_MISSES)} fall through")
+
+
+if __name__ == "__main__":
+    main()
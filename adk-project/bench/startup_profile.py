@@ -0,0 +1,135 @@
+"""
+Startup profile of the SwiftBank tool server
+
+Imports the four tool modules in fresh interpreters, the way a cold tool
+container does, and reports for each configuration:
+  - import time of the tool modules (median over --runs)
+  - warm-up time (warmup.py), when the configuration enables it
+  - latency of the first tool call (get_account_balance) against the local
+    BankMOCK emulator, i.e. what the first customer message waits for
+  - the packages that take longest to import (self time summed over their
+    submodules, from python -X importtime), and whether that happens at
+    import or only on the first call
+
+Configurations: "eager" (default settings), "lazy" (SWIFTBANK_LAZY_IMPORTS
+=true) and "warm" (lazy plus SWIFTBANK_WARMUP=true).
+
+    cd adk-project
+    python bench/startup_profile.py --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(os.path.dirname(HERE), "tools")
+
+from bankmock_emulator import BankMockEmulator, EmulatorConfig  # noqa: E402
+
+TOOL_MODULES = ("banking_info_tools", "card_tools", "case_tools", "otp_tools")
+
+CONFIGURATIONS = {
+    "eager": {},
+    "lazy": {"SWIFTBANK_LAZY_IMPORTS": "true"},
+    "warm": {"SWIFTBANK_LAZY_IMPORTS": "true", "SWIFTBANK_WARMUP": "true"},
+}
+
+# Runs in the child interpreter; prints one JSON line with its timings
+_CHILD = f"""
+import json, time
+start = time.perf_counter()
+import {", ".join(TOOL_MODULES)}
+imported = time.perf_counter()
+import warmup
+first = time.perf_counter()
+banking_info_tools.get_account_balance("STARTUP0001")
+done = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start - sum(warmup._timings.values()),
+    "warmup_s": sum(warmup._timings.values()),
+    "first_call_s": done - first,
+}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Package → import microseconds (self time of all its modules), from -X importtime output."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return packages
+
+
+def run_once(env: dict) -> tuple:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD],
+        cwd=TOOLS_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1]), _parse_importtime(proc.stderr)
+
+
+def profile(name: str, runs: int, base_env: dict) -> dict:
+    env = {**base_env, **CONFIGURATIONS[name]}
+    timings, imports = [], []
+    for _ in range(runs):
+        env["SWIFTBANK_DATA_DIR"] = tempfile.mkdtemp(prefix="swiftbank-startup-")
+        result, modules = run_once(env)
+        timings.append(result)
+        imports.append(modules)
+    slowest = {package: statistics.median(run.get(package, 0) for run in imports) for package in imports[0]}
+    return {
+        "configuration": name,
+        **{key: round(statistics.median(t[key] for t in timings) * 1000, 1)
+           for key in ("import_s", "warmup_s", "first_call_s")},
+        "slowest_packages_ms": {package: round(us / 1000, 1)
+                                for package, us in sorted(slowest.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile cold start of the SwiftBank tool modules.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per configuration")
+    parser.add_argument("--configurations", default=",".join(CONFIGURATIONS), help="comma-separated: eager,lazy,warm")
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.configurations.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CONFIGURATIONS]
+    if unknown:
+        parser.error(f"unknown configurations: {', '.join(unknown)} (choose from {', '.join(CONFIGURATIONS)})")
+
+    emulator = BankMockEmulator(EmulatorConfig(latency_ms=args.latency_ms))
+    base_env = {**os.environ, "BANKMOCK_BASE": emulator.start(),
+                "PYTHONPATH": os.pathsep.join(filter(None, (TOOLS_DIR, os.environ.get("PYTHONPATH"))))}
+    try:
+        results = [profile(name, args.runs, base_env) for name in names]
+    finally:
+        emulator.stop()
+
+    for r in results:
+        r["slowest_packages_ms"] = dict(list(r["slowest_packages_ms"].items())[:args.top])
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'configuration':<15}{'import ms':>11}{'warm-up ms':>12}{'first call ms':>15}")
+    for r in results:
+        print(f"{r['configuration']:<15}{r['import_s']:>11.1f}{r['warmup_s']:>12.1f}{r['first_call_s']:>15.1f}")
+    for r in results:
+        print(f"\nSlowest packages to import ({r['configuration']}, including the first call):")
+        for package, ms in r["slowest_packages_ms"].items():
+            print(f"  {ms:>8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
@@ -60,9 +60,10 @@ function Import-Tool {
     $name = Split-Path $FilePath -Leaf
     Write-Host "  Importing tool: $name" -ForegroundColor White
     if ($DryRun) {
-        Write-Host "    [DRY-RUN] orchestrate tools import -k python -f $FilePath" -ForegroundColor DarkGray
+        Write-Host "    [DRY-RUN] orchestrate tools import -k python -f $FilePath -p tools -r tools\requirements.txt" -ForegroundColor DarkGray
     } else {
-        orchestrate tools import -k python -f $FilePath
+        # -p ships the whole tools/ package so shared modules (bankmock_client.py) are importable
+        orchestrate tools import -k python -f $FilePath -p tools -r tools\requirements.txt
         Write-Host "    [OK] $name imported" -ForegroundColor Green
     }
 }
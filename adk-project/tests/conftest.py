@@ -0,0 +1,38 @@
+"""
+Shared pytest setup: puts tools/ (and bench/, for the BankMOCK emulator) on the
+import path and keeps every store's files in a throwaway data directory, so
+tests never touch a real deployment.
+"""
+
+import dataclasses
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+sys.path.insert(1, os.path.join(ROOT, "bench"))
+os.environ["SWIFTBANK_DATA_DIR"] = tempfile.mkdtemp(prefix="swiftbank-tests-")
+os.environ.setdefault("CHEQUE_WATCHER", "false")
+
+
+@pytest.fixture
+def emulator(monkeypatch):
+    """A local BankMOCK emulator with the client pointed at it, on a fresh pool, cache and breakers.
+
+    Rate limits are off; change emulator.config to inject latency or errors.
+    """
+    import bankmock_client as bankmock
+    import rate_limiter
+    from bankmock_emulator import BankMockEmulator
+
+    monkeypatch.setattr(rate_limiter, "ENABLED", False)
+    original = bankmock.get_config()
+    with BankMockEmulator() as emu:
+        bankmock.configure(base_url=emu.base_url)
+        try:
+            yield emu
+        finally:
+            bankmock.configure(**dataclasses.asdict(original))
@@ -0,0 +1,99 @@
+"""Shared BankMOCK client against the emulator: the pooled session, error mapping and the async twin."""
+
+import asyncio
+import time
+
+import pytest
+import requests
+
+import bankmock_client as bankmock
+import metrics
+
+
+def connections_opened(emulator) -> int:
+    pools = bankmock.session().get_adapter(emulator.base_url).poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+
+def test_sequential_calls_reuse_one_pooled_connection(emulator):
+    assert bankmock.session() is bankmock.session()
+    for _ in range(5):
+        assert bankmock.get("CUST001", "/balance").status_code == 200
+    assert connections_opened(emulator) == 1
+    assert emulator.requests["/balance"] == 5
+
+
+def test_configure_rebuilds_the_pool(emulator):
+    before = bankmock.session()
+    bankmock.configure(pool_maxsize=4)
+    assert bankmock.session() is not before
+    assert bankmock.session().get_adapter(emulator.base_url)._pool_maxsize == 4
+
+
+def test_requests_carry_the_customer(emulator):
+    first = bankmock.get_json("CUST001", "/account", use_cache=False)["data"]
+    second = bankmock.get_json("CUST002", "/account", use_cache=False)["data"]
+    assert first["accountNumber"] != second["accountNumber"]
+    assert bankmock.get_json("CUST001", "/account", use_cache=False)["data"] == first
+
+
+def test_error_status_raises_http_error(emulator):
+    with pytest.raises(requests.HTTPError) as error:
+        bankmock.get_json("CUST001", "/cheque/12")
+    assert error.value.response.status_code == 404
+
+
+def test_async_calls_fan_out_on_the_shared_loop(emulator):
+    emulator.config.latency_ms = 200
+
+    async def fetch_all():
+        return await asyncio.gather(*(
+            bankmock.aget_json(f"CUST{n:03d}", "/account") for n in range(8)
+        ))
+
+    start = time.perf_counter()
+    results = bankmock.run_sync(fetch_all())
+    # Eight 200 ms calls one after another would take 1.6 s
+    assert time.perf_counter() - start < 0.8
+    assert len({r["data"]["accountNumber"] for r in results}) == 8
+
+
+def test_async_errors_match_the_sync_client(emulator):
+    with pytest.raises(requests.HTTPError) as error:
+        bankmock.run_sync(bankmock.aget_json("CUST001", "/cheque/12"))
+    assert error.value.response.status_code == 404
+    assert error.value.response.json()["success"] is False
+
+
+def test_run_sync_carries_context_variables_onto_the_loop(emulator):
+    async def tool_name():
+        return metrics.current_tool.get()
+
+    token = metrics.current_tool.set("get_balance")
+    try:
+        assert bankmock.run_sync(tool_name()) == "get_balance"
+    finally:
+        metrics.current_tool.reset(token)
+
+
+def test_run_sync_refuses_to_block_the_loop_it_runs_on(emulator):
+    async def nested():
+        return bankmock.run_sync(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        bankmock.run_sync(nested())
+
+
+def test_snapshot_fetches_its_sections_concurrently(emulator):
+    pytest.importorskip("ibm_watsonx_orchestrate")
+    import banking_info_tools
+
+    emulator.config.latency_ms = 300
+    start = time.perf_counter()
+    reply = bankmock.run_sync(banking_info_tools.get_account_snapshot_async("CUST001"))
+    # /balance, /account and /transactions one after another would take 0.9 s
+    assert time.perf_counter() - start < 0.75
+    assert "unavailable" not in reply
+    assert {endpoint: emulator.requests[endpoint] for endpoint in ("/balance", "/account", "/transactions")} == {
+        "/balance": 1, "/account": 1, "/transactions": 1,
+    }
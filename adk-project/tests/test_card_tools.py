@@ -0,0 +1,47 @@
+"""Card actions through card_tools against the BankMOCK emulator: the OTP check and upstream failures."""
+
+import pytest
+
+pytest.importorskip("ibm_watsonx_orchestrate")
+
+import bankmock_client as bankmock  # noqa: E402
+import card_tools  # noqa: E402
+import idempotency  # noqa: E402
+import metrics  # noqa: E402
+import otp_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def stores():
+    otp_store.set_store(otp_store.MemoryOtpStore())
+    idempotency.set_store(idempotency.MemoryIdempotencyStore())
+    yield
+    otp_store.set_store(None)
+    idempotency.set_store(None)
+
+
+def verify_otp(customer_id="CUST001"):
+    store = otp_store.get_store()
+    store.issue(customer_id, "000000", "CARD_UNLOCK")
+    assert store.verify(customer_id, "000000") == otp_store.VERIFIED
+
+
+def test_unlock_needs_a_verified_otp(emulator):
+    assert card_tools.unlock_atm_card("CUST001").startswith("Cannot unlock card")
+    verify_otp()
+    assert "successfully UNLOCKED" in card_tools.unlock_atm_card("CUST001")
+
+
+def test_unlock_refused_upstream_is_an_error_reply(emulator):
+    bankmock.configure(max_retries=0)
+    emulator.config.error_rate, emulator.config.error_status = 1.0, 400
+    verify_otp()
+    reply = card_tools.unlock_atm_card("CUST001")
+    assert reply.startswith("Failed to unlock card: BankMOCK returned 400")
+    assert metrics._outcome(reply) == "error"
+
+
+def test_unlock_without_upstream_is_an_error_reply(emulator):
+    bankmock.configure(max_retries=0, base_url="http://127.0.0.1:9")
+    verify_otp()
+    assert card_tools.unlock_atm_card("CUST001").startswith("Failed to unlock card: ")
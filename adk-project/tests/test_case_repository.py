@@ -0,0 +1,190 @@
+"""Case repository: CRUD, selection, transactional bulk transitions and search on both backends."""
+
+import pytest
+
+import case_repository
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "memory":
+        return case_repository.DictCaseRepository()
+    return case_repository.SqliteCaseRepository(str(tmp_path / "cases.db"))
+
+
+def make_case(repo, n, customer_id="CUST001", status="OPEN", case_type="ATM_ISSUE", agent=None):
+    return repo.create({
+        "caseId": f"CASE-{n:03d}",
+        "customerId": customer_id,
+        "customerName": "Test Customer",
+        "type": case_type,
+        "description": f"Complaint number {n}",
+        "status": status,
+        "assignedAgent": agent,
+        "createdAt": f"2026-01-{n:02d}T00:00:00Z",
+        "updatedAt": f"2026-01-{n:02d}T00:00:00Z",
+    })
+
+
+def test_create_get_update(repo):
+    make_case(repo, 1)
+    assert repo.get("CASE-001")["status"] == "OPEN"
+    updated = repo.update("CASE-001", status="CLOSED", resolution="Refunded")
+    assert updated["status"] == "CLOSED" and updated["resolution"] == "Refunded"
+    assert repo.get("CASE-001")["resolution"] == "Refunded"
+    assert repo.get("CASE-404") is None
+    assert repo.update("CASE-404", status="CLOSED") is None
+
+
+def test_list_by_customer_newest_first(repo):
+    make_case(repo, 1)
+    make_case(repo, 2, status="CLOSED")
+    make_case(repo, 3)
+    make_case(repo, 4, customer_id="CUST002")
+    assert [c["caseId"] for c in repo.list_by_customer("CUST001")] == ["CASE-003", "CASE-002", "CASE-001"]
+    assert [c["caseId"] for c in repo.list_by_customer("CUST001", status="OPEN", limit=1)] == ["CASE-003"]
+
+
+def test_find_by_criteria_oldest_first(repo):
+    make_case(repo, 1, case_type="CHEQUE_NOT_CREDITED")
+    make_case(repo, 2, status="ESCALATED")
+    make_case(repo, 3, customer_id="CUST002")
+    make_case(repo, 4, status="CLOSED")
+    ids = lambda cases: [c["caseId"] for c in cases]
+    assert ids(repo.find(status=("OPEN", "ESCALATED"))) == ["CASE-001", "CASE-002", "CASE-003"]
+    assert ids(repo.find(case_type="CHEQUE_NOT_CREDITED")) == ["CASE-001"]
+    assert ids(repo.find(customer_id="CUST002")) == ["CASE-003"]
+    assert ids(repo.find(created_before="2026-01-03")) == ["CASE-001", "CASE-002"]
+    assert ids(repo.find(limit=2)) == ["CASE-001", "CASE-002"]
+
+
+def test_count_by_agent(repo):
+    make_case(repo, 1, status="ESCALATED", agent="Priya")
+    make_case(repo, 2, status="ESCALATED", agent="Priya")
+    make_case(repo, 3, status="ESCALATED", agent="Arjun")
+    make_case(repo, 4, status="CLOSED", agent="Arjun")
+    assert repo.count_by_agent() == {"Priya": 2, "Arjun": 1}
+
+
+def test_update_where_applies_each_cases_transition(repo):
+    make_case(repo, 1)
+    make_case(repo, 2, status="CLOSED")
+    make_case(repo, 3, status="VERIFIED")
+
+    def close(case):
+        return None if case["status"] == "CLOSED" else {"status": "CLOSED", "resolution": "Swept"}
+
+    results = repo.update_where(close)
+    assert [(case["caseId"], case["status"], changes) for case, changes in results] == [
+        ("CASE-001", "OPEN", {"status": "CLOSED", "resolution": "Swept"}),
+        ("CASE-002", "CLOSED", None),
+        ("CASE-003", "VERIFIED", {"status": "CLOSED", "resolution": "Swept"}),
+    ]
+    assert {c["caseId"]: c.get("resolution") for c in repo.find(status="CLOSED")} == {
+        "CASE-001": "Swept", "CASE-002": None, "CASE-003": "Swept",
+    }
+
+
+def test_update_where_is_all_or_nothing(repo):
+    make_case(repo, 1)
+    make_case(repo, 2)
+
+    def fail_on_second(case):
+        if case["caseId"] == "CASE-002":
+            raise RuntimeError("transition failed")
+        return {"status": "CLOSED"}
+
+    with pytest.raises(RuntimeError):
+        repo.update_where(fail_on_second)
+    assert [c["status"] for c in repo.find()] == ["OPEN", "OPEN"]
+
+
+def test_update_where_respects_criteria_and_limit(repo):
+    for n in range(1, 5):
+        make_case(repo, n)
+    results = repo.update_where(lambda case: {"status": "ESCALATED"}, limit=2, status="OPEN")
+    assert [case["caseId"] for case, _ in results] == ["CASE-001", "CASE-002"]
+    assert [c["caseId"] for c in repo.find(status="OPEN")] == ["CASE-003", "CASE-004"]
+
+
+def test_search_follows_updates(repo):
+    make_case(repo, 1)
+    repo.update("CASE-001", resolution="Refund issued by HDFC")
+    assert [c["caseId"] for c in repo.search("hdfc")["cases"]] == ["CASE-001"]
+    repo.update("CASE-001", resolution="Closed")
+    assert repo.search("hdfc")["total"] == 0
+
+
+def test_search_facets_count_the_filtered_cases(repo):
+    make_case(repo, 1, case_type="CHEQUE_NOT_CREDITED")
+    make_case(repo, 2, status="CLOSED", case_type="CHEQUE_NOT_CREDITED")
+    make_case(repo, 3, status="CLOSED")
+    make_case(repo, 4)
+    for query in ({}, {"text": "complaint"}, {"customer_id": "CUST001"}):
+        result = repo.search(status="CLOSED", **query)
+        assert result["total"] == 2
+        assert result["facets"] == {"status": {"CLOSED": 2}, "type": {"CHEQUE_NOT_CREDITED": 1, "ATM_ISSUE": 1}}
+        result = repo.search(status="OPEN", case_type="ATM_ISSUE", **query)
+        assert [c["caseId"] for c in result["cases"]] == ["CASE-004"]
+        assert result["facets"] == {"status": {"OPEN": 1}, "type": {"ATM_ISSUE": 1}}
+
+
+def describe(repo, n, description, **fields):
+    make_case(repo, n, **fields)
+    repo.update(f"CASE-{n:03d}", description=description)
+
+
+def test_search_needs_every_word(repo):
+    describe(repo, 1, "Cheque from HDFC not credited")
+    describe(repo, 2, "HDFC card retained at ATM")
+    describe(repo, 3, "Refund issued for the double charge")
+    assert [c["caseId"] for c in repo.search("hdfc")["cases"]] == ["CASE-002", "CASE-001"]
+    assert [c["caseId"] for c in repo.search("HDFC cheque")["cases"]] == ["CASE-001"]
+    assert repo.search("hdfc refund")["total"] == 0
+
+
+def test_search_phrases_and_prefixes(repo):
+    describe(repo, 1, "Cheque from HDFC not credited")
+    describe(repo, 2, "Refund issued for the double charge")
+    describe(repo, 3, "Issued a refund twice")
+    assert [c["caseId"] for c in repo.search('"refund issued"')["cases"]] == ["CASE-002"]
+    assert [c["caseId"] for c in repo.search("cred*")["cases"]] == ["CASE-001"]
+
+
+def test_search_pages_newest_first(repo):
+    for n in range(1, 6):
+        make_case(repo, n)
+    result = repo.search("complaint", limit=2, offset=2)
+    assert result["total"] == 5 and result["exact"]
+    assert [c["caseId"] for c in result["cases"]] == ["CASE-003", "CASE-002"]
+    assert repo.search("complaint", limit=2, offset=10)["cases"] == []
+
+
+def test_search_by_creation_date(repo):
+    for n in range(1, 6):
+        make_case(repo, n)
+    result = repo.search(created_after="2026-01-04")
+    assert [c["caseId"] for c in result["cases"]] == ["CASE-005", "CASE-004"]
+    assert result["facets"] == {"status": {"OPEN": 2}, "type": {"ATM_ISSUE": 2}}
+
+
+def test_search_by_relevance(repo):
+    describe(repo, 1, "Card retained, card blocked, card lost")
+    describe(repo, 2, "Card retained")
+    assert [c["caseId"] for c in repo.search("card", order=case_repository.RECENT)["cases"]] == [
+        "CASE-002", "CASE-001"]
+    assert [c["caseId"] for c in repo.search("card", order=case_repository.RELEVANCE)["cases"]] == [
+        "CASE-001", "CASE-002"]
+
+
+def test_search_count_limit_gives_lower_bounds(repo, monkeypatch):
+    monkeypatch.setattr(case_repository, "COUNT_LIMIT", 2)
+    for n in range(1, 5):
+        make_case(repo, n)
+    result = repo.search("complaint", limit=10)
+    if isinstance(repo, case_repository.SqliteCaseRepository):
+        # Counting stops one past the limit
+        assert (result["total"], result["exact"]) == (3, False)
+    else:
+        assert (result["total"], result["exact"]) == (4, True)
+    assert len(result["cases"]) == 4
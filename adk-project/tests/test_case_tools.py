@@ -0,0 +1,139 @@
+"""Back-office case transitions through case_tools, with the repository, event log and agent loads."""
+
+import pytest
+
+pytest.importorskip("ibm_watsonx_orchestrate")
+
+import agent_assignment  # noqa: E402
+import case_events  # noqa: E402
+import case_repository  # noqa: E402
+import case_tools  # noqa: E402
+import idempotency  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path):
+    repo = case_repository.DictCaseRepository()
+    case_repository.set_repository(repo)
+    case_events.set_event_log(case_events.CaseEventLog(str(tmp_path / "case-events")))
+    agent_assignment.set_engine(agent_assignment.AssignmentEngine(load_source=repo.count_by_agent))
+    yield repo
+    case_repository.set_repository(None)
+    case_events.set_event_log(None)
+    agent_assignment.set_engine(None)
+
+
+def make_case(repo, n, status="OPEN", agent=None):
+    repo.create({
+        "caseId": f"CASE-{n:03d}", "customerId": "CUST001", "type": "ATM_ISSUE", "description": "Card retained",
+        "status": status, "assignedAgent": agent,
+        "createdAt": f"2026-01-{n:02d}T00:00:00Z", "updatedAt": f"2026-01-{n:02d}T00:00:00Z",
+    })
+
+
+def test_bulk_close_follows_the_allowed_transitions(stores):
+    make_case(stores, 1)
+    make_case(stores, 2, status="VERIFIED")
+    make_case(stores, 3, status="CLOSED")
+    results = case_tools.bulk_close_cases("Resolved in review")
+    assert [(r["caseId"], r["previousStatus"], r["status"], r["result"]) for r in results] == [
+        ("CASE-001", "OPEN", "CLOSED", "UPDATED"),
+        ("CASE-002", "VERIFIED", "CLOSED", "UPDATED"),
+        ("CASE-003", "CLOSED", "CLOSED", "SKIPPED"),
+    ]
+    assert results[2]["reason"] == "Cannot move a CLOSED case to CLOSED"
+    assert stores.get("CASE-001")["resolution"] == "Resolved in review"
+
+
+def test_disallowed_transition_is_skipped(stores):
+    make_case(stores, 1, status="ESCALATED", agent="Priya Sharma")
+    (result,) = case_tools.bulk_transition_cases("VERIFIED")
+    assert result["result"] == "SKIPPED"
+    assert stores.get("CASE-001")["status"] == "ESCALATED"
+
+
+def test_transitions_are_recorded_in_the_timeline(stores):
+    make_case(stores, 1)
+    case_tools.bulk_transition_cases("VERIFIED", actor="ops", reason="Documents received")
+    case_tools.bulk_close_cases("Refunded")
+    events = case_events.get_event_log().timeline("CASE-001")
+    assert [(e["from"], e["to"], e["actor"]) for e in events] == [
+        ("OPEN", "VERIFIED", "ops"), ("VERIFIED", "CLOSED", "back-office"),
+    ]
+    assert events[0]["reason"] == "Documents received"
+
+
+def test_bulk_escalate_assigns_agents_and_close_releases_them(stores):
+    make_case(stores, 1)
+    make_case(stores, 2)
+    engine = agent_assignment.get_engine()
+    results = case_tools.bulk_escalate_cases()
+    agents = [r["assignedAgent"] for r in results]
+    assert all(agents)
+    assert sum(engine.loads().values()) == 2
+    assert {c["assignedAgent"] for c in stores.find(status="ESCALATED")} == set(agents)
+    case_tools.bulk_close_cases()
+    assert sum(engine.loads().values()) == 0
+
+
+def test_failed_assignment_write_releases_the_agent(stores, monkeypatch):
+    make_case(stores, 1)
+    make_case(stores, 2)
+    update = stores.update
+
+    def update_failing_once(case_id, **fields):
+        if case_id == "CASE-001" and "assignedAgent" in fields:
+            raise RuntimeError("disk full")
+        return update(case_id, **fields)
+
+    monkeypatch.setattr(stores, "update", update_failing_once)
+    results = case_tools.bulk_escalate_cases()
+    assert [(r["result"], r.get("reason")) for r in results] == [
+        ("UPDATED", "No agent could be assigned"), ("UPDATED", None),
+    ]
+    assert sum(agent_assignment.get_engine().loads().values()) == 1
+    events = case_events.get_event_log().timeline("CASE-001")
+    assert events[-1]["to"] == "ESCALATED" and "data" not in events[-1]
+
+
+def test_escalating_an_unknown_or_foreign_case_is_an_error(stores):
+    idempotency.set_store(idempotency.MemoryIdempotencyStore())
+    try:
+        make_case(stores, 1)
+        stores.create({
+            "caseId": "CASE-900", "customerId": "CUST002", "type": "ATM_ISSUE", "description": "Card retained",
+            "status": "OPEN", "createdAt": "2026-01-09T00:00:00Z", "updatedAt": "2026-01-09T00:00:00Z",
+        })
+        unknown = case_tools.escalate_complaint_case("CUST001", "CASE-404")
+        foreign = case_tools.escalate_complaint_case("CUST001", "CASE-900")
+        assert unknown.startswith("Error – case CASE-404 was not found.") and "CASE-001" in unknown
+        assert foreign == unknown.replace("CASE-404", "CASE-900")
+        assert stores.get("CASE-900")["status"] == "OPEN"
+        # The error is not stored as the call's reply: repeated once the ID is right, it escalates
+        stores.create({
+            "caseId": "CASE-404", "customerId": "CUST001", "type": "ATM_ISSUE", "description": "Card retained",
+            "status": "OPEN", "createdAt": "2026-01-09T00:00:00Z", "updatedAt": "2026-01-09T00:00:00Z",
+        })
+        assert case_tools.escalate_complaint_case("CUST001", "CASE-404").startswith(
+            "🔴 Case CASE-404 has been ESCALATED")
+    finally:
+        idempotency.set_store(None)
+
+
+def test_search_cases_pages_and_filters(stores):
+    for n in range(1, 6):
+        make_case(stores, n)
+    stores.create({
+        "caseId": "CASE-NEW", "customerId": "CUST002", "type": "CHEQUE_NOT_CREDITED",
+        "description": "HDFC cheque not credited", "status": "OPEN",
+        "createdAt": case_tools._now_iso(), "updatedAt": case_tools._now_iso(),
+    })
+    result = case_tools.search_cases("card", page=2, page_size=2)
+    assert (result["total"], result["pages"], result["page"]) == (5, 3, 2)
+    assert [c["caseId"] for c in result["cases"]] == ["CASE-003", "CASE-002"]
+    recent = case_tools.search_cases(newer_than_hours=24)
+    assert [c["caseId"] for c in recent["cases"]] == ["CASE-NEW"]
+    assert recent["facets"]["type"] == {"CHEQUE_NOT_CREDITED": 1}
+    assert case_tools.search_cases(page_size=1000)["pageSize"] == case_tools.MAX_SEARCH_PAGE_SIZE
+    with pytest.raises(ValueError):
+        case_tools.search_cases("card", order="oldest")
@@ -0,0 +1,220 @@
+"""Cheque watcher: store leases on both backends, re-check scheduling, the poll → announce cycle and linked cases."""
+
+import asyncio
+import datetime
+import threading
+import time
+import types
+
+import pytest
+
+import bankmock_client as bankmock
+import case_events
+import case_repository
+import cheque_watcher
+from cheque_watcher import CLEARED, NOT_FOUND, PENDING, RETURNED
+
+# poll_once() stamps results with the wall clock
+NOW = time.time()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = cheque_watcher.MemoryChequeStore()
+    else:
+        store = cheque_watcher.SqliteChequeStore(str(tmp_path / "cheques.db"))
+    cheque_watcher.set_store(store)
+    yield store
+    cheque_watcher.set_store(None)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Answers /cheque/{n} from a dict: cheque number → cheque data, None for a 404, or an exception."""
+    answers = {}
+
+    async def aget_json(customer_id, path, params=None, use_cache=True):
+        answer = answers[path.rsplit("/", 1)[1]]
+        if answer is None:
+            raise LookupError(path)
+        if isinstance(answer, Exception):
+            raise answer
+        return {"data": answer}
+
+    monkeypatch.setattr(bankmock, "aget_json", aget_json)
+    return answers
+
+
+@pytest.fixture
+def announced(monkeypatch):
+    updates = []
+    monkeypatch.setattr(cheque_watcher, "_listeners", [updates.append])
+    return updates
+
+
+@pytest.fixture
+def cases(tmp_path):
+    repo = case_repository.DictCaseRepository()
+    case_repository.set_repository(repo)
+    case_events.set_event_log(case_events.CaseEventLog(str(tmp_path / "case-events")))
+    yield repo
+    case_repository.set_repository(None)
+    case_events.set_event_log(None)
+
+
+def not_found(path):
+    error = LookupError(path)
+    error.response = types.SimpleNamespace(status_code=404)
+    return error
+
+
+def test_outcome_of_upstream_statuses():
+    assert cheque_watcher.outcome_of("Processing") == PENDING
+    assert cheque_watcher.outcome_of(" cleared ") == CLEARED
+    assert cheque_watcher.outcome_of("Bounced") == RETURNED
+    assert cheque_watcher.outcome_of(None) == PENDING
+
+
+def test_recheck_waits_for_the_expected_date_then_backs_off():
+    tomorrow = datetime.datetime.fromtimestamp(NOW, datetime.timezone.utc).date() + datetime.timedelta(days=1)
+    starts = datetime.datetime.combine(tomorrow, datetime.time(), datetime.timezone.utc).timestamp()
+    assert cheque_watcher.next_check_delay(tomorrow.isoformat(), 0, NOW) == min(
+        cheque_watcher.MAX_INTERVAL_SECONDS, max(cheque_watcher.MIN_INTERVAL_SECONDS, starts - NOW))
+    past = "2020-01-01"
+    delays = [cheque_watcher.next_check_delay(past, polls, NOW) for polls in range(3)]
+    assert delays == [cheque_watcher.MIN_INTERVAL_SECONDS * 2 ** n for n in range(3)]
+    assert cheque_watcher.next_check_delay(past, 40, NOW) == cheque_watcher.MAX_INTERVAL_SECONDS
+
+
+def test_watch_is_idempotent_and_links_cases(store):
+    store.watch("CUST001", "100001", now=NOW)
+    store.watch("CUST001", "100001", case_id="CASE-1", now=NOW + 5)
+    record = store.get("CUST001", "100001")
+    assert record["case_id"] == "CASE-1" and record["created_at"] == NOW
+    assert store.pending_count() == 1
+
+
+def test_claim_due_leases_each_cheque_once(store):
+    store.watch("CUST001", "100001", now=NOW)
+    store.watch("CUST002", "100002", now=NOW + 100)
+    assert [r["cheque_number"] for r in store.claim_due(NOW, limit=10, lease=60)] == ["100001"]
+    # Leased: not handed out again until the lease runs out
+    assert store.claim_due(NOW + 30, limit=10) == []
+    assert [r["cheque_number"] for r in store.claim_due(NOW + 100, limit=10)] == ["100001", "100002"]
+    assert [r["cheque_number"] for r in store.claim_due(NOW + 1000, limit=1)] == ["100001"]
+
+
+def test_save_keeps_a_case_linked_while_the_cheque_was_out(store):
+    store.watch("CUST001", "100001", now=NOW)
+    (claimed,) = store.claim_due(NOW, limit=1)
+    store.watch("CUST001", "100001", case_id="CASE-1")
+    store.save(dict(claimed, status="Processing"))
+    record = store.get("CUST001", "100001")
+    assert record["case_id"] == "CASE-1" and record["status"] == "Processing"
+
+
+def test_sweep_drops_old_records(store):
+    store.watch("CUST001", "100001", now=NOW - cheque_watcher.WATCH_SECONDS - 1)
+    store.watch("CUST001", "100002", now=NOW)
+    assert store.sweep(NOW) == 1
+    assert store.get("CUST001", "100001") is None
+
+
+def test_poll_announces_observed_changes_only(store, upstream, announced):
+    store.watch("CUST001", "100001", case_id="CASE-1", now=NOW)
+    upstream["100001"] = {"chequeNumber": "100001", "status": "Processing", "amount": 2500.0,
+                          "expectedClearanceDate": "2020-01-01"}
+    assert cheque_watcher.poll_once(now=NOW) == 1
+    # The first answer is the baseline
+    assert announced == []
+    record = store.get("CUST001", "100001")
+    assert record["outcome"] == PENDING and record["next_check"] > record["checked_at"]
+
+    upstream["100001"] = dict(upstream["100001"], status="Cleared")
+    assert cheque_watcher.poll_once(now=record["next_check"]) == 1
+    assert [(u["caseId"], u["previousStatus"], u["status"], u["outcome"]) for u in announced] == [
+        ("CASE-1", "Processing", "Cleared", CLEARED),
+    ]
+    # Final outcomes are answered from the store and never polled again
+    assert cheque_watcher.lookup("CUST001", "100001")["status"] == "Cleared"
+    assert cheque_watcher.poll_once(now=NOW + 10 ** 7) == 0
+
+
+def test_failed_poll_backs_off(store, upstream, announced):
+    store.watch("CUST001", "100001", now=NOW)
+    upstream["100001"] = ConnectionError("reset")
+    cheque_watcher.poll_once(now=NOW)
+    record = store.get("CUST001", "100001")
+    assert record["failures"] == 1 and record["status"] is None
+    assert record["next_check"] >= record["created_at"] + cheque_watcher.MIN_INTERVAL_SECONDS
+    assert announced == []
+
+
+def test_unknown_cheque_stops_being_polled(store, upstream, announced):
+    store.watch("CUST001", "100001", now=NOW)
+    upstream["100001"] = not_found("/cheque/100001")
+    cheque_watcher.poll_once(now=NOW)
+    assert store.get("CUST001", "100001")["outcome"] == NOT_FOUND
+    assert cheque_watcher.lookup("CUST001", "100001") is None
+    assert store.pending_count() == 0
+
+
+def test_watcher_moves_linked_cases_on_by_itself(store, upstream, announced, cases):
+    # No listener closes the case: case_tools is not imported here
+    for n, cheque_number in ((1, "100001"), (2, "100002")):
+        cases.create({"caseId": f"CASE-{n}", "customerId": "CUST001", "type": "CHEQUE_NOT_CREDITED",
+                      "description": "Cheque not credited", "chequeNumber": cheque_number, "status": "OPEN",
+                      "createdAt": "2026-01-01T00:00:00Z", "updatedAt": "2026-01-01T00:00:00Z"})
+        store.watch("CUST001", cheque_number, case_id=f"CASE-{n}", now=NOW)
+        upstream[cheque_number] = {"chequeNumber": cheque_number, "status": "Processing", "amount": 2500.0}
+    cheque_watcher.poll_once(now=NOW)
+    upstream["100001"] = dict(upstream["100001"], status="Cleared")
+    upstream["100002"] = dict(upstream["100002"], status="Bounced")
+    cheque_watcher.poll_once(now=NOW + 10 ** 7)
+
+    cleared, returned = cases.get("CASE-1"), cases.get("CASE-2")
+    assert cleared["status"] == "CLOSED" and "Cheque #100001 cleared" in cleared["resolution"]
+    assert returned["status"] == "VERIFIED"
+    (event,) = [e for e in case_events.get_event_log().timeline("CASE-1") if e["type"] == case_events.TRANSITION]
+    assert (event["from"], event["to"], event["actor"]) == ("OPEN", "CLOSED", cheque_watcher.WATCHER_ACTOR)
+    assert len(announced) == 2
+
+
+def test_case_of_another_customer_is_left_alone(store, upstream, announced, cases):
+    cases.create({"caseId": "CASE-1", "customerId": "CUST002", "type": "CHEQUE_NOT_CREDITED",
+                  "description": "Cheque not credited", "chequeNumber": "100001", "status": "OPEN",
+                  "createdAt": "2026-01-01T00:00:00Z", "updatedAt": "2026-01-01T00:00:00Z"})
+    store.watch("CUST001", "100001", case_id="CASE-1", now=NOW)
+    upstream["100001"] = {"chequeNumber": "100001", "status": "Processing"}
+    cheque_watcher.poll_once(now=NOW)
+    upstream["100001"] = {"chequeNumber": "100001", "status": "Cleared"}
+    cheque_watcher.poll_once(now=NOW + 10 ** 7)
+    assert cases.get("CASE-1")["status"] == "OPEN"
+
+
+def test_get_cheque_status_keeps_store_calls_off_the_event_loop(store, upstream, monkeypatch):
+    pytest.importorskip("ibm_watsonx_orchestrate")
+    import banking_info_tools
+
+    threads = []
+    lookup, observe = cheque_watcher.lookup, cheque_watcher.observe
+
+    def record_thread(fn):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return fn(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(cheque_watcher, "lookup", record_thread(lookup))
+    monkeypatch.setattr(cheque_watcher, "observe", record_thread(observe))
+    upstream["100001"] = {"chequeNumber": "100001", "status": "Processing", "amount": 2500.0}
+
+    async def ask():
+        reply = await banking_info_tools.get_cheque_status_async("CUST001", "100001")
+        return reply, threading.get_ident()
+
+    reply, loop_thread = asyncio.run(ask())
+    assert "100001" in reply
+    assert len(threads) == 2 and loop_thread not in threads
+    assert store.get("CUST001", "100001")["status"] == "Processing"
@@ -0,0 +1,142 @@
+"""Circuit breaker: opening, fast failure and probing, adaptive read timeouts, and the client's use of both."""
+
+import pytest
+
+import bankmock_client as bankmock
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+CONFIGURED = 10.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def call(brk, latency):
+    """One upstream call that takes latency seconds unless the read timeout cuts it short."""
+    brk.before_call()
+    timeout = brk.read_timeout(CONFIGURED)
+    if latency > timeout:
+        brk.record(timeout, True, timed_out=True)
+        return "timeout"
+    brk.record(latency, False)
+    return "ok"
+
+
+def warm_up(brk, latency=0.1, count=50):
+    for _ in range(count):
+        assert call(brk, latency) == "ok"
+
+
+def fail(brk, count):
+    for _ in range(count):
+        brk.before_call()
+        brk.record(0.1, True)
+
+
+def test_opens_once_the_window_holds_enough_failures():
+    brk = CircuitBreaker("/balance", min_requests=4, failure_rate=0.5, clock=Clock())
+    fail(brk, 3)
+    assert brk.state == CLOSED
+    fail(brk, 1)
+    assert brk.state == OPEN and brk.opened == 1
+    with pytest.raises(CircuitOpenError) as error:
+        brk.before_call()
+    assert error.value.endpoint == "/balance" and error.value.retry_in == brk.open_seconds
+    assert brk.stats()["rejected"] == 1
+
+
+def test_successes_keep_it_closed_and_old_calls_leave_the_window():
+    clock = Clock()
+    brk = CircuitBreaker("/balance", min_requests=4, failure_rate=0.5, clock=clock)
+    for _ in range(3):
+        brk.record(0.1, False)
+    fail(brk, 2)
+    assert brk.state == CLOSED
+    clock.now += brk.window_seconds + 1
+    assert brk.stats()["window_calls"] == 0
+
+
+def test_slow_calls_count_as_failures():
+    brk = CircuitBreaker("/balance", min_requests=2, slow_call_seconds=5, clock=Clock())
+    brk.record(6.0, False)
+    brk.record(7.0, False)
+    assert brk.state == OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    clock = Clock()
+    brk = CircuitBreaker("/balance", min_requests=2, clock=clock)
+    fail(brk, 2)
+    clock.now += brk.open_seconds
+    brk.before_call()
+    assert brk.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        brk.before_call()
+    # A failed probe opens it again
+    brk.record(0.1, True)
+    assert brk.state == OPEN and brk.opened == 2
+    clock.now += brk.open_seconds
+    brk.before_call()
+    # A cancelled probe frees the slot; a successful one closes the breaker
+    brk.release()
+    brk.before_call()
+    brk.record(0.1, False)
+    assert brk.state == CLOSED
+    brk.before_call()
+
+
+def test_timeout_follows_p99():
+    brk = CircuitBreaker("/balance", min_timeout=0.05)
+    assert brk.read_timeout(CONFIGURED) == CONFIGURED
+    warm_up(brk)
+    assert brk.read_timeout(CONFIGURED) == pytest.approx(0.2)
+
+
+def test_timeout_climbs_after_a_latency_step_up():
+    # A failure rate above 1 never opens the breaker: only the timeout can recover
+    brk = CircuitBreaker("/balance", failure_rate=1.01, min_timeout=0.05)
+    warm_up(brk)
+    outcomes = [call(brk, 1.0) for _ in range(100)]
+    assert outcomes[0] == "timeout"
+    assert outcomes[-10:] == ["ok"] * 10
+    assert brk.read_timeout(CONFIGURED) >= 1.0
+
+
+def test_probe_after_a_step_up_gets_the_configured_timeout():
+    clock = Clock()
+    brk = CircuitBreaker("/balance", min_timeout=0.05, clock=clock)
+    warm_up(brk)
+    clock.now += brk.window_seconds + 1
+    while brk.state == CLOSED:
+        assert call(brk, 1.0) == "timeout"
+    clock.now += brk.open_seconds
+    brk.before_call()
+    assert brk.state == HALF_OPEN
+    assert brk.read_timeout(CONFIGURED) == CONFIGURED
+    brk.record(1.0, False)
+    assert brk.state == CLOSED
+    # The old samples went when the breaker opened; new ones set the timeout
+    assert brk.read_timeout(CONFIGURED) == CONFIGURED
+    warm_up(brk, latency=1.0)
+    assert brk.read_timeout(CONFIGURED) == pytest.approx(2.0)
+    assert brk.state != OPEN
+
+
+def test_client_fails_fast_while_the_breaker_is_open(emulator):
+    bankmock.configure(base_url=emulator.base_url, breaker_min_calls=3, max_retries=0)
+    emulator.config.error_rate, emulator.config.error_status = 1.0, 500
+    for _ in range(3):
+        with pytest.raises(Exception):
+            bankmock.get_json("CUST001", "/transactions")
+    assert bankmock.breaker_stats()["/transactions"]["state"] == OPEN
+    with pytest.raises(CircuitOpenError):
+        bankmock.get_json("CUST001", "/transactions")
+    assert emulator.requests["/transactions"] == 3
+    # Other endpoints have their own breaker
+    emulator.config.error_rate = 0.0
+    assert bankmock.get_json("CUST001", "/balance")["success"] is True
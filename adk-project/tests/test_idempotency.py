@@ -0,0 +1,118 @@
+"""@idempotent: replays of repeated write-tool calls, on both store backends."""
+
+import threading
+import time
+
+import pytest
+
+import idempotency
+
+
+@pytest.fixture(params=["memory", "sqlite"], autouse=True)
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = idempotency.MemoryIdempotencyStore()
+    else:
+        store = idempotency.SqliteIdempotencyStore(str(tmp_path / "idempotency.db"))
+    idempotency.set_store(store)
+    yield store
+    idempotency.set_store(None)
+
+
+def counting_tool(reply="Case CASE-1 created.", **decorator_args):
+    calls = []
+
+    @idempotency.idempotent(**decorator_args)
+    def create_case(customer_id: str, description: str, case_type: str = "GENERAL") -> str:
+        calls.append((customer_id, description, case_type))
+        return reply if isinstance(reply, str) else reply(len(calls))
+
+    return create_case, calls
+
+
+def test_repeat_replays_the_original_reply():
+    create_case, calls = counting_tool(reply=lambda n: f"Case CASE-{n} created.")
+    first = create_case("CUST001", "Card declined")
+    assert create_case("CUST001", "Card declined") == first
+    assert len(calls) == 1
+
+
+def test_arguments_are_normalised():
+    create_case, calls = counting_tool()
+    create_case("CUST001", "Card  declined", case_type="GENERAL")
+    create_case("cust001", " card declined ")
+    assert len(calls) == 1
+
+
+def test_different_arguments_run_again():
+    create_case, calls = counting_tool()
+    create_case("CUST001", "Card declined")
+    create_case("CUST002", "Card declined")
+    create_case("CUST001", "Cheque missing")
+    assert len(calls) == 3
+
+
+def test_error_replies_are_not_stored():
+    create_case, calls = counting_tool(reply="Failed to create case: upstream timeout")
+    create_case("CUST001", "Card declined")
+    create_case("CUST001", "Card declined")
+    assert len(calls) == 2
+
+
+def test_exception_releases_the_claim():
+    attempts = []
+
+    @idempotency.idempotent()
+    def flaky(customer_id: str) -> str:
+        attempts.append(customer_id)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return "Done."
+
+    with pytest.raises(ConnectionError):
+        flaky("CUST001")
+    assert flaky("CUST001") == "Done."
+    assert len(attempts) == 2
+
+
+def test_reply_expires_after_the_window():
+    create_case, calls = counting_tool(window=0.05)
+    create_case("CUST001", "Card declined")
+    time.sleep(0.1)
+    create_case("CUST001", "Card declined")
+    assert len(calls) == 2
+
+
+def test_invalid_stored_reply_is_discarded():
+    still_valid = [True]
+    create_case, calls = counting_tool(valid=lambda arguments: still_valid[0])
+    create_case("CUST001", "Card declined")
+    still_valid[0] = False
+    create_case("CUST001", "Card declined")
+    assert len(calls) == 2
+
+
+def test_concurrent_retry_waits_for_the_original_call():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    @idempotency.idempotent()
+    def slow(customer_id: str) -> str:
+        calls.append(customer_id)
+        started.set()
+        release.wait(5)
+        return "OTP sent."
+
+    replies = []
+    first = threading.Thread(target=lambda: replies.append(slow("CUST001")))
+    first.start()
+    started.wait(5)
+    retry = threading.Thread(target=lambda: replies.append(slow("CUST001")))
+    retry.start()
+    time.sleep(0.1)
+    release.set()
+    first.join(5)
+    retry.join(5)
+    assert replies == ["OTP sent.", "OTP sent."]
+    assert len(calls) == 1
+
@@ -0,0 +1,99 @@
+"""Intent pre-router: which messages are dispatched to which tool, the refusals, and dispatch itself."""
+
+import pytest
+
+import intent_router
+from intent_router import (AMBIGUOUS, MISSING_SLOT, MULTIPLE_INTENTS, NEEDS_LLM, NO_MATCH, REFUSED, SNAPSHOT_TOOL,
+                           TOO_LONG)
+
+
+@pytest.mark.parametrize("message, tool, arguments", [
+    ("What is my balance?", "banking_info_tools:get_account_balance", {}),
+    ("balance please", "banking_info_tools:get_account_balance", {}),
+    ("Show me my last 10 transactions", "banking_info_tools:get_recent_transactions", {"limit": 10}),
+    ("What's my IFSC code", "banking_info_tools:get_account_details", {}),
+    ("Cheque status for 123456", "banking_info_tools:get_cheque_status", {"cheque_number": "123456"}),
+    ("card status", "card_tools:get_card_status", {}),
+    ("Status of case-1700000000-ab12c", "case_tools:get_complaint_case", {"case_id": "CASE-1700000000-AB12C"}),
+    ("Show my cases", "case_tools:list_complaint_cases", {}),
+    ("Case history of CASE-1700000000-AB12C", "case_tools:get_case_timeline",
+     {"case_id": "CASE-1700000000-AB12C"}),
+    ("My balance and recent 5 transactions", SNAPSHOT_TOOL, {"transaction_limit": 5}),
+])
+def test_unambiguous_lookups_are_dispatched(message, tool, arguments):
+    decision = intent_router.classify(message)
+    assert decision.dispatched
+    assert (decision.tool, decision.arguments) == (tool, arguments)
+
+
+@pytest.mark.parametrize("message, reason, agent", [
+    ("", NO_MATCH, None),
+    ("Hello there", NO_MATCH, None),
+    ("branch", NO_MATCH, None),
+    ("I see unauthorized transactions", REFUSED, None),
+    ("Transfer my balance to savings", REFUSED, None),
+    ("Block my card", NEEDS_LLM, "Card_Action_Agent"),
+    ("My cheque 123456 is not credited", NEEDS_LLM, "Case_Management_Agent"),
+    ("How much did I spend last month", NEEDS_LLM, "Banking_Info_Agent"),
+    ("Why is my balance so low", AMBIGUOUS, "Banking_Info_Agent"),
+    ("My balance hasn't updated", AMBIGUOUS, "Banking_Info_Agent"),
+    ("Cheque status please", MISSING_SLOT, "Banking_Info_Agent"),
+    ("Cheque status for 123456 and 654321", MISSING_SLOT, "Banking_Info_Agent"),
+    ("My balance and my cases", MULTIPLE_INTENTS, "Banking_Info_Agent"),
+    ("Could you please tell me what my balance is right now since I need to pay my rent soon ok",
+     TOO_LONG, "Banking_Info_Agent"),
+])
+def test_everything_else_falls_through(message, reason, agent):
+    decision = intent_router.classify(message)
+    assert not decision.dispatched
+    assert (decision.reason, decision.agent) == (reason, agent)
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    """Stand-in tools for dispatch(): record each call and answer with the tool name."""
+    calls = []
+
+    def resolve(tool):
+        def balance(customer_id, output_format=None):
+            calls.append((tool, customer_id, output_format))
+            return '{"response":"balance"}' if output_format == "json" else "Balance: ₹100.00"
+
+        def cheque(customer_id, cheque_number):
+            calls.append((tool, customer_id, cheque_number))
+            return f"Cheque #{cheque_number}: Cleared"
+
+        return cheque if tool.endswith("get_cheque_status") else balance
+
+    monkeypatch.setattr(intent_router, "_resolve", resolve)
+    return calls
+
+
+def test_dispatch_calls_the_tool_and_adds_the_closing_line(tools):
+    reply = intent_router.dispatch("what is my balance", "CUST001")
+    assert reply == f"Balance: ₹100.00\n\n{intent_router.CLOSING}"
+    assert intent_router.dispatch("what is my balance", "CUST001", "json") == '{"response":"balance"}'
+    # output_format only goes to tools that take it
+    assert intent_router.dispatch("cheque status 123456", "CUST001", "json") == "Cheque #123456: Cleared"
+    assert tools == [
+        ("banking_info_tools:get_account_balance", "CUST001", None),
+        ("banking_info_tools:get_account_balance", "CUST001", "json"),
+        ("banking_info_tools:get_cheque_status", "CUST001", "123456"),
+    ]
+
+
+def test_fallthrough_and_disabled_router_return_none(tools, monkeypatch):
+    assert intent_router.dispatch("block my card", "CUST001") is None
+    monkeypatch.setattr(intent_router, "ENABLED", False)
+    assert intent_router.dispatch("what is my balance", "CUST001") is None
+    assert tools == []
+
+
+def test_stats_count_coverage(tools):
+    before = intent_router.stats()
+    intent_router.dispatch("what is my balance", "CUST001")
+    intent_router.dispatch("block my card", "CUST001")
+    after = intent_router.stats()
+    assert after["messages"] - before["messages"] == 2
+    assert after["dispatched"] - before["dispatched"] == 1
+    assert after["seconds_saved"] > before["seconds_saved"]
@@ -0,0 +1,97 @@
+"""OTP store: the wrong-guess cap per customer, atomic verify and the one-shot grant."""
+
+import time
+
+import pytest
+
+import otp_store
+from otp_store import ALREADY_USED, EXPIRED, INCORRECT, LOCKED, NOT_FOUND, VERIFIED
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = otp_store.MemoryOtpStore()
+    else:
+        store = otp_store.SqliteOtpStore(str(tmp_path / "otp.db"))
+    store.max_attempts = 3
+    return store
+
+
+def test_verify_accepts_the_otp_once(store):
+    store.issue("CUST001", "123456", "unlock")
+    assert store.verify("CUST001", "123456") == VERIFIED
+    assert store.verify("CUST001", "123456") == ALREADY_USED
+
+
+def test_unknown_customer_is_not_found(store):
+    assert store.verify("CUST404", "123456") == NOT_FOUND
+
+
+def test_expired_otp_is_refused(store):
+    store.issue("CUST001", "123456", "unlock", ttl=-1)
+    assert store.verify("CUST001", "123456") == EXPIRED
+
+
+def test_wrong_guesses_lock_the_customer(store):
+    store.issue("CUST001", "123456", "unlock")
+    assert [store.verify("CUST001", "000000") for _ in range(3)] == [INCORRECT] * 3
+    # Locked even for the right code
+    assert store.verify("CUST001", "123456") == LOCKED
+
+
+def test_new_otp_does_not_reset_the_attempt_count(store):
+    store.issue("CUST001", "123456", "unlock")
+    store.verify("CUST001", "000000")
+    store.verify("CUST001", "000000")
+    store.issue("CUST001", "654321", "unlock")
+    assert store.verify("CUST001", "000000") == INCORRECT
+    store.issue("CUST001", "111111", "unlock")
+    assert store.verify("CUST001", "111111") == LOCKED
+
+
+def test_attempts_stop_counting_after_the_window(store):
+    store.attempt_window = 0.05
+    store.issue("CUST001", "123456", "unlock")
+    for _ in range(3):
+        store.verify("CUST001", "000000")
+    time.sleep(0.1)
+    store.issue("CUST001", "654321", "unlock")
+    assert store.verify("CUST001", "654321") == VERIFIED
+
+
+def test_correct_guess_clears_the_attempt_count(store):
+    store.issue("CUST001", "123456", "unlock")
+    store.verify("CUST001", "000000")
+    store.verify("CUST001", "000000")
+    assert store.verify("CUST001", "123456") == VERIFIED
+    store.issue("CUST001", "654321", "unlock")
+    store.verify("CUST001", "000000")
+    store.verify("CUST001", "000000")
+    assert store.verify("CUST001", "654321") == VERIFIED
+
+
+def test_attempts_are_per_customer(store):
+    store.issue("CUST001", "123456", "unlock")
+    store.issue("CUST002", "123456", "unlock")
+    for _ in range(3):
+        store.verify("CUST001", "000000")
+    assert store.verify("CUST002", "123456") == VERIFIED
+
+
+def test_sweep_keeps_records_with_live_failures(store):
+    store.issue("CUST001", "123456", "unlock", ttl=1)
+    store.issue("CUST002", "123456", "unlock", ttl=1)
+    store.verify("CUST001", "000000")
+    later = time.time() + 1 + otp_store.OTP_SWEEP_GRACE + 1
+    assert store.sweep(now=later) == 1
+    assert store.get("CUST001") is not None
+    assert store.get("CUST002") is None
+
+
+def test_verification_is_spent_once(store):
+    store.issue("CUST001", "123456", "unlock")
+    assert not store.consume_verification("CUST001", max_age=60)
+    store.verify("CUST001", "123456")
+    assert store.consume_verification("CUST001", max_age=60)
+    assert not store.consume_verification("CUST001", max_age=60)
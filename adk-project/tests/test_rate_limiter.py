@@ -0,0 +1,164 @@
+"""Rate limits: fair queueing by customer on both store backends, and @limited's reply."""
+
+import threading
+import time
+
+import pytest
+
+import idempotency
+import metrics
+import rate_limiter
+from rate_limiter import Limit
+
+QUEUE = "endpoint:/transactions"
+# One request a second, no burst beyond the first
+BUCKETS = ((QUEUE, Limit(1.0, 1.0)),)
+# queue_depths() counts tickets whose deadline is still ahead of the wall clock
+START = time.time()
+DEADLINE = START + 100
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return rate_limiter.MemoryRateLimitStore()
+    return rate_limiter.SqliteRateLimitStore(str(tmp_path / "rate_limits.db"))
+
+
+def queue(store, customer_id, count, weight=1.0):
+    """Queue count calls for a customer; return (customer_id, ticket) for each."""
+    entries = []
+    for _ in range(count):
+        granted, ticket, _ = store.acquire(QUEUE, BUCKETS, customer_id, weight, DEADLINE, now=START)
+        assert not granted and ticket is not None
+        entries.append((customer_id, ticket))
+    return entries
+
+
+def drain(store, entries):
+    """Let every queued call attempt once a second, in the order it queued; return who went, in order."""
+    served, now = [], START
+    while entries:
+        now += 1
+        for entry in list(entries):
+            customer_id, ticket = entry
+            granted, _, _ = store.acquire(QUEUE, BUCKETS, customer_id, 1.0, DEADLINE, ticket, now=now)
+            if granted:
+                served.append(customer_id)
+                entries.remove(entry)
+        assert now < DEADLINE
+    return served
+
+
+def use_up_burst(store):
+    assert store.acquire(QUEUE, BUCKETS, "CUST000", 1.0, DEADLINE, now=START)[0]
+
+
+def test_burst_goes_straight_through(store):
+    granted, ticket, wait = store.acquire(QUEUE, BUCKETS, "CUST001", 1.0, DEADLINE, now=START)
+    assert granted and ticket is None and wait == 0
+
+
+def test_busy_customer_delays_another_by_one_turn(store):
+    use_up_burst(store)
+    entries = queue(store, "CUST001", 5) + queue(store, "CUST002", 1)
+    assert drain(store, entries) == ["CUST001", "CUST002", "CUST001", "CUST001", "CUST001", "CUST001"]
+
+
+def test_customers_take_turns(store):
+    use_up_burst(store)
+    entries = queue(store, "CUST001", 3) + queue(store, "CUST002", 3)
+    assert drain(store, entries) == ["CUST001", "CUST002"] * 3
+
+
+def test_weight_gives_a_larger_share(store):
+    use_up_burst(store)
+    entries = queue(store, "CUST001", 4, weight=2.0) + queue(store, "CUST002", 4)
+    assert drain(store, entries) == ["CUST001", "CUST001", "CUST002", "CUST001", "CUST001",
+                                     "CUST002", "CUST002", "CUST002"]
+
+
+def test_call_that_cannot_go_before_its_deadline_is_turned_away(store):
+    slow = ((QUEUE, Limit(0.01, 1.0)),)
+    assert store.acquire(QUEUE, slow, "CUST001", 1.0, START + 5, now=START)[0]
+    granted, ticket, wait = store.acquire(QUEUE, slow, "CUST001", 1.0, START + 5, now=START)
+    assert not granted and ticket is None
+    assert wait > 5
+
+
+def test_cancelled_ticket_leaves_the_queue(store):
+    use_up_burst(store)
+    (_, first), (_, second) = queue(store, "CUST001", 1) + queue(store, "CUST002", 1)
+    assert store.queue_depths() == {"endpoint": 2}
+    store.cancel(first)
+    assert store.queue_depths() == {"endpoint": 1}
+    assert store.acquire(QUEUE, BUCKETS, "CUST002", 1.0, DEADLINE, second, now=START + 1)[0]
+
+
+def test_limited_tool_replies_with_an_error_over_its_limit(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "TOOL_LIMITS", {"generate_otp": Limit(1 / 300, 2)})
+    rate_limiter.set_store(rate_limiter.MemoryRateLimitStore())
+    try:
+        @rate_limiter.limited
+        def generate_otp(customer_id: str) -> str:
+            return "OTP sent."
+
+        assert [generate_otp("CUST001") for _ in range(2)] == ["OTP sent."] * 2
+        reply = generate_otp("CUST001")
+        assert reply.startswith("Error – too many requests.")
+        # Other customers have their own buckets
+        assert generate_otp("CUST002") == "OTP sent."
+    finally:
+        rate_limiter.set_store(None)
+
+
+def test_refusal_is_an_error_reply_and_not_replayed(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "TOOL_LIMITS", {"create_case": Limit(1 / 300, 1)})
+    rate_limiter.set_store(rate_limiter.MemoryRateLimitStore())
+    idempotency.set_store(idempotency.MemoryIdempotencyStore())
+    calls = []
+    try:
+        @idempotency.idempotent()
+        @rate_limiter.limited
+        def create_case(customer_id: str, description: str) -> str:
+            calls.append(description)
+            return f"Case CASE-{len(calls)} created."
+
+        assert create_case("CUST001", "Card declined") == "Case CASE-1 created."
+        refusal = create_case("CUST001", "Cheque missing")
+        assert metrics._outcome(refusal) == "error"
+        # Once the bucket has room again the retry runs instead of replaying the refusal
+        rate_limiter.set_store(rate_limiter.MemoryRateLimitStore())
+        assert create_case("CUST001", "Cheque missing") == "Case CASE-2 created."
+    finally:
+        rate_limiter.set_store(None)
+        idempotency.set_store(None)
+
+
+def test_call_queued_on_a_tool_bucket_does_not_hold_up_other_tools(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "TOOL_LIMITS", {"generate_otp": Limit(1.0, 1)})
+    store = rate_limiter.MemoryRateLimitStore()
+    rate_limiter.set_store(store)
+    try:
+        @rate_limiter.limited
+        def generate_otp(customer_id: str) -> str:
+            return "OTP sent."
+
+        @rate_limiter.limited
+        def get_account_balance(customer_id: str) -> str:
+            return "Balance: 100.00"
+
+        assert generate_otp("CUST001") == "OTP sent."
+        waiting = threading.Thread(target=generate_otp, args=("CUST001",))
+        waiting.start()
+        while store.queue_depths() != {"customer": 1}:
+            time.sleep(0.005)
+        started = time.monotonic()
+        assert get_account_balance("CUST001") == "Balance: 100.00"
+        assert time.monotonic() - started < 0.5
+        waiting.join(5)
+    finally:
+        rate_limiter.set_store(None)
@@ -0,0 +1,98 @@
+"""Response cache: TTL and LRU bounds, per-customer invalidation, and the client's read-through and write hooks."""
+
+import bankmock_client as bankmock
+from response_cache import TTLCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def key(customer_id, path="/balance"):
+    return make_key(customer_id, path)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=15, clock=clock)
+    cache.set(key("CUST001"), {"balance": 1}, 10)
+    clock.now = 14.9
+    assert cache.get(key("CUST001")) == {"balance": 1}
+    clock.now = 15
+    assert cache.get(key("CUST001")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_goes_first():
+    cache = TTLCache(max_entries=2)
+    cache.set(key("CUST001"), 1, 10)
+    cache.set(key("CUST002"), 2, 10)
+    cache.get(key("CUST001"))
+    cache.set(key("CUST003"), 3, 10)
+    assert cache.get(key("CUST002")) is None
+    assert cache.get(key("CUST001")) == 1 and cache.get(key("CUST003")) == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_and_skips_oversized_bodies():
+    cache = TTLCache(max_bytes=100)
+    cache.set(key("CUST001"), 1, 60)
+    cache.set(key("CUST002"), 2, 60)
+    assert cache.get(key("CUST001")) is None
+    cache.set(key("CUST003"), 3, 101)
+    assert cache.get(key("CUST003")) is None
+    assert cache.stats()["bytes"] == 60
+
+
+def test_invalidate_drops_one_customers_paths():
+    cache = TTLCache()
+    for path in ("/balance", "/account", "/cheque/123456"):
+        cache.set(key("CUST001", path), path, 10)
+    cache.set(key("CUST002"), "other", 10)
+    assert cache.invalidate("CUST001", ("/balance", "/cheque")) == 2
+    assert cache.get(key("CUST001", "/account")) == "/account"
+    assert cache.invalidate("CUST001") == 1
+    assert cache.get(key("CUST002")) == "other"
+
+
+def test_key_ignores_param_order():
+    assert make_key("CUST001", "/statement", {"startDate": "a", "endDate": "b"}) == make_key(
+        "CUST001", "/statement", {"endDate": "b", "startDate": "a"})
+
+
+def test_client_reads_through_the_cache(emulator):
+    first = bankmock.get_json("CUST001", "/balance")
+    assert bankmock.get_json("CUST001", "/balance") == first
+    assert emulator.requests["/balance"] == 1
+    bankmock.get_json("CUST001", "/balance", use_cache=False)
+    assert emulator.requests["/balance"] == 2
+    # Endpoints outside the cacheable list always go upstream
+    bankmock.get_json("CUST001", "/transactions")
+    bankmock.get_json("CUST001", "/transactions")
+    assert emulator.requests["/transactions"] == 2
+
+
+def test_errors_are_not_cached(emulator):
+    for _ in range(2):
+        try:
+            bankmock.get_json("CUST001", "/cheque/12")
+        except Exception:
+            pass
+    assert emulator.requests["/cheque"] == 2
+
+
+def test_writes_invalidate_what_they_change(emulator):
+    before = bankmock.get_json("CUST001", "/balance")["data"]["balance"]
+    bankmock.get_json("CUST001", "/account")
+    bankmock.post("CUST001", "/transfer", json={"amount": 100})
+    assert bankmock.get_json("CUST001", "/balance")["data"]["balance"] == round(before - 100, 2)
+    assert emulator.requests["/balance"] == 2
+    # An OTP request changes nothing that is cached
+    bankmock.get_json("CUST001", "/account")
+    bankmock.post("CUST001", "/generate-otp", json={})
+    bankmock.get_json("CUST001", "/account")
+    assert emulator.requests["/account"] == 2
@@ -0,0 +1,64 @@
+"""Response templates: field formatters, optional lines, locales and JSON output."""
+
+import json
+
+import pytest
+
+import response_templates as templates
+
+
+def test_money_follows_the_locale_grouping():
+    assert templates.money_formatter("en")(1234567) == "₹1,234,567.00"
+    assert templates.money_formatter("en-IN")(1234567.5) == "₹12,34,567.50"
+    assert templates.money_formatter("en")(-42) == "-₹42.00"
+    assert templates.money_formatter("en")(None) == "N/A"
+    assert templates.money_formatter("en")("pending") == "pending"
+
+
+def test_field_specs():
+    templates.register("test_specs", "{when:date} | {kind:label} | {count:number} | {rate:.1f} | {note}")
+    reply = templates.render("test_specs", {
+        "when": "2026-03-04T10:00:00Z", "kind": "CHEQUE_NOT_CREDITED", "count": 12345, "rate": 0.25,
+    })
+    assert reply == "2026-03-04 | CHEQUE NOT CREDITED | 12,345 | 0.2 | N/A"
+
+
+def test_optional_lines_need_every_field():
+    templates.register("test_optional", "Case {caseId}\n?Cheque: #{chequeNumber}\nStatus: {status}")
+    assert templates.render("test_optional", {"caseId": "CASE-1", "chequeNumber": "100001", "status": "OPEN"}) == (
+        "Case CASE-1\nCheque: #100001\nStatus: OPEN")
+    assert templates.render("test_optional", {"caseId": "CASE-1", "chequeNumber": "", "status": "OPEN"}) == (
+        "Case CASE-1\nStatus: OPEN")
+
+
+def test_literal_braces_survive_compilation():
+    templates.register("test_braces", "{{literal}} {value}")
+    assert templates.render("test_braces", {"value": 1}) == "{literal} 1"
+
+
+def test_locale_templates_fall_back_to_the_language_then_en():
+    templates.register("test_locale", "Balance: {amount:money}")
+    templates.register("test_locale", "Shesh: {amount:money}", locale="en-IN")
+    assert templates.render("test_locale", {"amount": 100000}, locale="en") == "Balance: ₹100,000.00"
+    assert templates.render("test_locale", {"amount": 100000}, locale="en-IN") == "Shesh: ₹1,00,000.00"
+    assert templates.render("test_locale", {"amount": 100000}, locale="fr") == "Balance: ₹100,000.00"
+
+
+def test_register_replaces_a_compiled_template():
+    templates.register("test_replace", "old {x}")
+    assert templates.render("test_replace", {"x": 1}) == "old 1"
+    templates.register("test_replace", "new {x}")
+    assert templates.render("test_replace", {"x": 1}) == "new 1"
+
+
+def test_unknown_template_raises():
+    with pytest.raises(KeyError):
+        templates.template("test_missing")
+
+
+def test_json_output_is_compact_and_skips_empty_fields():
+    templates.register("test_json", "Case {caseId}")
+    reply = templates.render("test_json", {"caseId": "CASE-1", "resolution": None, "amount": 2500.0}, "json")
+    assert json.loads(reply) == {"response": "test_json", "caseId": "CASE-1", "amount": 2500.0}
+    assert " " not in reply
+    assert templates.wants_json(" JSON ") and not templates.wants_json("text")
@@ -0,0 +1,90 @@
+"""Single-flight: identical concurrent reads share one upstream call, for threads, tasks and the client."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bankmock_client as bankmock
+from singleflight import SingleFlight
+
+
+def wait_for_calls(flight, count):
+    deadline = time.monotonic() + 5
+    while flight.stats()["calls"] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def fetch():
+        runs.append(1)
+        release.wait(5)
+        return {"balance": 100}
+
+    with ThreadPoolExecutor(5) as pool:
+        futures = [pool.submit(flight.do, "balance", fetch) for _ in range(5)]
+        wait_for_calls(flight, 5)
+        release.set()
+        results = [f.result() for f in futures]
+    assert results == [{"balance": 100}] * 5 and len(runs) == 1
+    assert flight.stats() == {"calls": 5, "upstream_requests": 1, "coalesced": 4, "dedup_ratio": 0.8,
+                              "in_flight": 0}
+
+
+def test_waiters_get_the_leaders_exception_and_the_next_call_runs_again():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ConnectionError("reset")
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(flight.do, "balance", fail) for _ in range(3)]
+        wait_for_calls(flight, 3)
+        release.set()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+    assert flight.do("balance", lambda: "ok") == "ok"
+    assert flight.stats()["upstream_requests"] == 2
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key) for key in ("a", "b")] == ["a", "b"]
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_tasks_share_one_call_and_survive_a_cancelled_waiter():
+    flight = SingleFlight()
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "data"
+
+    async def main():
+        waiters = [asyncio.ensure_future(flight.ado("balance", fetch)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+        return await asyncio.gather(*waiters[1:])
+
+    assert asyncio.run(main()) == ["data"] * 3
+    assert len(runs) == 1 and flight.stats()["in_flight"] == 0
+
+
+def test_client_coalesces_identical_reads(emulator):
+    emulator.config.latency_ms = 200
+    with ThreadPoolExecutor(5) as pool:
+        results = list(pool.map(lambda _: bankmock.get_json("CUST001", "/transactions", {"limit": 5}), range(5)))
+    assert all(r == results[0] for r in results)
+    assert emulator.requests["/transactions"] == 1
@@ -0,0 +1,75 @@
+"""Token budgets: text and JSON trimming strategies and the @budgeted wrapper."""
+
+import json
+
+import token_budget
+from token_budget import estimate_tokens, trim
+
+
+def listing(count, header="Recent transactions:"):
+    rows = [f"{n}. 2026-01-{n % 28 + 1:02d} | Grocery Store | ₹{n * 10}.00" for n in range(1, count + 1)]
+    return "\n".join([header] + rows)
+
+
+def test_replies_within_budget_are_untouched():
+    text = listing(5)
+    assert trim(text, estimate_tokens(text)) == (text, [])
+    assert trim(text, 0) == (text, [])
+    assert estimate_tokens("abcd") == 1 and estimate_tokens("abcde") == 2
+
+
+def test_long_lists_keep_their_head_and_last_item():
+    text, strategies = trim(listing(60), 300)
+    lines = text.split("\n")
+    assert strategies == ["list"] and estimate_tokens(text) <= 300
+    assert lines[:4] == listing(60).split("\n")[:4]
+    assert lines[-1].startswith("60. ")
+    assert lines[-2].endswith("more not shown")
+    dropped = int(lines[-2].split()[1])
+    assert len(lines) - 2 + dropped == 60
+
+
+def test_long_lines_are_clipped():
+    text, strategies = trim("Description: " + "x" * 1000, 100)
+    assert "line" in strategies and estimate_tokens(text) <= 100
+    assert len(text.split("\n")[0]) == token_budget.MAX_LINE_CHARS
+
+
+def test_field_blocks_are_cut_rather_than_shortened():
+    block = "\n".join(f"• Field {n}: {'value ' * 10}" for n in range(token_budget.MIN_SHORTENED_RUN))
+    text, strategies = trim(block, 60)
+    assert strategies == ["cut"]
+    assert text.split("\n")[-1] == "… (reply shortened)"
+    assert "more not shown" not in text
+
+
+def test_paged_replies_keep_the_cursor_after_a_cut():
+    paged = listing(60) + "\nMore: call again with cursor='abc123'"
+    text, strategies = trim(paged, 200)
+    assert strategies == ["cut"] and "more not shown" not in text
+    assert text.split("\n")[-2:] == ["… (reply shortened)", "More: call again with cursor='abc123'"]
+
+
+def test_json_replies_stay_valid():
+    rows = [{"n": n, "d": "Grocery"} for n in range(80)]
+    reply = json.dumps({"response": "transactions", "data": {"transactions": rows}})
+    text, strategies = trim(reply, 150)
+    data = json.loads(text)
+    assert strategies == ["list"] and estimate_tokens(text) <= 150
+    kept = data["data"]["transactions"]
+    assert kept[0]["n"] == 0 and len(kept) + data["data"]["transactionsOmitted"] == 80
+
+
+def test_budgeted_uses_the_tools_budget(monkeypatch):
+    monkeypatch.setitem(token_budget.TOOL_BUDGETS, "get_transaction_history", 120)
+
+    @token_budget.budgeted
+    def get_transaction_history(customer_id: str) -> str:
+        return listing(60)
+
+    @token_budget.budgeted
+    def get_card_status(customer_id: str):
+        return {"status": "ACTIVE"}
+
+    assert estimate_tokens(get_transaction_history("CUST001")) <= 120
+    assert get_card_status("CUST001") == {"status": "ACTIVE"}
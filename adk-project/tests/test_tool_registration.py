@@ -0,0 +1,75 @@
+"""Agent tool registration, read from the tool modules' source so it runs without the watsonx Orchestrate ADK."""
+
+import ast
+import glob
+import os
+import re
+
+import pytest
+
+import intent_router
+
+ADK_PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOL_MODULES = ("banking_info_tools", "card_tools", "case_tools", "otp_tools")
+# Every agent tool's decorators, outermost first
+TOOL_STACK = ("tool", "metrics.instrumented", "token_budget.budgeted")
+
+
+def _decorator_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Call):
+        node = node.func
+    return ast.unparse(node)
+
+
+def registered_tools() -> dict:
+    """{module: {function: [decorator, …]}} for every function decorated with @tool()."""
+    tools = {}
+    for module in TOOL_MODULES:
+        with open(os.path.join(ADK_PROJECT, "tools", f"{module}.py"), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        tools[module] = {
+            node.name: [_decorator_name(d) for d in node.decorator_list]
+            for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and any(_decorator_name(d) == "tool" for d in node.decorator_list)
+        }
+    return tools
+
+
+def agent_tool_names() -> set:
+    names = set()
+    for path in glob.glob(os.path.join(ADK_PROJECT, "agents", "*.yaml")):
+        with open(path, encoding="utf-8") as f:
+            block = re.search(r"^tools:\n((?:[ \t]+- .*\n?)*)", f.read(), re.M)
+        if block:
+            names.update(re.findall(r"- (\w+)", block.group(1)))
+    return names
+
+
+def test_private_helpers_are_not_tools():
+    for module, tools in registered_tools().items():
+        assert not [name for name in tools if name.startswith("_")], module
+
+
+@pytest.mark.parametrize("module", TOOL_MODULES)
+def test_tools_carry_the_full_decorator_stack(module):
+    for name, decorators in registered_tools()[module].items():
+        assert tuple(decorators[:len(TOOL_STACK)]) == TOOL_STACK, name
+        assert decorators[-1] == "rate_limiter.limited", name
+
+
+def test_every_tool_an_agent_lists_is_registered():
+    registered = {name for tools in registered_tools().values() for name in tools}
+    assert agent_tool_names() - registered == set()
+
+
+def test_every_router_target_is_a_registered_tool():
+    tools = registered_tools()
+    targets = {intent.tool for intent in intent_router.INTENTS if intent.tool} | {intent_router.SNAPSHOT_TOOL}
+    for target in targets:
+        module, _, name = target.partition(":")
+        assert name in tools[module], target
+
+
+def test_list_complaint_cases_is_a_tool():
+    assert "list_complaint_cases" in registered_tools()["case_tools"]
@@ -0,0 +1,91 @@
+"""Traffic recording and offline replay: what a recorded call holds, and replaying it against the tools."""
+
+import json
+
+import pytest
+import requests
+
+import bankmock_client as bankmock
+import metrics
+import replay
+import traffic_recorder
+
+
+@metrics.instrumented
+def account_number(customer_id: str) -> str:
+    data = bankmock.get_json(customer_id, "/account", use_cache=False)["data"]
+    return f"Account {data['accountNumber']} ({data['accountType']}) opened 2026-01-01"
+
+
+@metrics.instrumented
+def account_summary(customer_id: str) -> str:
+    return account_number(customer_id) + " | " + str(bankmock.get_json(customer_id, "/balance", use_cache=False))
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """Record instrumented calls to a temporary file through the call and exchange hooks."""
+    recorder = traffic_recorder.TrafficRecorder(str(tmp_path / "traffic.jsonl"))
+    monkeypatch.setattr(metrics, "_call_hooks", [recorder.on_call])
+    monkeypatch.setattr(bankmock, "_exchange_hooks", [recorder.on_exchange])
+    return recorder
+
+
+def test_a_recorded_call_holds_its_exchanges(emulator, recording):
+    with traffic_recorder.conversation("conv-1"):
+        reply = account_number("CUST001")
+    (record,) = replay.load(recording.path)
+    assert (record["tool"], record["module"], record["conversation"]) == ("account_number", __name__, "conv-1")
+    assert (record["args"], record["kwargs"], record["reply"]) == (["CUST001"], {}, reply)
+    (exchange,) = record["upstream"]
+    assert (exchange["customer"], exchange["method"], exchange["path"], exchange["status"]) == (
+        "CUST001", "GET", "/account", 200)
+    assert json.loads(exchange["body"])["success"] is True
+
+
+def test_nested_calls_belong_to_the_outer_record(emulator, recording):
+    account_summary("CUST001")
+    (record,) = replay.load(recording.path)
+    assert record["tool"] == "account_summary" and record["conversation"] is None
+    assert [x["path"] for x in record["upstream"]] == ["/account", "/balance"]
+
+
+def test_unsampled_calls_are_not_recorded(emulator, recording, tmp_path):
+    recording.sample = 0.0
+    account_number("CUST001")
+    assert not (tmp_path / "traffic.jsonl").exists()
+
+
+def test_load_skips_torn_lines_and_orders_by_time(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    path.write_text('{"ts": 2, "tool": "b"}\n{"ts": 1, "tool": "a"}\n{"ts": 3, "to')
+    assert [r["tool"] for r in replay.load(str(path))] == ["a", "b"]
+    assert [r["tool"] for r in replay.load(str(path), tools={"b"})] == ["b"]
+
+
+def test_volatile_parts_are_masked_and_case_ids_carried_over():
+    assert replay.normalise("Case CASE-1-AB12C on 2026-01-02T10:00:00Z, OTP **123456**") == (
+        "Case CASE-… on <time>, OTP **<otp>**")
+    case_ids = replay.CaseIds()
+    case_ids.learn("Case CASE-1-AB12C created", "Case CASE-9-ZZ99Z created")
+    assert case_ids.rewrite({"case_id": "CASE-1-AB12C", "args": ["CASE-2-XX00X"]}) == {
+        "case_id": "CASE-9-ZZ99Z", "args": ["CASE-2-XX00X"]}
+
+
+def test_replay_answers_from_the_recording(emulator, recording):
+    for customer_id in ("CUST001", "CUST002", "CUST001"):
+        account_number(customer_id)
+    records = replay.load(recording.path)
+    server = replay.RecordedBankMock(records)
+    bankmock.configure(base_url=server.start())
+    try:
+        summary = replay.summarise(records, replay.run_timed(records, server, 0, 2, replay.CaseIds()))
+        assert summary["diffs"] == []
+        assert summary["tools"]["account_number"]["calls"] == 3
+        assert server.served == 3 and not server.missed
+        # Requests the recording never saw are misses, not calls to BankMOCK
+        with pytest.raises(requests.HTTPError):
+            account_number("CUST999")
+        assert server.missed == {"GET /account": 1}
+    finally:
+        server.stop()
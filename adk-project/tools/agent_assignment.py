@@ -0,0 +1,220 @@
+"""
+Load-aware human-agent assignment for escalated cases
+
+Each agent on the roster has a capacity (open escalations they can carry) and
+skills (the complaint types they handle). An escalation goes to the qualified
+agent with the lowest load relative to capacity. Agents under capacity are
+always preferred, but when everyone is full the case still goes to the least
+overloaded agent rather than failing.
+
+Every skill has a min-heap of (load / capacity, load, name, version) entries.
+A load change pushes a fresh entry for the agent into each of its skill heaps
+and bumps its version, and stale entries are dropped when they reach the top.
+assign() and release() therefore cost O(k log n) for an agent with k skills.
+
+Loads start from the case store (ESCALATED cases per assignedAgent) and are
+re-read every LOAD_REFRESH_SECONDS, so workers that share the store converge
+on the same counts.
+
+The estimated contact time grows with the agent's queue:
+BASE_CONTACT_MINUTES + escalations already queued × HANDLE_MINUTES.
+
+Configuration (environment variables):
+  - ESCALATION_ROSTER                – JSON file: [{"name", "skills": [...], "capacity"}]
+  - ESCALATION_HANDLE_MINUTES        – average minutes an agent spends per escalation (default 15)
+  - ESCALATION_BASE_CONTACT_MINUTES  – contact time for an agent with an empty queue (default 10)
+  - ESCALATION_LOAD_REFRESH_SECONDS  – how often loads are re-read from the case store (default 30)
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, NamedTuple, Optional
+
+import metrics
+from case_repository import get_repository
+
+HANDLE_MINUTES = float(os.environ.get("ESCALATION_HANDLE_MINUTES", 15))
+BASE_CONTACT_MINUTES = float(os.environ.get("ESCALATION_BASE_CONTACT_MINUTES", 10))
+LOAD_REFRESH_SECONDS = float(os.environ.get("ESCALATION_LOAD_REFRESH_SECONDS", 30))
+
+# Skill used when no agent lists the complaint type
+GENERAL_SKILL = "GENERAL_COMPLAINT"
+
+
+@dataclass(frozen=True)
+class Agent:
+    name: str
+    skills: tuple
+    capacity: int = 8
+
+
+DEFAULT_ROSTER = (
+    Agent("Priya Verma", ("CHEQUE_NOT_CREDITED", "MISSING_TRANSACTION", GENERAL_SKILL)),
+    Agent("Rohit Sharma", ("CARD_ISSUE", GENERAL_SKILL)),
+    Agent("Anita Desai", ("CHEQUE_NOT_CREDITED", "CARD_ISSUE", GENERAL_SKILL)),
+    Agent("Karan Mehta", ("MISSING_TRANSACTION", "CARD_ISSUE", GENERAL_SKILL)),
+)
+
+
+class Assignment(NamedTuple):
+    agent: str
+    # Escalations the agent already had open before this one
+    queue_depth: int
+    eta_minutes: int
+
+
+def load_roster(path: Optional[str] = None) -> tuple:
+    """Read the roster from ESCALATION_ROSTER (or path), falling back to DEFAULT_ROSTER."""
+    path = path or os.environ.get("ESCALATION_ROSTER")
+    if not path:
+        return DEFAULT_ROSTER
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return tuple(
+        Agent(e["name"], tuple(s.upper() for s in e.get("skills", (GENERAL_SKILL,))), int(e.get("capacity", 8)))
+        for e in entries
+    )
+
+
+def estimate_contact_minutes(queue_depth: int) -> int:
+    """Minutes until an agent with queue_depth open escalations reaches a new one, rounded up to 5."""
+    minutes = BASE_CONTACT_MINUTES + queue_depth * HANDLE_MINUTES
+    return int(-(-minutes // 5) * 5)
+
+
+class AssignmentEngine:
+    def __init__(self, roster: tuple = DEFAULT_ROSTER, load_source: Optional[Callable[[], dict]] = None,
+                 refresh_seconds: float = LOAD_REFRESH_SECONDS, clock: Callable[[], float] = time.monotonic):
+        if not roster:
+            raise ValueError("The escalation roster is empty")
+        self.agents = {a.name: a for a in roster}
+        self._load_source = load_source
+        self._refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._loads = {name: 0 for name in self.agents}
+        self._versions = {name: 0 for name in self.agents}
+        self._heaps: dict = {}
+        for agent in roster:
+            for skill in agent.skills:
+                self._heaps.setdefault(skill, [])
+        self._last_refresh = None
+        with self._lock:
+            self._rebuild()
+
+    # ── heap maintenance ─────────────────────────────────────────────────────
+    def _entry(self, name: str) -> tuple:
+        load = self._loads[name]
+        return (load / self.agents[name].capacity, load, name, self._versions[name])
+
+    def _rebuild(self) -> None:
+        for skill in self._heaps:
+            self._heaps[skill] = [self._entry(a.name) for a in self.agents.values() if skill in a.skills]
+            heapq.heapify(self._heaps[skill])
+
+    def _set_load(self, name: str, load: int) -> None:
+        self._loads[name] = max(0, load)
+        self._versions[name] += 1
+        entry = self._entry(name)
+        for skill in self.agents[name].skills:
+            heap = self._heaps[skill]
+            heapq.heappush(heap, entry)
+            # Stale entries only leave from the top; compact before they dominate the heap
+            if len(heap) > 4 * len(self.agents) + 64:
+                self._heaps[skill] = [e for e in heap if e[3] == self._versions[e[2]]]
+                heapq.heapify(self._heaps[skill])
+
+    def _least_loaded(self, skill: str) -> Optional[str]:
+        heap = self._heaps.get(skill)
+        while heap:
+            _, _, name, version = heap[0]
+            if version == self._versions[name]:
+                return name
+            heapq.heappop(heap)
+        return None
+
+    def _maybe_refresh(self) -> None:
+        if self._load_source is None:
+            return
+        now = self._clock()
+        if self._last_refresh is not None and now - self._last_refresh < self._refresh_seconds:
+            return
+        self._last_refresh = now
+        counts = self._load_source()
+        for name in self.agents:
+            self._loads[name] = counts.get(name, 0)
+            self._versions[name] += 1
+        self._rebuild()
+
+    # ── public API ───────────────────────────────────────────────────────────
+    def assign(self, complaint_type: Optional[str] = None) -> Assignment:
+        """Pick the least-loaded agent qualified for complaint_type and count the escalation against them."""
+        skill = (complaint_type or GENERAL_SKILL).upper()
+        with self._lock:
+            self._maybe_refresh()
+            name = self._least_loaded(skill) or self._least_loaded(GENERAL_SKILL)
+            if name is None:
+                name = min(self.agents, key=lambda n: self._entry(n)[:3])
+            depth = self._loads[name]
+            self._set_load(name, depth + 1)
+        return Assignment(name, depth, estimate_contact_minutes(depth))
+
+    def current(self, name: str) -> Assignment:
+        """Queue position of an escalation already assigned to name (it counts as the last one in)."""
+        with self._lock:
+            depth = max(0, self._loads.get(name, 1) - 1)
+        return Assignment(name, depth, estimate_contact_minutes(depth))
+
+    def release(self, name: Optional[str]) -> None:
+        """An escalation assigned to name was closed."""
+        if name not in self.agents:
+            return
+        with self._lock:
+            self._set_load(name, self._loads[name] - 1)
+
+    def loads(self) -> dict:
+        with self._lock:
+            return dict(self._loads)
+
+
+def _store_loads() -> dict:
+    return get_repository().count_by_agent(status="ESCALATED")
+
+
+_engine: Optional[AssignmentEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AssignmentEngine:
+    """Return the process-wide engine for the configured roster, seeded from the case store."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AssignmentEngine(load_roster(), load_source=_store_loads)
+    return _engine
+
+
+def set_engine(engine: AssignmentEngine) -> None:
+    """Swap the engine, e.g. for one with a test roster."""
+    global _engine
+    _engine = engine
+
+
+def _collect_metrics() -> list:
+    if _engine is None:
+        return []
+    engine = _engine
+    return (
+        metrics.gauge_lines("swiftbank_agent_open_escalations", "Open escalations per agent.",
+                            {(name,): load for name, load in engine.loads().items()}, ("agent",))
+        + metrics.gauge_lines("swiftbank_agent_capacity", "Escalation capacity per agent.",
+                              {(name,): a.capacity for name, a in engine.agents.items()}, ("agent",))
+    )
+
+
+metrics.register_collector(_collect_metrics)
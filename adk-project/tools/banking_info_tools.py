@@ -7,147 +7,534 @@ Tools:
   - get_recent_transactions
   - get_account_details
   - get_cheque_status
+  - get_account_snapshot  – balance, account/card and recent transactions in one call
+  - get_transaction_history – summary or paged listing of any date range
+  - summarize_transactions  – totals, grouped spend, rolling averages and unusual debits
 
-All tools call the BankMOCK API: https://bankmock-theta.vercel.app/api/v1
+All tools call the BankMOCK API through the shared pooled client in
+bankmock_client.py (base URL: https://bankmock-theta.vercel.app/api/v1).
 The customer_id is passed as a parameter and forwarded as X-Customer-ID header.
+
+Each tool is implemented as a coroutine (<tool>_async) that can be awaited
+directly or fanned out with asyncio.gather; the @tool() functions are thin
+synchronous wrappers that run it on the client's shared event loop.
+
+Replies are rendered from the templates registered below (see
+response_templates.py). The balance, transactions, account details, cheque
+and snapshot tools also accept output_format='json' for compact output.
+
+get_cheque_status answers from the cheque watcher's state while it is fresh
+and hands cheques it finds still pending to the watcher (cheque_watcher.py).
 """
 
-import requests
+import asyncio
+import datetime
+from collections import Counter
+from typing import Optional
+
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
 
-BANKMOCK_BASE = "https://bankmock-theta.vercel.app/api/v1"
+import bankmock_client as bankmock
+import cheque_watcher
+import metrics
+import rate_limiter
+import response_templates as templates
+import token_budget
+import warmup
+import transaction_analytics
+from lazy_imports import lazy_module
+from transaction_stream import DEFAULT_RANGE_DAYS, TransactionStream, parse_date
+
+requests = lazy_module("requests")
+
+MAX_HISTORY_PAGE_SIZE = 50
+# Upper bound on rows scanned for one summary, to keep a single tool call bounded in time
+MAX_SUMMARY_TRANSACTIONS = 10000
+
+
+templates.register("balance", "Account balance for {accountNumber}: {balance:money}")
+templates.register("transaction_line", "{index}. [{type}] {sign}{amount:money} | {description} | {date}")
+templates.register("account_details", (
+    "Account Details:\n"
+    "• Account Number: {accountNumber}\n"
+    "• Account Type:   {accountType}\n"
+    "• Branch:         {branch}\n"
+    "• IFSC:           {ifsc}\n"
+    "• Status:         {status}"
+))
+templates.register("cheque_status", (
+    "Cheque #{chequeNumber} Status:\n"
+    "• Amount:             {amount:money}\n"
+    "• Status:             {status}\n"
+    "• Expected Clearance: {expectedClearanceDate}"
+))
+
+
+def _balance_values(data: dict) -> dict:
+    bal = data.get("data", data)
+    amount = bal.get("balance") or bal.get("availableBalance") or bal.get("currentBalance")
+    return {"accountNumber": bal.get("accountNumber", ""), "balance": amount, "currency": bal.get("currency", "INR")}
+
+
+def _format_balance(data: dict, output_format: Optional[str] = None) -> str:
+    values = _balance_values(data)
+    if not isinstance(values["balance"], (int, float)) and not templates.wants_json(output_format):
+        return f"Balance: {values['balance'] or 'N/A'}"
+    return templates.render("balance", values, output_format)
+
+
+def _format_cheque(cheque_number: str, c: dict, output_format: Optional[str] = None) -> str:
+    return templates.render("cheque_status", {
+        "chequeNumber": cheque_number,
+        "amount": c.get("amount"),
+        "status": c.get("status"),
+        "expectedClearanceDate": c.get("expectedClearanceDate"),
+    }, output_format)
+
+
+def _transaction_values(t: dict) -> dict:
+    return {
+        "type": t.get("type", "?"),
+        "amount": t.get("amount", 0),
+        "description": t.get("description") or t.get("transactionId", "N/A"),
+        "date": (t.get("timestamp") or "")[:10],
+    }
+
+
+def _transactions_values(data: dict, limit: int) -> list:
+    raw = data.get("data", data)
+    txns = raw.get("transactions", raw) if isinstance(raw, dict) else raw
+    return [_transaction_values(t) for t in (txns or [])[:limit]]
+
+
+def _format_transactions(data: dict, limit: int, output_format: Optional[str] = None) -> str:
+    txns = _transactions_values(data, limit)
+    if templates.wants_json(output_format):
+        return templates.to_json("transactions", {"transactions": txns})
+
+    if not txns:
+        return "No transactions found."
+
+    line = templates.template("transaction_line")
+    lines = [line.render({**v, "index": i, "sign": "+" if v["type"] == "CREDIT" else "-"}) for i, v in enumerate(txns, 1)]
+    return "Recent transactions:\n" + "\n".join(lines)
+
+
+def _format_transaction_line(i: int, t: dict) -> str:
+    v = _transaction_values(t)
+    return templates.template("transaction_line").render({**v, "index": i, "sign": "+" if v["type"] == "CREDIT" else "-"})
 
 
-def _headers(customer_id: str) -> dict:
+def _account_values(data: dict) -> dict:
+    acc = data.get("data", data)
     return {
-        "Content-Type": "application/json",
-        "X-Customer-ID": customer_id,
+        "accountNumber": acc.get("accountNumber"),
+        "accountType": acc.get("accountType"),
+        "branch": acc.get("branch"),
+        "ifsc": acc.get("ifsc"),
+        "status": acc.get("accountStatus") or acc.get("status", "Active"),
     }
 
 
+def _format_account_details(data: dict, output_format: Optional[str] = None) -> str:
+    return templates.render("account_details", _account_values(data), output_format)
+
+
+async def get_account_balance_async(customer_id: str, output_format: Optional[str] = None) -> str:
+    """Async implementation of get_account_balance."""
+    try:
+        return _format_balance(await bankmock.aget_json(customer_id, "/balance"), output_format)
+    except requests.HTTPError as e:
+        return f"Error retrieving balance: {e.response.status_code} – {e.response.text}"
+    except Exception as e:
+        return f"Failed to retrieve balance: {str(e)}"
+
+
 @tool()
-def get_account_balance(customer_id: str) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_account_balance(customer_id: str, output_format: Optional[str] = None) -> str:
     """Retrieve the current account balance for the authenticated customer.
 
     Args:
         customer_id (str): The unique customer identifier extracted from the authenticated session.
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
 
     Returns:
         str: A formatted string with the current account balance.
     """
+    return bankmock.run_sync(get_account_balance_async(customer_id, output_format))
+
+
+async def get_recent_transactions_async(customer_id: str, limit: int = 5, output_format: Optional[str] = None) -> str:
+    """Async implementation of get_recent_transactions."""
     try:
-        resp = requests.get(f"{BANKMOCK_BASE}/balance", headers=_headers(customer_id), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        bal = data.get("data", data)
-        amount = bal.get("balance") or bal.get("availableBalance") or bal.get("currentBalance") or "N/A"
-        acct = bal.get("accountNumber", "")
-        return f"Account balance for {acct}: ₹{amount:,.2f}" if isinstance(amount, (int, float)) else f"Balance: {amount}"
+        limit = min(max(1, limit), 20)
+        data = await bankmock.aget_json(customer_id, "/transactions", params={"limit": limit})
+        return _format_transactions(data, limit, output_format)
     except requests.HTTPError as e:
-        return f"Error retrieving balance: {e.response.status_code} – {e.response.text}"
+        return f"Error retrieving transactions: {e.response.status_code}"
     except Exception as e:
-        return f"Failed to retrieve balance: {str(e)}"
+        return f"Failed to retrieve transactions: {str(e)}"
 
 
 @tool()
-def get_recent_transactions(customer_id: str, limit: int = 5) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_recent_transactions(customer_id: str, limit: int = 5, output_format: Optional[str] = None) -> str:
     """Retrieve the most recent transactions for the authenticated customer.
 
     Args:
         customer_id (str): The unique customer identifier extracted from the authenticated session.
         limit (int): Number of transactions to return. Defaults to 5. Maximum 20.
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
 
     Returns:
         str: A formatted list of recent transactions.
     """
+    return bankmock.run_sync(get_recent_transactions_async(customer_id, limit, output_format))
+
+
+async def get_account_details_async(customer_id: str, output_format: Optional[str] = None) -> str:
+    """Async implementation of get_account_details."""
     try:
-        limit = min(max(1, limit), 20)
-        resp = requests.get(
-            f"{BANKMOCK_BASE}/transactions?limit={limit}",
-            headers=_headers(customer_id),
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        raw = data.get("data", data)
-        txns = raw.get("transactions", raw) if isinstance(raw, dict) else raw
-
-        if not txns:
-            return "No transactions found."
-
-        lines = []
-        for i, t in enumerate(txns[:limit], 1):
-            sign = "+" if t.get("type") == "CREDIT" else "-"
-            lines.append(
-                f"{i}. [{t.get('type','?')}] {sign}₹{t.get('amount', 0):,} | "
-                f"{t.get('description') or t.get('transactionId','N/A')} | "
-                f"{t.get('timestamp','')[:10]}"
-            )
-        return "Recent transactions:\n" + "\n".join(lines)
+        return _format_account_details(await bankmock.aget_json(customer_id, "/account"), output_format)
     except requests.HTTPError as e:
-        return f"Error retrieving transactions: {e.response.status_code}"
+        return f"Error retrieving account details: {e.response.status_code}"
     except Exception as e:
-        return f"Failed to retrieve transactions: {str(e)}"
+        return f"Failed to retrieve account details: {str(e)}"
 
 
 @tool()
-def get_account_details(customer_id: str) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_account_details(customer_id: str, output_format: Optional[str] = None) -> str:
     """Retrieve account details such as account number, type, branch, and IFSC for the authenticated customer.
 
     Args:
         customer_id (str): The unique customer identifier extracted from the authenticated session.
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
 
     Returns:
         str: A formatted string with the account details.
     """
+    return bankmock.run_sync(get_account_details_async(customer_id, output_format))
+
+
+async def get_cheque_status_async(customer_id: str, cheque_number: str, output_format: Optional[str] = None) -> str:
+    """Async implementation of get_cheque_status. Answers from the cheque watcher's state when it is fresh."""
+    # The watcher's store is SQLite by default: keep its reads and writes off the shared event loop
+    loop = asyncio.get_running_loop()
+    known = await loop.run_in_executor(None, cheque_watcher.lookup, customer_id, cheque_number)
+    if known is not None:
+        return _format_cheque(cheque_number, known, output_format)
     try:
-        resp = requests.get(f"{BANKMOCK_BASE}/account", headers=_headers(customer_id), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        acc = data.get("data", data)
-        return (
-            f"Account Details:\n"
-            f"• Account Number: {acc.get('accountNumber', 'N/A')}\n"
-            f"• Account Type:   {acc.get('accountType', 'N/A')}\n"
-            f"• Branch:         {acc.get('branch', 'N/A')}\n"
-            f"• IFSC:           {acc.get('ifsc', 'N/A')}\n"
-            f"• Status:         {acc.get('accountStatus') or acc.get('status', 'Active')}"
-        )
+        data = await bankmock.aget_json(customer_id, f"/cheque/{cheque_number}")
+        c = data.get("data", data)
+        cheque_watcher.served.inc("upstream")
+        await loop.run_in_executor(None, cheque_watcher.observe, customer_id, cheque_number, c)
+        return _format_cheque(cheque_number, c, output_format)
     except requests.HTTPError as e:
-        return f"Error retrieving account details: {e.response.status_code}"
+        if e.response.status_code == 404:
+            return f"Cheque #{cheque_number} was not found. Please verify the cheque number."
+        return f"Error retrieving cheque status: {e.response.status_code}"
     except Exception as e:
-        return f"Failed to retrieve account details: {str(e)}"
+        return f"Failed to retrieve cheque status: {str(e)}"
 
 
 @tool()
-def get_cheque_status(customer_id: str, cheque_number: str) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_cheque_status(customer_id: str, cheque_number: str, output_format: Optional[str] = None) -> str:
     """Retrieve the clearing status of a deposited cheque.
 
     Args:
         customer_id (str): The unique customer identifier extracted from the authenticated session.
         cheque_number (str): The cheque number to look up (6 or more digits).
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
 
     Returns:
         str: The cheque status including amount, clearing date, and current status.
     """
+    return bankmock.run_sync(get_cheque_status_async(customer_id, cheque_number, output_format))
+
+
+def _section(label: str, result, render) -> str:
+    """Render one snapshot section, or a one-line error if its request failed."""
+    if isinstance(result, requests.HTTPError):
+        return f"{label}: unavailable (error {result.response.status_code})"
+    if isinstance(result, BaseException):
+        return f"{label}: unavailable ({str(result) or type(result).__name__})"
     try:
-        resp = requests.get(
-            f"{BANKMOCK_BASE}/cheque/{cheque_number}",
-            headers=_headers(customer_id),
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        c = data.get("data", data)
-        return (
-            f"Cheque #{cheque_number} Status:\n"
-            f"• Amount:             ₹{c.get('amount', 'N/A')}\n"
-            f"• Status:             {c.get('status', 'N/A')}\n"
-            f"• Expected Clearance: {c.get('expectedClearanceDate', 'N/A')}"
+        return render(result)
+    except Exception as e:
+        return f"{label}: unavailable ({str(e)})"
+
+
+def _json_section(result, extract):
+    """Values of one snapshot section for JSON output, or {"error": ...} if its request failed."""
+    if isinstance(result, requests.HTTPError):
+        return {"error": result.response.status_code}
+    if isinstance(result, BaseException):
+        return {"error": str(result) or type(result).__name__}
+    try:
+        return extract(result)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _card_status(data: dict) -> str:
+    acc = data.get("data", data)
+    # Same rule as card_tools.get_card_status: BankMOCK infers card status from account status
+    acct_status = acc.get("accountStatus") or acc.get("status", "Active")
+    return "ACTIVE" if acct_status in ("Active", "active", "ACTIVE") else "BLOCKED"
+
+
+async def get_account_snapshot_async(customer_id: str, transaction_limit: int = 5,
+                                     output_format: Optional[str] = None) -> str:
+    """Async implementation of get_account_snapshot."""
+    limit = min(max(1, transaction_limit), 20)
+    balance, account, txns = await asyncio.gather(
+        bankmock.aget_json(customer_id, "/balance"),
+        bankmock.aget_json(customer_id, "/account"),
+        bankmock.aget_json(customer_id, "/transactions", params={"limit": limit}),
+        return_exceptions=True,
+    )
+    if all(isinstance(r, BaseException) for r in (balance, account, txns)):
+        return f"Failed to retrieve account snapshot: {str(balance) or type(balance).__name__}"
+
+    if templates.wants_json(output_format):
+        return templates.to_json("account_snapshot", {
+            "balance": _json_section(balance, _balance_values),
+            "account": _json_section(account, _account_values),
+            "cardStatus": _json_section(account, _card_status),
+            "transactions": _json_section(txns, lambda data: _transactions_values(data, limit)),
+        })
+
+    return "\n\n".join([
+        _section("Balance", balance, lambda data: _format_balance(data, "text")),
+        _section("Account Details", account, lambda data: _format_account_details(data, "text")),
+        _section("Card Status", account, lambda data: f"Card Status: {_card_status(data)}"),
+        _section("Recent transactions", txns, lambda data: _format_transactions(data, limit, "text")),
+    ])
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_account_snapshot(customer_id: str, transaction_limit: int = 5, output_format: Optional[str] = None) -> str:
+    """Retrieve the balance, account details, card status and recent transactions in a single call.
+
+    Use this instead of calling get_account_balance, get_account_details and
+    get_recent_transactions one after another when the customer wants an overview
+    of their account. Sections that cannot be retrieved are marked unavailable.
+
+    Args:
+        customer_id (str): The unique customer identifier extracted from the authenticated session.
+        transaction_limit (int): Number of recent transactions to include. Defaults to 5. Maximum 20.
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
+
+    Returns:
+        str: A combined summary with one section per data source.
+    """
+    return bankmock.run_sync(get_account_snapshot_async(customer_id, transaction_limit, output_format))
+
+
+def _summarize_history(stream: TransactionStream) -> str:
+    count = credits = debits = 0
+    total_credit = total_debit = 0.0
+    largest = None
+    spend = Counter()
+    newest = oldest = ""
+    for t in stream:
+        amount = float(t.get("amount") or 0)
+        ts = (t.get("timestamp") or "")[:10]
+        newest = newest or ts
+        oldest = ts or oldest
+        count += 1
+        if t.get("type") == "CREDIT":
+            credits += 1
+            total_credit += amount
+        else:
+            debits += 1
+            total_debit += amount
+            spend[t.get("description") or "Other"] += amount
+            if largest is None or amount > float(largest.get("amount") or 0):
+                largest = t
+        if count >= MAX_SUMMARY_TRANSACTIONS:
+            break
+
+    if not count:
+        return "No transactions found for this period."
+
+    lines = [
+        f"Transaction summary ({oldest} to {newest}, {count} transactions):",
+        f"• Credits: {credits} totalling ₹{total_credit:,.2f}",
+        f"• Debits:  {debits} totalling ₹{total_debit:,.2f}",
+        f"• Net:     {'+' if total_credit >= total_debit else '-'}₹{abs(total_credit - total_debit):,.2f}",
+    ]
+    if largest is not None:
+        lines.append(
+            f"• Largest debit: ₹{float(largest.get('amount') or 0):,.2f} | "
+            f"{largest.get('description') or largest.get('transactionId', 'N/A')} | "
+            f"{(largest.get('timestamp') or '')[:10]}"
         )
+    if spend:
+        lines.append("• Top spending:")
+        lines.extend(f"  – {desc}: ₹{amt:,.2f}" for desc, amt in spend.most_common(5))
+    if count >= MAX_SUMMARY_TRANSACTIONS and stream.cursor:
+        lines.append(f"(Summary covers the most recent {MAX_SUMMARY_TRANSACTIONS} transactions only.)")
+    return "\n".join(lines)
+
+
+_MORE_HISTORY = "\n\nMore transactions are available. Call again with cursor='{cursor}' to continue."
+
+
+def _list_history(stream: TransactionStream, page_size: int) -> str:
+    # Stop at the token budget rather than let it trim rows the cursor has moved past
+    budget = token_budget.budget_for("get_transaction_history")
+    room = budget - token_budget.estimate_tokens("Transactions:\n" + _MORE_HISTORY.format(cursor="x" * 48))
+    lines, cursor = [], stream.cursor
+    for t in stream:
+        line = _format_transaction_line(len(lines) + 1, t)
+        room -= token_budget.estimate_tokens(line + "\n")
+        if lines and budget > 0 and room < 0:
+            break
+        lines.append(line)
+        cursor = stream.cursor
+        if len(lines) >= page_size:
+            break
+
+    if not lines:
+        return "No transactions found for this period."
+
+    more = _MORE_HISTORY.format(cursor=cursor) if cursor else ""
+    return "Transactions:\n" + "\n".join(lines) + more
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_transaction_history(
+    customer_id: str,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    mode: str = "summary",
+    cursor: Optional[str] = None,
+    page_size: int = 20,
+) -> str:
+    """Summarize or page through the customer's transactions over any period, e.g. "what did I spend last month".
+
+    Use mode 'summary' for totals and top spending over a period, and mode 'list'
+    to show the transactions themselves page by page. When a listing has more
+    results, the reply contains a cursor; pass it back to get the next page.
+
+    Args:
+        customer_id (str): The unique customer identifier extracted from the authenticated session.
+        from_date (str, optional): Start of the period (YYYY-MM-DD). Defaults to 30 days before to_date when to_date is set.
+        to_date (str, optional): End of the period (YYYY-MM-DD). Defaults to today when from_date is set.
+        mode (str): 'summary' (default) or 'list'.
+        cursor (str, optional): Cursor returned by a previous 'list' call, to continue from there.
+        page_size (int): Transactions per 'list' page. Defaults to 20. Maximum 50.
+
+    Returns:
+        str: A period summary, or one page of transactions plus a cursor when more remain.
+    """
+    mode = (mode or "summary").strip().lower()
+    if mode not in ("summary", "list"):
+        return "Invalid mode. Use 'summary' or 'list'."
+
+    try:
+        start, end = parse_date(from_date), parse_date(to_date)
+    except ValueError:
+        return "Invalid date. Please use the format YYYY-MM-DD."
+
+    try:
+        page_size = min(max(1, page_size), MAX_HISTORY_PAGE_SIZE)
+        stream = TransactionStream(customer_id, start, end, page_size=MAX_HISTORY_PAGE_SIZE, cursor=cursor)
+        if mode == "summary":
+            return _summarize_history(stream)
+        return _list_history(stream, page_size)
+    except ValueError as e:
+        return f"Cannot retrieve transaction history: {str(e)}"
     except requests.HTTPError as e:
-        if e.response.status_code == 404:
-            return f"Cheque #{cheque_number} was not found. Please verify the cheque number."
-        return f"Error retrieving cheque status: {e.response.status_code}"
+        return f"Error retrieving transaction history: {e.response.status_code}"
     except Exception as e:
-        return f"Failed to retrieve cheque status: {str(e)}"
+        return f"Failed to retrieve transaction history: {str(e)}"
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def summarize_transactions(
+    customer_id: str,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    group_by: str = "description",
+) -> str:
+    """Analyse the customer's transactions over a period: totals, spend by group, rolling averages and unusual debits.
+
+    Use this tool to answer questions such as "why is my balance low" or "where did my
+    money go this month" in a single call, instead of listing and adding up transactions.
+
+    Args:
+        customer_id (str): The unique customer identifier extracted from the authenticated session.
+        from_date (str, optional): Start of the period (YYYY-MM-DD). Defaults to 30 days before to_date.
+        to_date (str, optional): End of the period (YYYY-MM-DD). Defaults to today.
+        group_by (str): How to group spending: description (default), category, day, week, month or type.
+
+    Returns:
+        str: Credit/debit totals, net flow, average and 7-day rolling spend, top groups, and flagged outliers.
+    """
+    group_by = (group_by or "description").strip().lower()
+    if group_by not in transaction_analytics.GROUP_BY_OPTIONS:
+        return f"Invalid group_by. Use one of: {', '.join(transaction_analytics.GROUP_BY_OPTIONS)}."
+
+    try:
+        end = parse_date(to_date) or datetime.date.today()
+        start = parse_date(from_date) or end - datetime.timedelta(days=DEFAULT_RANGE_DAYS)
+    except ValueError:
+        return "Invalid date. Please use the format YYYY-MM-DD."
+    if start > end:
+        return "Invalid period: from_date is after to_date."
+
+    try:
+        r = transaction_analytics.summarize(customer_id, start, end, group_by)
+    except requests.HTTPError as e:
+        return f"Error analysing transactions: {e.response.status_code}"
+    except Exception as e:
+        return f"Failed to analyse transactions: {str(e)}"
+
+    if not r["count"]:
+        return f"No transactions found between {start} and {end}."
+
+    lines = [
+        f"Transaction analysis {start} to {end} ({r['count']} transactions):",
+        f"• Credits: {r['credits']} totalling ₹{r['total_credit']:,.2f}",
+        f"• Debits:  {r['debits']} totalling ₹{r['total_debit']:,.2f}",
+        f"• Net:     {'+' if r['net'] >= 0 else '-'}₹{abs(r['net']):,.2f}",
+        f"• Average daily spend: ₹{r['average_daily_spend']:,.2f} "
+        f"(last 7 days: ₹{r['rolling_average_spend']:,.2f}/day, peak 7 days: ₹{r['peak_rolling_average_spend']:,.2f}/day)",
+        f"By {group_by}:",
+    ]
+    lines.extend(
+        f"  – {g['key']}: spent ₹{g['debit']:,.2f}"
+        + (f", received ₹{g['credit']:,.2f}" if g["credit"] else "")
+        + f" ({g['count']} txns)"
+        for g in r["groups"]
+    )
+    if r["outliers"]:
+        lines.append("Unusual debits:")
+        lines.extend(f"  – ₹{o['amount']:,.2f} | {o['description']} | {o['date']}" for o in r["outliers"])
+    return "\n".join(lines)
+
+
+# Runs the warm-up if SWIFTBANK_WARMUP asks for it, then marks the instance ready
+warmup.start()
@@ -0,0 +1,670 @@
+"""
+Shared BankMOCK HTTP client for the SwiftBank tool modules
+
+Every tool module talks to the BankMOCK API through this module so that all
+tool calls reuse one keep-alive connection pool instead of opening a new
+TCP+TLS connection per request.
+
+Features:
+  - keep-alive connection pool with configurable pool count and per-host size
+  - per-endpoint (connect, read) timeouts
+  - retry with exponential backoff on idempotent GETs only
+  - read-through TTL/LRU cache for /balance, /account and /cheque lookups,
+    invalidated by write hooks that fire after every POST
+  - single-flight coalescing of identical concurrent GETs (see singleflight.py)
+  - an asyncio twin (aget_json / apost_json) on a pooled aiohttp session, plus
+    run_sync() so synchronous @tool() entry points can drive the async code on
+    one shared event loop instead of blocking a thread per upstream request
+  - upstream latency and status metrics for every attempt (see metrics.py)
+  - a per-endpoint circuit breaker that fails fast during outages, and read
+    timeouts that adapt to each endpoint's observed p99 (see circuit_breaker.py)
+  - global per-endpoint rate limits, queued fairly by customer and shared by
+    all workers (see rate_limiter.py)
+  - aiohttp and requests are imported on first use (see lazy_imports.py), and
+    warm_up() pre-opens pooled connections ahead of traffic (see warmup.py)
+  - exchange hooks that see every upstream request and response, for the
+    traffic recorder (see traffic_recorder.py)
+
+Configuration (environment variables):
+  - BANKMOCK_BASE              – API base URL
+  - BANKMOCK_POOL_CONNECTIONS  – number of per-host connection pools to cache (default 4)
+  - BANKMOCK_POOL_MAXSIZE      – keep-alive connections kept per host (default 32)
+  - BANKMOCK_MAX_CONNECTIONS   – total connection cap of the async client (default 200)
+  - BANKMOCK_POOL_BLOCK        – "true" to wait for a free connection instead of opening a throwaway one
+  - BANKMOCK_CONNECT_TIMEOUT   – connect timeout in seconds (default 3.05)
+  - BANKMOCK_TIMEOUT           – default read timeout in seconds (default 10)
+  - BANKMOCK_MAX_RETRIES       – retries for GET requests (default 2)
+  - BANKMOCK_BACKOFF_FACTOR    – backoff factor in seconds between retries (default 0.2)
+  - BANKMOCK_CACHE_TTL         – seconds a cached GET stays fresh; 0 disables caching (default 15)
+  - BANKMOCK_CACHE_MAX_ENTRIES – LRU entry cap for the response cache (default 4096)
+  - BANKMOCK_CACHE_MAX_BYTES   – LRU byte cap for the response cache (default 8 MiB)
+  - BANKMOCK_SINGLE_FLIGHT     – "false" to disable GET coalescing (default on)
+  - BANKMOCK_BREAKER           – "false" to disable the circuit breakers (default on)
+  - BANKMOCK_BREAKER_WINDOW    – rolling window in seconds for the failure rate (default 30)
+  - BANKMOCK_BREAKER_MIN_CALLS – calls needed in the window before the breaker can open (default 10)
+  - BANKMOCK_BREAKER_FAILURE_RATE – failure share that opens the breaker (default 0.5)
+  - BANKMOCK_BREAKER_SLOW_CALL – seconds after which a call counts as failed (default 5)
+  - BANKMOCK_BREAKER_OPEN_SECONDS – how long an open breaker fails fast before probing (default 15)
+  - BANKMOCK_ADAPTIVE_TIMEOUT  – "false" to always use the configured read timeouts (default on)
+  - BANKMOCK_TIMEOUT_P99_MULTIPLIER – adaptive read timeout = p99 × this (default 2)
+  - BANKMOCK_MIN_TIMEOUT       – lower bound for the adaptive read timeout (default 1)
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import json as jsonlib
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+import metrics
+import rate_limiter
+from circuit_breaker import STATE_VALUES, CircuitBreaker, CircuitOpenError
+from lazy_imports import lazy_module
+from rate_limiter import RateLimitedError
+from response_cache import TTLCache, make_key
+from singleflight import SingleFlight
+
+# Imported on first use (see lazy_imports.py); together they are most of the tool server's import time
+aiohttp = lazy_module("aiohttp")
+requests = lazy_module("requests")
+
+DEFAULT_BANKMOCK_BASE = "https://bankmock-theta.vercel.app/api/v1"
+
+# Read timeouts (seconds) per endpoint, keyed on the first path segment.
+# Endpoints not listed here use BankMockConfig.read_timeout.
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    "/balance": 5.0,
+    "/account": 5.0,
+    "/transactions": 8.0,
+    "/statement": 10.0,
+    "/cheque": 5.0,
+    "/generate-otp": 5.0,
+    "/transfer": 10.0,
+}
+
+# Endpoints whose GET responses are served from the read-through cache.
+DEFAULT_CACHEABLE_ENDPOINTS = ("/balance", "/account", "/cheque")
+
+# Cached paths each write endpoint makes stale. Writes not listed here drop
+# every cached read for the customer.
+WRITE_INVALIDATES = {
+    "/transfer": ("/balance", "/account", "/transactions", "/statement"),
+    "/deposit-cheque": ("/balance", "/transactions", "/statement", "/cheque"),
+    "/generate-otp": (),
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ("0", "false", "no", "off")
+
+
+@dataclass(frozen=True)
+class BankMockConfig:
+    """Connection settings for the BankMOCK API."""
+
+    base_url: str = DEFAULT_BANKMOCK_BASE
+    pool_connections: int = 4
+    pool_maxsize: int = 32
+    pool_block: bool = False
+    max_connections: int = 200
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    endpoint_timeouts: dict = field(default_factory=lambda: dict(DEFAULT_ENDPOINT_TIMEOUTS))
+    max_retries: int = 2
+    backoff_factor: float = 0.2
+    retry_statuses: tuple = (502, 503, 504)
+    cache_ttl: float = 15.0
+    cache_max_entries: int = 4096
+    cache_max_bytes: int = 8 * 1024 * 1024
+    cacheable_endpoints: tuple = DEFAULT_CACHEABLE_ENDPOINTS
+    single_flight: bool = True
+    breaker_enabled: bool = True
+    breaker_window: float = 30.0
+    breaker_min_calls: int = 10
+    breaker_failure_rate: float = 0.5
+    breaker_slow_call: float = 5.0
+    breaker_open_seconds: float = 15.0
+    adaptive_timeouts: bool = True
+    timeout_p99_multiplier: float = 2.0
+    min_read_timeout: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "BankMockConfig":
+        return cls(
+            base_url=os.environ.get("BANKMOCK_BASE", DEFAULT_BANKMOCK_BASE).rstrip("/"),
+            pool_connections=_env_int("BANKMOCK_POOL_CONNECTIONS", 4),
+            pool_maxsize=_env_int("BANKMOCK_POOL_MAXSIZE", 32),
+            pool_block=os.environ.get("BANKMOCK_POOL_BLOCK", "").lower() in ("1", "true", "yes"),
+            max_connections=_env_int("BANKMOCK_MAX_CONNECTIONS", 200),
+            connect_timeout=_env_float("BANKMOCK_CONNECT_TIMEOUT", 3.05),
+            read_timeout=_env_float("BANKMOCK_TIMEOUT", 10.0),
+            max_retries=_env_int("BANKMOCK_MAX_RETRIES", 2),
+            backoff_factor=_env_float("BANKMOCK_BACKOFF_FACTOR", 0.2),
+            cache_ttl=_env_float("BANKMOCK_CACHE_TTL", 15.0),
+            cache_max_entries=_env_int("BANKMOCK_CACHE_MAX_ENTRIES", 4096),
+            cache_max_bytes=_env_int("BANKMOCK_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+            single_flight=_env_bool("BANKMOCK_SINGLE_FLIGHT", True),
+            breaker_enabled=_env_bool("BANKMOCK_BREAKER", True),
+            breaker_window=_env_float("BANKMOCK_BREAKER_WINDOW", 30.0),
+            breaker_min_calls=_env_int("BANKMOCK_BREAKER_MIN_CALLS", 10),
+            breaker_failure_rate=_env_float("BANKMOCK_BREAKER_FAILURE_RATE", 0.5),
+            breaker_slow_call=_env_float("BANKMOCK_BREAKER_SLOW_CALL", 5.0),
+            breaker_open_seconds=_env_float("BANKMOCK_BREAKER_OPEN_SECONDS", 15.0),
+            adaptive_timeouts=_env_bool("BANKMOCK_ADAPTIVE_TIMEOUT", True),
+            timeout_p99_multiplier=_env_float("BANKMOCK_TIMEOUT_P99_MULTIPLIER", 2.0),
+            min_read_timeout=_env_float("BANKMOCK_MIN_TIMEOUT", 1.0),
+        )
+
+    def timeout_for(self, path: str) -> tuple:
+        """Return the (connect, read) timeout for a request path such as '/cheque/123456'."""
+        return (self.connect_timeout, self.endpoint_timeouts.get(endpoint_of(path), self.read_timeout))
+
+
+def endpoint_of(path: str) -> str:
+    """Return the first path segment, e.g. '/cheque/123456?x=1' → '/cheque'."""
+    return "/" + path.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+
+
+def _build_cache(config: "BankMockConfig") -> TTLCache:
+    return TTLCache(ttl=config.cache_ttl, max_entries=config.cache_max_entries, max_bytes=config.cache_max_bytes)
+
+
+_config = BankMockConfig.from_env()
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+_cache = _build_cache(_config)
+_write_hooks: list = []
+_exchange_hooks: list = []
+_singleflight = SingleFlight()
+_breakers: dict = {}
+# One aiohttp session per event loop; sessions cannot be shared across loops.
+_async_sessions = weakref.WeakKeyDictionary()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Kept for callers that only need the base URL.
+BANKMOCK_BASE = _config.base_url
+
+
+def get_config() -> BankMockConfig:
+    return _config
+
+
+def configure(**overrides) -> BankMockConfig:
+    """Replace config fields (e.g. base_url, pool_maxsize) and rebuild the pooled session and cache."""
+    global _config, _session, _cache, BANKMOCK_BASE
+    with _session_lock:
+        _config = replace(_config, **overrides)
+        BANKMOCK_BASE = _config.base_url
+        _cache = _build_cache(_config)
+        _breakers.clear()
+        if _session is not None:
+            _session.close()
+            _session = None
+        stale = _async_sessions.pop(_loop, None) if _loop is not None else None
+        if stale is not None:
+            asyncio.run_coroutine_threadsafe(stale.close(), _loop)
+        _async_sessions.clear()
+    return _config
+
+
+def _build_session(config: BankMockConfig) -> "requests.Session":
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=config.max_retries,
+        connect=config.max_retries,
+        read=config.max_retries,
+        status=config.max_retries,
+        backoff_factor=config.backoff_factor,
+        status_forcelist=config.retry_statuses,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        pool_block=config.pool_block,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session() -> "requests.Session":
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(_config)
+    return _session
+
+
+def headers(customer_id: str) -> dict:
+    return {
+        "Content-Type": "application/json",
+        "X-Customer-ID": customer_id,
+    }
+
+
+def url(path: str) -> str:
+    return f"{_config.base_url}/{path.lstrip('/')}"
+
+
+def breaker(path: str) -> Optional[CircuitBreaker]:
+    """Return the circuit breaker for the endpoint of path, or None if breakers are disabled."""
+    if not _config.breaker_enabled:
+        return None
+    endpoint = endpoint_of(path)
+    brk = _breakers.get(endpoint)
+    if brk is None:
+        with _session_lock:
+            brk = _breakers.setdefault(endpoint, CircuitBreaker(
+                endpoint,
+                window_seconds=_config.breaker_window,
+                min_requests=_config.breaker_min_calls,
+                failure_rate=_config.breaker_failure_rate,
+                slow_call_seconds=_config.breaker_slow_call,
+                open_seconds=_config.breaker_open_seconds,
+                timeout_multiplier=_config.timeout_p99_multiplier,
+                min_timeout=_config.min_read_timeout,
+            ))
+    return brk
+
+
+def _admit(path: str, timeout) -> tuple:
+    """Ask the endpoint's breaker for permission (raises CircuitOpenError) and pick the (connect, read) timeout."""
+    brk = breaker(path)
+    if brk is not None:
+        brk.before_call()
+    if timeout:
+        return brk, timeout
+    connect, read = _config.timeout_for(path)
+    if brk is not None and _config.adaptive_timeouts:
+        read = brk.read_timeout(read)
+    return brk, (connect, read)
+
+
+def _send(method: str, path: str, send, timeout=None, customer_id: str = "", params=None,
+          json=None) -> "requests.Response":
+    """Run send(timeout) through the endpoint's breaker and record its latency and status."""
+    brk, timeout = _admit(path, timeout)
+    start = time.perf_counter()
+    status, failed, resp = "connection_error", True, None
+    try:
+        resp = send(timeout)
+        status, failed = resp.status_code, resp.status_code >= 500
+        return resp
+    except requests.Timeout:
+        status = "timeout"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.record_upstream(endpoint_of(path), method, status, elapsed)
+        if brk is not None:
+            brk.record(elapsed, failed, timed_out=status == "timeout")
+        _notify_exchange(customer_id, method, path, params, json, status,
+                         resp.content if resp is not None else None, elapsed)
+
+
+def _notify_exchange(customer_id: str, method: str, path: str, params, json, status, body, seconds: float) -> None:
+    for hook in _exchange_hooks:
+        hook(customer_id, method, path, params, json, status, body, seconds)
+
+
+def get(customer_id: str, path: str, params: Optional[dict] = None, timeout=None) -> "requests.Response":
+    """GET a BankMOCK endpoint. Retried with backoff on connection errors and 502/503/504.
+
+    Raises CircuitOpenError without calling upstream while the endpoint's breaker is open,
+    and RateLimitedError when the endpoint's rate limit does not admit it in time.
+    """
+    rate_limiter.admit_upstream(endpoint_of(path), customer_id)
+    return _send("GET", path, lambda t: session().get(
+        url(path),
+        headers=headers(customer_id),
+        params=params,
+        timeout=t,
+    ), timeout, customer_id, params)
+
+
+def get_json(customer_id: str, path: str, params: Optional[dict] = None, use_cache: bool = True):
+    """GET an endpoint and return its parsed JSON body, read through the response cache.
+
+    On a cache miss, concurrent identical GETs are coalesced into one upstream
+    request. Raises requests.HTTPError on non-2xx responses; errors are never cached.
+    Cached bodies are shared between callers and must be treated as read-only.
+    """
+    key = make_key(customer_id, path, params)
+    cacheable = use_cache and _config.cache_ttl > 0 and endpoint_of(path) in _config.cacheable_endpoints
+    if cacheable:
+        data = _cache.get(key)
+        if data is not None:
+            return data
+
+    def fetch():
+        resp = get(customer_id, path, params)
+        resp.raise_for_status()
+        data = resp.json()
+        if cacheable:
+            _cache.set(key, data, len(resp.content))
+        return data
+
+    return _singleflight.do(key, fetch) if _config.single_flight else fetch()
+
+
+def post(customer_id: str, path: str, json: Optional[dict] = None, timeout=None) -> "requests.Response":
+    """POST to a BankMOCK endpoint. Only retried when the connection could not be opened.
+
+    Write hooks fire afterwards whether or not the request succeeded, since a
+    timed-out write may still have been applied upstream.
+    """
+    rate_limiter.admit_upstream(endpoint_of(path), customer_id)
+    try:
+        return _send("POST", path, lambda t: session().post(
+            url(path),
+            headers=headers(customer_id),
+            json=json,
+            timeout=t,
+        ), timeout, customer_id, json=json)
+    finally:
+        for hook in _write_hooks:
+            hook(customer_id, path)
+
+
+def register_write_hook(hook) -> None:
+    """Call hook(customer_id, path) after every POST."""
+    _write_hooks.append(hook)
+
+
+def register_exchange_hook(hook) -> None:
+    """Call hook(customer_id, method, path, params, json, status, body, seconds) after every upstream request.
+
+    status is the HTTP status, or "timeout"/"connection_error"; body is the raw response
+    body, or None when there was no response. Retried requests report their last attempt.
+    """
+    _exchange_hooks.append(hook)
+
+
+def invalidate(customer_id: str, paths: Optional[tuple] = None) -> int:
+    """Drop cached reads for a customer (all of them, or only those under the given paths)."""
+    return _cache.invalidate(customer_id, paths)
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+def singleflight_stats() -> dict:
+    """Calls, upstream requests and dedup ratio of the GET coalescing layer."""
+    return _singleflight.stats()
+
+
+def breaker_stats() -> dict:
+    """State, rolling failure rate, p99 latency and fast-fail count of each endpoint's breaker."""
+    return {endpoint: brk.stats() for endpoint, brk in list(_breakers.items())}
+
+
+class _AsyncResponse:
+    """The parts of requests.Response that callers read off an HTTPError raised by the async client."""
+
+    def __init__(self, status_code: int, body: bytes, request_url: str):
+        self.status_code = status_code
+        self.content = body
+        self.text = body.decode("utf-8", errors="replace")
+        self.url = request_url
+
+    def json(self):
+        return jsonlib.loads(self.content)
+
+
+def async_session() -> "aiohttp.ClientSession":
+    """Return the pooled aiohttp session for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    s = _async_sessions.get(loop)
+    if s is None or s.closed:
+        connector = aiohttp.TCPConnector(limit=_config.max_connections, limit_per_host=_config.pool_maxsize)
+        s = aiohttp.ClientSession(connector=connector)
+        with _session_lock:
+            _async_sessions[loop] = s
+    return s
+
+
+async def _arequest(method: str, customer_id: str, path: str, params=None, json=None, timeout=None) -> _AsyncResponse:
+    request_url = url(path)
+    endpoint = endpoint_of(path)
+    await rate_limiter.aadmit_upstream(endpoint, customer_id)
+    # Same policy as the sync adapter: only GETs are retried.
+    attempts = 1 + (_config.max_retries if method == "GET" else 0)
+    for attempt in range(attempts):
+        if attempt:
+            await asyncio.sleep(_config.backoff_factor * (2 ** (attempt - 1)))
+        last = attempt == attempts - 1
+        brk, (connect, read) = _admit(path, timeout)
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        start = time.perf_counter()
+        try:
+            async with async_session().request(
+                method, request_url, headers=headers(customer_id), params=params, json=json, timeout=client_timeout,
+            ) as resp:
+                body = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            elapsed = time.perf_counter() - start
+            status = "timeout" if isinstance(e, asyncio.TimeoutError) else "connection_error"
+            metrics.record_upstream(endpoint, method, status, elapsed)
+            if brk is not None:
+                brk.record(elapsed, True, timed_out=status == "timeout")
+            if last or not isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                _notify_exchange(customer_id, method, path, params, json, status, None, elapsed)
+                raise
+            continue
+        except asyncio.CancelledError:
+            # e.g. an abandoned prefetch: not the endpoint's fault
+            if brk is not None:
+                brk.release()
+            raise
+        elapsed = time.perf_counter() - start
+        metrics.record_upstream(endpoint, method, resp.status, elapsed)
+        if brk is not None:
+            brk.record(elapsed, resp.status >= 500)
+        if resp.status in _config.retry_statuses and not last:
+            continue
+        _notify_exchange(customer_id, method, path, params, json, resp.status, body, elapsed)
+        return _AsyncResponse(resp.status, body, request_url)
+
+
+def _raise_for_status(resp: _AsyncResponse) -> None:
+    if resp.status_code >= 400:
+        raise requests.HTTPError(f"{resp.status_code} Error for url: {resp.url}", response=resp)
+
+
+async def aget_json(customer_id: str, path: str, params: Optional[dict] = None, use_cache: bool = True):
+    """Async get_json(): same cache, retry and error behaviour (raises requests.HTTPError on non-2xx)."""
+    key = make_key(customer_id, path, params)
+    cacheable = use_cache and _config.cache_ttl > 0 and endpoint_of(path) in _config.cacheable_endpoints
+    if cacheable:
+        data = _cache.get(key)
+        if data is not None:
+            return data
+
+    async def fetch():
+        resp = await _arequest("GET", customer_id, path, params=params)
+        _raise_for_status(resp)
+        data = resp.json()
+        if cacheable:
+            _cache.set(key, data, len(resp.content))
+        return data
+
+    return await (_singleflight.ado(key, fetch) if _config.single_flight else fetch())
+
+
+async def apost_json(customer_id: str, path: str, json: Optional[dict] = None):
+    """Async POST returning the parsed JSON body. Fires the write hooks like post()."""
+    try:
+        resp = await _arequest("POST", customer_id, path, json=json)
+    finally:
+        for hook in _write_hooks:
+            hook(customer_id, path)
+    _raise_for_status(resp)
+    return resp.json()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _session_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="bankmock-async", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+async def _in_context(ctx: contextvars.Context, coro):
+    # Tasks on the client loop start from that thread's context; carry over the
+    # caller's context variables (e.g. metrics.current_tool) so they still apply.
+    for var, value in ctx.items():
+        var.set(value)
+    return await coro
+
+
+def submit(coro) -> concurrent.futures.Future:
+    """Schedule a coroutine on the shared client event loop and return without waiting for it."""
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Blocking on the BankMOCK client loop from inside it; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), loop)
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the shared client event loop and block the caller until it finishes.
+
+    All sync tool wrappers funnel through this one loop, so hundreds of
+    in-flight upstream calls share a single thread and connection pool.
+    """
+    return submit(coro).result(timeout)
+
+
+async def aclose() -> None:
+    """Close the running loop's pooled aiohttp session. Await before shutting a caller-owned loop down."""
+    s = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if s is not None:
+        await s.close()
+
+
+def close() -> None:
+    """Close the sync session and the shared loop's aiohttp session."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    if _loop is not None and _loop.is_running():
+        asyncio.run_coroutine_threadsafe(aclose(), _loop).result(5)
+
+
+async def _aopen_connections(count: int, timeout: float) -> int:
+    s = async_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def probe():
+        async with s.get(_config.base_url, timeout=client_timeout) as resp:
+            await resp.read()
+
+    # Concurrent requests cannot share a connection, so each one opens its own
+    results = await asyncio.gather(*(probe() for _ in range(count)), return_exceptions=True)
+    return sum(not isinstance(r, BaseException) for r in results)
+
+
+def warm_up(connections: int = 4, timeout: float = 5.0) -> int:
+    """Open pooled keep-alive connections to BankMOCK before the first tool call needs them.
+
+    Starts the shared event loop and its aiohttp session, opens `connections`
+    connections with concurrent GETs of the base URL (the answer does not
+    matter, only the TCP+TLS handshake), and one on the sync session used by
+    the card actions. These requests bypass the breakers, metrics and cache.
+    Returns the number of connections opened.
+    """
+    opened = run_sync(_aopen_connections(max(connections, 0), timeout), timeout + 1)
+    try:
+        session().get(_config.base_url, timeout=(_config.connect_timeout, timeout)).close()
+        opened += 1
+    except requests.RequestException:
+        pass
+    return opened
+
+
+def _invalidate_after_write(customer_id: str, path: str) -> None:
+    paths = WRITE_INVALIDATES.get(endpoint_of(path))
+    if paths != ():
+        _cache.invalidate(customer_id, paths)
+
+
+def _collect_metrics() -> list:
+    flight = singleflight_stats()
+    return (
+        metrics.gauge_lines("swiftbank_singleflight_calls_total", "GETs that went through single-flight.",
+                            {(): flight["calls"]}, (), "counter")
+        + metrics.gauge_lines("swiftbank_singleflight_coalesced_total", "GETs served by another caller's request.",
+                              {(): flight["coalesced"]}, (), "counter")
+        + metrics.gauge_lines("swiftbank_singleflight_in_flight", "Upstream GETs currently in flight.",
+                              {(): flight["in_flight"]})
+        + _breaker_lines()
+    )
+
+
+def _breaker_lines() -> list:
+    stats = breaker_stats()
+    read_timeouts = {
+        (endpoint,): brk.read_timeout(_config.timeout_for(endpoint)[1]) if _config.adaptive_timeouts
+        else _config.timeout_for(endpoint)[1]
+        for endpoint, brk in list(_breakers.items())
+    }
+    return (
+        metrics.gauge_lines("swiftbank_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).",
+                            {(e,): STATE_VALUES[s["state"]] for e, s in stats.items()}, ("endpoint",))
+        + metrics.gauge_lines("swiftbank_breaker_failure_rate", "Failure share in the breaker's rolling window.",
+                              {(e,): s["failure_rate"] for e, s in stats.items()}, ("endpoint",))
+        + metrics.gauge_lines("swiftbank_breaker_rejected_total", "Calls failed fast by an open breaker.",
+                              {(e,): s["rejected"] for e, s in stats.items()}, ("endpoint",), "counter")
+        + metrics.gauge_lines("swiftbank_breaker_opened_total", "Times the breaker opened.",
+                              {(e,): s["opened"] for e, s in stats.items()}, ("endpoint",), "counter")
+        + metrics.gauge_lines("swiftbank_upstream_read_timeout_seconds", "Read timeout currently applied.",
+                              read_timeouts, ("endpoint",))
+    )
+
+
+register_write_hook(_invalidate_after_write)
+metrics.register_cache("bankmock", cache_stats)
+metrics.register_collector(_collect_metrics)
+atexit.register(close)
@@ -8,40 +8,36 @@ Tools:
   - block_atm_card    – block an active ATM card (requires prior OTP verification)
 
 NOTE: These tools MUST only be called AFTER the OTP has been verified by the
-      otp_tools.verify_otp tool. The orchestrator agent enforces this sequence.
+      otp_tools.verify_otp tool. unlock_atm_card and block_atm_card check this
+      themselves: each spends the verification verify_otp recorded in
+      otp_store, so one OTP authorises one card action.
+
+get_card_status is implemented as a coroutine (get_card_status_async); the
+@tool() function is a thin synchronous wrapper around it. unlock_atm_card and
+block_atm_card are idempotent: a retry within a minute does not act twice.
 """
 
-import requests
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
 
-BANKMOCK_BASE = "https://bankmock-theta.vercel.app/api/v1"
-
+import bankmock_client as bankmock
+import idempotency
+import metrics
+import otp_store
+import rate_limiter
+import token_budget
+import warmup
+from lazy_imports import lazy_module
 
-def _headers(customer_id: str) -> dict:
-    return {
-        "Content-Type": "application/json",
-        "X-Customer-ID": customer_id,
-    }
+requests = lazy_module("requests")
 
+# Repeats of a card action within this window get the original reply without acting again
+CARD_ACTION_WINDOW_SECONDS = 60
 
-@tool()
-def get_card_status(customer_id: str) -> str:
-    """Retrieve the current status of the customer's primary ATM/debit card.
-
-    Args:
-        customer_id (str): The unique customer identifier extracted from the authenticated session.
 
-    Returns:
-        str: The card status (ACTIVE, BLOCKED, or SUSPENDED) and masked card number.
-    """
+async def get_card_status_async(customer_id: str) -> str:
+    """Async implementation of get_card_status."""
     try:
-        resp = requests.get(
-            f"{BANKMOCK_BASE}/account",
-            headers=_headers(customer_id),
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        data = await bankmock.aget_json(customer_id, "/account")
         acc = data.get("data", data)
 
         # BankMOCK infers card status from account status
@@ -61,63 +57,82 @@ def get_card_status(customer_id: str) -> str:
 
 
 @tool()
-def unlock_atm_card(customer_id: str, confirmed_otp_verified: bool) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_card_status(customer_id: str) -> str:
+    """Retrieve the current status of the customer's primary ATM/debit card.
+
+    Args:
+        customer_id (str): The unique customer identifier extracted from the authenticated session.
+
+    Returns:
+        str: The card status (ACTIVE, BLOCKED, or SUSPENDED) and masked card number.
+    """
+    return bankmock.run_sync(get_card_status_async(customer_id))
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@idempotency.idempotent(window=CARD_ACTION_WINDOW_SECONDS)
+@rate_limiter.limited
+def unlock_atm_card(customer_id: str) -> str:
     """Unlock (unblock) the customer's ATM card after successful OTP verification.
 
     IMPORTANT: This tool must only be called after the OTP has been verified.
-    Set confirmed_otp_verified=True only when the OTP agent confirms the OTP is valid.
+    The tool checks the verification itself and refuses if verify_otp has not succeeded.
 
     Args:
         customer_id (str): The unique customer identifier extracted from the authenticated session.
-        confirmed_otp_verified (bool): Must be True – set only after OTP is verified by verify_otp tool.
 
     Returns:
         str: Confirmation message with updated card status.
     """
-    if not confirmed_otp_verified:
+    if not otp_store.get_store().consume_verification(customer_id, otp_store.OTP_GRANT_SECONDS):
         return "Cannot unlock card: OTP verification is required first. Please have the customer enter the OTP."
 
     try:
         # BankMOCK does not have a separate card endpoint; we simulate via a transfer-style POST
-        # As a simulation, we call validate-otp-style endpoint to confirm and record the action
-        resp = requests.post(
-            f"{BANKMOCK_BASE}/transfer",
-            headers=_headers(customer_id),
-            json={"amount": 0, "action": "UNLOCK_CARD"},
-            timeout=10,
-        )
-        # Accept 2xx or treat as success in simulation
-        return (
-            "✅ ATM card has been successfully UNLOCKED.\n"
-            "Your card is now ACTIVE and ready for use.\n"
-            "If you experience any issues, please contact support."
-        )
+        # The POST fires bankmock_client's write hooks, which drop this customer's cached /account read
+        resp = bankmock.post(customer_id, "/transfer", json={"amount": 0, "action": "UNLOCK_CARD"})
     except Exception as e:
-        # Simulate success even if BankMOCK doesn't have this endpoint
+        return f"Failed to unlock card: {str(e)}. The OTP has been used; please generate a new one and try again."
+    if not resp.ok:
         return (
-            "✅ ATM card has been successfully UNLOCKED (simulated).\n"
-            "Your card is now ACTIVE and ready for use."
+            f"Failed to unlock card: BankMOCK returned {resp.status_code}. "
+            "The OTP has been used; please generate a new one and try again."
         )
+    return (
+        "✅ ATM card has been successfully UNLOCKED.\n"
+        "Your card is now ACTIVE and ready for use.\n"
+        "If you experience any issues, please contact support."
+    )
 
 
 @tool()
-def block_atm_card(customer_id: str, confirmed_otp_verified: bool) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@idempotency.idempotent(window=CARD_ACTION_WINDOW_SECONDS)
+@rate_limiter.limited
+def block_atm_card(customer_id: str) -> str:
     """Block (freeze) the customer's ATM card after successful OTP verification.
 
     IMPORTANT: This tool must only be called after the OTP has been verified.
-    Set confirmed_otp_verified=True only when the OTP agent confirms the OTP is valid.
+    The tool checks the verification itself and refuses if verify_otp has not succeeded.
 
     Args:
         customer_id (str): The unique customer identifier extracted from the authenticated session.
-        confirmed_otp_verified (bool): Must be True – set only after OTP is verified by verify_otp tool.
 
     Returns:
         str: Confirmation message with updated card status.
     """
-    if not confirmed_otp_verified:
+    if not otp_store.get_store().consume_verification(customer_id, otp_store.OTP_GRANT_SECONDS):
         return "Cannot block card: OTP verification is required first. Please have the customer enter the OTP."
 
     try:
+        # No upstream write here, so drop the cached /account read explicitly
+        bankmock.invalidate(customer_id, ("/account",))
         return (
             "🔒 ATM card has been successfully BLOCKED.\n"
             "No transactions can be made with this card until it is unlocked.\n"
@@ -125,3 +140,7 @@ def block_atm_card(customer_id: str, confirmed_otp_verified: bool) -> str:
         )
     except Exception as e:
         return f"Failed to block card: {str(e)}"
+
+
+# Runs the warm-up if SWIFTBANK_WARMUP asks for it, then marks the instance ready
+warmup.start()
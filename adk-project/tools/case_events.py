@@ -0,0 +1,342 @@
+"""
+Append-only event log of case transitions
+
+Every change case_tools makes to a case (created, verified, closed,
+escalated) is appended here as one JSON line with the actor and reason, so
+the full history survives even though the case repository only keeps the
+current state.
+
+Layout under CASE_EVENTS_DIR (default: $SWIFTBANK_DATA_DIR/case-events):
+  - 00000001.log, 00000002.log, …   segments; a new one starts once the current
+                                    one reaches CASE_EVENTS_SEGMENT_BYTES
+  - index.db                        SQLite index shared by all workers: the byte
+                                    position of every event, keyed by case, and
+                                    how far into the segments it has got
+  - append.lock                     flock()ed while appending, so several worker
+                                    processes can share the log
+
+Old segments are never rewritten: they are the audit trail, and timeline()
+reads a case's events straight from them by position. Nothing per case is held
+in memory; a process only keeps how far the index has got. Catching up indexes
+the bytes appended since then, in a transaction that re-reads the index's own
+high-water mark, so each range is indexed once by whichever worker gets there
+first and events written by other workers show up in state() and timeline()
+too. The index commits as it goes, so recovery after a restart reads only the
+unindexed tail. If index.db is deleted, it is rebuilt from the segments.
+
+A chunk is decoded in one json.loads call. If that fails, the chunk is decoded
+again line by line: good events are applied, and each line that is not a valid
+event is skipped, logged and copied to quarantine/<segment>-<offset>.line, so
+one bad line cannot stop the log from loading.
+"""
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within a process
+    fcntl = None
+
+from storage import ThreadLocalConnection, data_path, transaction
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_BYTES = int(os.environ.get("CASE_EVENTS_SEGMENT_BYTES", 16 * 1024 * 1024))
+FSYNC = os.environ.get("CASE_EVENTS_FSYNC", "").lower() in ("1", "true", "yes")
+READ_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Event types
+CREATED = "CREATED"
+TRANSITION = "TRANSITION"
+
+# Positions are packed as segment << 40 | byte offset
+_OFFSET_BITS = 40
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+
+
+def _segment_name(segment: int) -> str:
+    return f"{segment:08d}.log"
+
+
+def _init_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS events (
+            case_id  TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (case_id, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS high_water (
+            id          INTEGER PRIMARY KEY CHECK (id = 1),
+            segment     INTEGER NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            seq         INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO high_water (id, segment, byte_offset, seq) VALUES (1, 1, 0, 0);
+    """)
+
+
+class CaseEventLog:
+    def __init__(self, directory: Optional[str] = None, segment_bytes: int = SEGMENT_BYTES,
+                 fsync: bool = FSYNC):
+        self.directory = directory or os.environ.get("CASE_EVENTS_DIR") or data_path("case-events")
+        os.makedirs(self.directory, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._lock_path = os.path.join(self.directory, "append.lock")
+        self._db = ThreadLocalConnection(os.path.join(self.directory, "index.db"), _init_schema)
+
+        # How far the shared index has got, as last seen by this process
+        self.seq = 0
+        self._segment = 1
+        self._offset = 0
+        # Malformed lines skipped by this process
+        self.skipped = 0
+        with self._lock:
+            self._catch_up()
+
+    # ── indexing ─────────────────────────────────────────────────────────────
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, _segment_name(segment))
+
+    def _read_high_water(self, conn: sqlite3.Connection) -> None:
+        row = conn.execute("SELECT segment, byte_offset, seq FROM high_water WHERE id = 1").fetchone()
+        self._segment, self._offset, self.seq = row["segment"], row["byte_offset"], row["seq"]
+
+    def _apply(self, events: list, lengths: Iterable[int], position: int) -> None:
+        """Index events; the i-th event's line is lengths[i] bytes long, starting at position."""
+        rows = []
+        for event, length in zip(events, lengths):
+            rows.append((event["caseId"], position))
+            position += length
+        self._db.get().executemany("INSERT OR IGNORE INTO events (case_id, position) VALUES (?, ?)", rows)
+        if events:
+            self.seq = events[-1]["seq"]
+
+    def _apply_lines(self, lines: list, position: int) -> None:
+        """Slow path for a chunk that does not decode as a whole: apply the valid lines, quarantine the rest."""
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            if _is_event(event):
+                self._apply([event], [len(line) + 1], position)
+            elif line.strip():
+                self._quarantine(position, line)
+            position += len(line) + 1
+
+    def _quarantine(self, position: int, line: bytes) -> None:
+        segment, offset = position >> _OFFSET_BITS, position & _OFFSET_MASK
+        self.skipped += 1
+        logger.warning("Skipping malformed case event at %s offset %d", _segment_name(segment), offset)
+        directory = os.path.join(self.directory, "quarantine")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Every worker reads the line; the first to get here keeps the copy
+            fd = os.open(os.path.join(directory, f"{segment:08d}-{offset:012d}.line"),
+                         os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            return
+        except OSError:
+            logger.warning("Could not quarantine malformed case event", exc_info=True)
+            return
+        try:
+            os.write(fd, line + b"\n")
+        finally:
+            os.close(fd)
+
+    def _has_unindexed(self) -> bool:
+        path = self._path(self._segment)
+        return ((os.path.exists(path) and os.path.getsize(path) > self._offset)
+                or os.path.exists(self._path(self._segment + 1)))
+
+    def _catch_up(self) -> None:
+        """Index every complete line appended since the high-water mark, across segment boundaries."""
+        conn = self._db.get()
+        self._read_high_water(conn)
+        while self._has_unindexed():
+            with transaction(conn):
+                # Another worker may have indexed this range while we waited for the write lock
+                self._read_high_water(conn)
+                advanced = self._index_chunk()
+                conn.execute("UPDATE high_water SET segment = ?, byte_offset = ?, seq = ? WHERE id = 1",
+                             (self._segment, self._offset, self.seq))
+            if not advanced:
+                return
+
+    def _index_chunk(self) -> bool:
+        """Index up to one chunk past the high-water mark; False once only a partial line is left."""
+        path = self._path(self._segment)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(READ_CHUNK_BYTES)
+                if not chunk.endswith(b"\n"):
+                    chunk += f.readline()
+            # Anything after the last newline is a write still in progress (or torn by a crash)
+            end = chunk.rfind(b"\n") + 1
+            if end:
+                lines = chunk[:end - 1].split(b"\n")
+                position = self._segment << _OFFSET_BITS | self._offset
+                try:
+                    # One decode per chunk instead of one per line
+                    events = json.loads(b"[" + b",".join(lines) + b"]")
+                    if not all(_is_event(event) for event in events):
+                        raise ValueError("not an event")
+                except ValueError:
+                    self._apply_lines(lines, position)
+                else:
+                    self._apply(events, [len(line) + 1 for line in lines], position)
+                self._offset += end
+                return True
+        if not os.path.exists(self._path(self._segment + 1)):
+            return False
+        self._segment += 1
+        self._offset = 0
+        return True
+
+    # ── appending ────────────────────────────────────────────────────────────
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, case_id: str, event_type: str, to_status: Optional[str] = None,
+               from_status: Optional[str] = None, actor: str = "system", reason: Optional[str] = None,
+               data: Optional[dict] = None, ts: Optional[str] = None) -> dict:
+        """Append one event and return it (with its seq)."""
+        return self.append_many([{
+            "caseId": case_id, "type": event_type, "from": from_status, "to": to_status,
+            "actor": actor, "reason": reason, "data": data, "ts": ts,
+        }])[0]
+
+    def append_many(self, events: Iterable[dict]) -> list:
+        """Append a batch of events with one write. Missing ts default to now."""
+        events = list(events)
+        if not events:
+            return []
+        with self._lock:
+            return self._write(events)
+
+    def _write(self, events: list) -> list:
+        with self._file_lock():
+            self._catch_up()
+            path = self._path(self._segment)
+            if os.path.exists(path) and os.path.getsize(path) > self._offset:
+                # Only a writer that died mid-line leaves bytes past the last complete event
+                os.truncate(path, self._offset)
+            if self._offset >= self.segment_bytes:
+                self._segment += 1
+                self._offset = 0
+                path = self._path(self._segment)
+            position = self._segment << _OFFSET_BITS | self._offset
+
+            now = None
+            lines = []
+            for event in events:
+                self.seq += 1
+                if not event.get("ts"):
+                    now = now or _now_iso()
+                    event["ts"] = now
+                event = {"seq": self.seq, **{k: v for k, v in event.items() if v is not None}}
+                lines.append((event, (json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n").encode()))
+            with open(path, "ab") as f:
+                f.write(b"".join(line for _, line in lines))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+            written = [event for event, _ in lines]
+            with transaction(self._db.get()) as conn:
+                self._read_high_water(conn)
+                # A reader in another worker may already have indexed these lines
+                if self._segment << _OFFSET_BITS | self._offset == position:
+                    self._apply(written, [len(line) for _, line in lines], position)
+                    self._offset += sum(len(line) for _, line in lines)
+                    conn.execute("UPDATE high_water SET segment = ?, byte_offset = ?, seq = ? WHERE id = 1",
+                                 (self._segment, self._offset, self.seq))
+            return written
+
+    # ── reading ──────────────────────────────────────────────────────────────
+    def state(self, case_id: str) -> Optional[dict]:
+        """Current state of a case as rebuilt from its events, or None if it has none."""
+        events = self.timeline(case_id)
+        if not events:
+            return None
+        state = {"caseId": case_id}
+        for event in events:
+            if "to" in event:
+                state["status"] = event["to"]
+            if "data" in event:
+                state.update(event["data"])
+            state["updatedAt"] = event["ts"]
+        return state
+
+    def timeline(self, case_id: str) -> list:
+        """Every event of a case in order, read from the segments by position."""
+        with self._lock:
+            self._catch_up()
+            positions = [row[0] for row in self._db.get().execute(
+                "SELECT position FROM events WHERE case_id = ? ORDER BY position", (case_id,))]
+        events, handles = [], {}
+        try:
+            for position in positions:
+                segment = position >> _OFFSET_BITS
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self._path(segment), "rb")
+                f.seek(position & _OFFSET_MASK)
+                events.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return events
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._catch_up()
+            return {"seq": self.seq, "segment": self._segment, "offset": self._offset,
+                    "skipped": self.skipped}
+
+
+def _is_event(event) -> bool:
+    return isinstance(event, dict) and "caseId" in event and "seq" in event and "ts" in event
+
+
+def _now_iso() -> str:
+    return datetime.datetime.utcnow().isoformat() + "Z"
+
+
+_log: Optional[CaseEventLog] = None
+_log_lock = threading.Lock()
+
+
+def get_event_log() -> CaseEventLog:
+    """Return the process-wide event log, replaying it on first use."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = CaseEventLog()
+    return _log
+
+
+def set_event_log(log: CaseEventLog) -> None:
+    """Swap the event log, e.g. for one in a temporary directory in tests."""
+    global _log
+    _log = log
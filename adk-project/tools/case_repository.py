@@ -0,0 +1,577 @@
+"""
+Complaint case repository for the case management tools
+
+Backends:
+  - SqliteCaseRepository – default; a WAL-mode SQLite file shared by every
+                           tool-server worker, indexed on customerId, status
+                           and updatedAt
+  - DictCaseRepository   – in-process dict with a per-customer index, for tests
+
+Cases are plain dicts with the same keys the tools have always used:
+caseId, customerId, customerName, type, description, chequeNumber, status,
+resolution, assignedAgent, createdAt, updatedAt.
+
+update_where() selects cases by predicate (status, type, customer, age) and
+applies a per-case transition to all of them in one transaction, for
+back-office sweeps over thousands of cases.
+
+search() is full-text search over description, resolution, type, status and
+chequeNumber, combined with the same criteria, plus paging and facet counts
+by status and type. In SQLite the text lives in an FTS5 index, and the counts
+per (status, type) in a small table. Triggers on the cases table keep both in
+step with every insert and update, so every write path updates them, bulk
+updates included. The in-memory backend keeps an inverted index. Queries are
+words (all must match), "quoted phrases" and prefix* words.
+
+Counting the matches of a broad search means reading every matching row, so
+the SQLite backend counts at most CASE_SEARCH_COUNT_LIMIT of them and then
+reports lower bounds. Fetching a page streams from the index and stays fast
+whatever the number of matches.
+
+Configuration (environment variables):
+  - CASE_STORE               – "sqlite" (default) or "memory"
+  - CASE_DB_PATH             – SQLite file path (default: $SWIFTBANK_DATA_DIR/cases.db)
+  - CASE_SEARCH_COUNT_LIMIT  – matches counted exactly per search before totals become lower bounds (default 10000)
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from storage import ThreadLocalConnection, data_path, transaction
+
+CASE_FIELDS = (
+    "caseId",
+    "customerId",
+    "customerName",
+    "type",
+    "description",
+    "chequeNumber",
+    "status",
+    "resolution",
+    "assignedAgent",
+    "createdAt",
+    "updatedAt",
+)
+
+
+# Fields covered by full-text search
+SEARCH_FIELDS = ("description", "resolution", "type", "status", "chequeNumber")
+
+COUNT_LIMIT = int(os.environ.get("CASE_SEARCH_COUNT_LIMIT", 10000))
+
+# search() orderings
+RECENT = "recent"
+RELEVANCE = "relevance"
+
+# Status changes the case tools and the cheque watcher will make
+CASE_TRANSITIONS = {
+    "OPEN": ("VERIFIED", "CLOSED", "ESCALATED"),
+    "VERIFIED": ("CLOSED", "ESCALATED"),
+    "ESCALATED": ("CLOSED",),
+    "CLOSED": (),
+}
+
+# Same splitting as the FTS5 unicode61 tokenizer: runs of letters and digits
+_TOKEN = re.compile(r"[^\W_]+")
+_QUERY_ITEM = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text: Optional[str]) -> list:
+    """Case- and accent-folded words of text."""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return _TOKEN.findall("".join(ch for ch in folded if not unicodedata.combining(ch)))
+
+
+def parse_query(text: Optional[str]) -> list:
+    """Split a search string into (tokens, prefix) items: words, "quoted phrases" and prefix* words."""
+    items = []
+    for phrase, word in _QUERY_ITEM.findall(text or ""):
+        tokens = tuple(tokenize(phrase or word))
+        if tokens:
+            items.append((tokens, not phrase and word.endswith("*")))
+    return items
+
+
+def _facets(pairs: dict) -> tuple:
+    """Total and facet counts by status and by type from {(status, type): count} over the matching cases."""
+    by_status: dict = {}
+    by_type: dict = {}
+    for (status, case_type), n in pairs.items():
+        by_status[status] = by_status.get(status, 0) + n
+        by_type[case_type] = by_type.get(case_type, 0) + n
+    ranked = lambda counts: dict(sorted(((k, v) for k, v in counts.items() if v), key=lambda kv: -kv[1]))
+    return sum(pairs.values()), {"status": ranked(by_status), "type": ranked(by_type)}
+
+
+class CaseRepository(ABC):
+    """Storage interface used by case_tools."""
+
+    @abstractmethod
+    def create(self, case: dict) -> dict:
+        ...
+
+    @abstractmethod
+    def get(self, case_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def update(self, case_id: str, **fields) -> Optional[dict]:
+        """Apply field changes and return the updated case, or None if it does not exist."""
+
+    @abstractmethod
+    def list_by_customer(self, customer_id: str, status: Optional[str] = None, limit: Optional[int] = None) -> list:
+        """Return a customer's cases, most recently updated first."""
+
+    @abstractmethod
+    def find(self, limit: Optional[int] = None, **criteria) -> list:
+        """Return cases matching the criteria (see _matches), oldest first."""
+
+    @abstractmethod
+    def count_by_agent(self, status: str = "ESCALATED") -> dict:
+        """Return {assignedAgent: number of cases in status}."""
+
+    @abstractmethod
+    def update_where(self, transition: Callable[[dict], Optional[dict]], limit: Optional[int] = None,
+                     **criteria) -> list:
+        """Apply transition(case) to every matching case in a single transaction.
+
+        transition returns the field changes for a case, or None to leave it as is.
+        Returns (case as it was, changes or None) for each matched case, oldest first.
+        """
+
+    @abstractmethod
+    def search(self, text: Optional[str] = None, limit: int = 20, offset: int = 0, order: str = RECENT,
+               **criteria) -> dict:
+        """Full-text search over SEARCH_FIELDS, narrowed by the find() criteria and created_after.
+
+        Returns {"total", "cases", "facets": {"status": {value: count}, "type": {value: count}}, "exact"}.
+        The facets count the same cases as total, with every criterion applied.
+        Cases are newest first, or best match first for order=RELEVANCE. A backend may stop counting
+        after CASE_SEARCH_COUNT_LIMIT matches; total and facets are then lower bounds and exact is False.
+        """
+
+
+def _as_tuple(value) -> Optional[tuple]:
+    if value is None:
+        return None
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def _matches(case: dict, status=None, case_type=None, customer_id: Optional[str] = None,
+             created_before: Optional[str] = None, updated_before: Optional[str] = None,
+             created_after: Optional[str] = None) -> bool:
+    """Criteria shared by both backends. status and case_type accept one value or a sequence."""
+    statuses, types = _as_tuple(status), _as_tuple(case_type)
+    return (
+        (statuses is None or case.get("status") in statuses)
+        and (types is None or case.get("type") in types)
+        and (customer_id is None or case.get("customerId") == customer_id)
+        and (created_before is None or (case.get("createdAt") or "") < created_before)
+        and (updated_before is None or (case.get("updatedAt") or "") < updated_before)
+        and (created_after is None or (case.get("createdAt") or "") >= created_after)
+    )
+
+
+class DictCaseRepository(CaseRepository):
+    def __init__(self):
+        self._cases: dict = {}
+        # customerId → set of caseIds
+        self._by_customer: dict = {}
+        # token → set of caseIds, and caseId → tokens of each search field
+        self._index: dict = {}
+        self._field_tokens: dict = {}
+        self._lock = threading.Lock()
+
+    def _reindex(self, case: dict) -> None:
+        case_id = case["caseId"]
+        fields = tuple(tuple(tokenize(case.get(f))) for f in SEARCH_FIELDS)
+        old, new = set().union(*self._field_tokens.get(case_id, ())), set().union(*fields)
+        for token in old - new:
+            self._index[token].discard(case_id)
+            if not self._index[token]:
+                del self._index[token]
+        for token in new - old:
+            self._index.setdefault(token, set()).add(case_id)
+        self._field_tokens[case_id] = fields
+
+    def create(self, case: dict) -> dict:
+        with self._lock:
+            self._cases[case["caseId"]] = dict(case)
+            self._by_customer.setdefault(case["customerId"], set()).add(case["caseId"])
+            self._reindex(case)
+        return dict(case)
+
+    def get(self, case_id: str) -> Optional[dict]:
+        case = self._cases.get(case_id)
+        return dict(case) if case else None
+
+    def update(self, case_id: str, **fields) -> Optional[dict]:
+        with self._lock:
+            case = self._cases.get(case_id)
+            if case is None:
+                return None
+            case.update(fields)
+            self._reindex(case)
+            return dict(case)
+
+    def list_by_customer(self, customer_id: str, status: Optional[str] = None, limit: Optional[int] = None) -> list:
+        with self._lock:
+            cases = [self._cases[i] for i in self._by_customer.get(customer_id, ())]
+        if status is not None:
+            cases = [c for c in cases if c.get("status") == status]
+        cases.sort(key=lambda c: c.get("updatedAt") or "", reverse=True)
+        return [dict(c) for c in cases[:limit]]
+
+    def _select(self, limit: Optional[int], criteria: dict) -> list:
+        if criteria.get("customer_id") is not None:
+            candidates = [self._cases[i] for i in self._by_customer.get(criteria["customer_id"], ())]
+        else:
+            candidates = self._cases.values()
+        cases = sorted((c for c in candidates if _matches(c, **criteria)), key=lambda c: c.get("createdAt") or "")
+        return cases[:limit]
+
+    def find(self, limit: Optional[int] = None, **criteria) -> list:
+        with self._lock:
+            return [dict(c) for c in self._select(limit, criteria)]
+
+    def count_by_agent(self, status: str = "ESCALATED") -> dict:
+        counts: dict = {}
+        with self._lock:
+            for c in self._cases.values():
+                if c.get("status") == status and c.get("assignedAgent"):
+                    counts[c["assignedAgent"]] = counts.get(c["assignedAgent"], 0) + 1
+        return counts
+
+    def update_where(self, transition: Callable[[dict], Optional[dict]], limit: Optional[int] = None,
+                     **criteria) -> list:
+        with self._lock:
+            # Work out every change before applying any, so a failing transition leaves the store untouched
+            matched = self._select(limit, criteria)
+            results = [(dict(case), transition(dict(case)) or None) for case in matched]
+            for case, (_, changes) in zip(matched, results):
+                if changes:
+                    case.update(changes)
+                    self._reindex(case)
+            return results
+
+    def _item_ids(self, tokens: tuple, prefix: bool) -> set:
+        if prefix:
+            last = tokens[-1]
+            candidates = set().union(*(ids for token, ids in self._index.items() if token.startswith(last)))
+            for token in tokens[:-1]:
+                candidates &= self._index.get(token, set())
+        else:
+            candidates = set.intersection(*(self._index.get(token, set()) for token in tokens))
+        if len(tokens) == 1:
+            return candidates
+        return {case_id for case_id in candidates
+                if any(_has_phrase(field, tokens, prefix) for field in self._field_tokens[case_id])}
+
+    def search(self, text: Optional[str] = None, limit: int = 20, offset: int = 0, order: str = RECENT,
+               **criteria) -> dict:
+        statuses, types = _as_tuple(criteria.pop("status", None)), _as_tuple(criteria.pop("case_type", None))
+        items = parse_query(text)
+        with self._lock:
+            if items:
+                ids = set.intersection(*(self._item_ids(tokens, prefix) for tokens, prefix in items))
+            elif criteria.get("customer_id") is not None:
+                ids = self._by_customer.get(criteria["customer_id"], set())
+            else:
+                ids = self._cases.keys()
+            hits = [self._cases[i] for i in ids
+                    if _matches(self._cases[i], status=statuses, case_type=types, **criteria)]
+            pairs: dict = {}
+            for case in hits:
+                pairs[(case.get("status"), case.get("type"))] = pairs.get((case.get("status"), case.get("type")), 0) + 1
+            total, facets = _facets(pairs)
+            if order == RELEVANCE and items:
+                query = [token for tokens, _ in items for token in tokens]
+                score = lambda c: sum(f.count(t) for f in self._field_tokens[c["caseId"]] for t in query)
+                hits.sort(key=lambda c: (score(c), c.get("createdAt") or ""), reverse=True)
+            else:
+                hits.sort(key=lambda c: c.get("createdAt") or "", reverse=True)
+            return {"total": total, "cases": [dict(c) for c in hits[offset:offset + limit]], "facets": facets,
+                    "exact": True}
+
+
+def _has_phrase(field: tuple, tokens: tuple, prefix: bool) -> bool:
+    n = len(tokens)
+    for i in range(len(field) - n + 1):
+        if field[i:i + n - 1] == tokens[:-1] and (
+                field[i + n - 1].startswith(tokens[-1]) if prefix else field[i + n - 1] == tokens[-1]):
+            return True
+    return False
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    caseId        TEXT PRIMARY KEY,
+    customerId    TEXT NOT NULL,
+    customerName  TEXT,
+    type          TEXT,
+    description   TEXT,
+    chequeNumber  TEXT,
+    status        TEXT NOT NULL,
+    resolution    TEXT,
+    assignedAgent TEXT,
+    createdAt     TEXT NOT NULL,
+    updatedAt     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cases_customer_updated ON cases (customerId, updatedAt);
+CREATE INDEX IF NOT EXISTS idx_cases_customer_status_updated ON cases (customerId, status, updatedAt);
+CREATE INDEX IF NOT EXISTS idx_cases_status_updated ON cases (status, updatedAt);
+CREATE INDEX IF NOT EXISTS idx_cases_status_created ON cases (status, createdAt);
+CREATE INDEX IF NOT EXISTS idx_cases_status_agent ON cases (status, assignedAgent);
+CREATE INDEX IF NOT EXISTS idx_cases_updated ON cases (updatedAt);
+-- Covers facet counts over a date range
+CREATE INDEX IF NOT EXISTS idx_cases_created_status_type ON cases (createdAt, status, type);
+"""
+
+# Case counts per (status, type): facets for searches filtered on nothing else. No type is stored as ''.
+_COUNTS_SCHEMA = (
+    """CREATE TABLE case_counts (
+        status  TEXT NOT NULL,
+        type    TEXT NOT NULL,
+        n       INTEGER NOT NULL,
+        PRIMARY KEY (status, type)
+    ) WITHOUT ROWID""",
+    """CREATE TRIGGER case_counts_insert AFTER INSERT ON cases BEGIN
+        INSERT INTO case_counts (status, type, n) VALUES (new.status, COALESCE(new.type, ''), 1)
+            ON CONFLICT (status, type) DO UPDATE SET n = n + 1;
+    END""",
+    """CREATE TRIGGER case_counts_delete AFTER DELETE ON cases BEGIN
+        UPDATE case_counts SET n = n - 1 WHERE status = old.status AND type = COALESCE(old.type, '');
+    END""",
+    """CREATE TRIGGER case_counts_update AFTER UPDATE OF status, type ON cases
+    WHEN old.status IS NOT new.status OR old.type IS NOT new.type BEGIN
+        UPDATE case_counts SET n = n - 1 WHERE status = old.status AND type = COALESCE(old.type, '');
+        INSERT INTO case_counts (status, type, n) VALUES (new.status, COALESCE(new.type, ''), 1)
+            ON CONFLICT (status, type) DO UPDATE SET n = n + 1;
+    END""",
+    "INSERT INTO case_counts (status, type, n) SELECT status, COALESCE(type, ''), COUNT(*) FROM cases GROUP BY 1, 2",
+)
+
+# Full-text index over SEARCH_FIELDS, reading its text from the cases table (external content)
+_FTS_COLUMNS = ", ".join(SEARCH_FIELDS)
+_FTS_SCHEMA = (
+    f"""CREATE VIRTUAL TABLE cases_fts USING fts5(
+        {_FTS_COLUMNS}, content='cases', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER cases_fts_insert AFTER INSERT ON cases BEGIN
+        INSERT INTO cases_fts (rowid, {_FTS_COLUMNS})
+            VALUES (new.rowid, {", ".join(f"new.{f}" for f in SEARCH_FIELDS)});
+    END""",
+    f"""CREATE TRIGGER cases_fts_delete AFTER DELETE ON cases BEGIN
+        INSERT INTO cases_fts (cases_fts, rowid, {_FTS_COLUMNS})
+            VALUES ('delete', old.rowid, {", ".join(f"old.{f}" for f in SEARCH_FIELDS)});
+    END""",
+    f"""CREATE TRIGGER cases_fts_update AFTER UPDATE OF {_FTS_COLUMNS} ON cases BEGIN
+        INSERT INTO cases_fts (cases_fts, rowid, {_FTS_COLUMNS})
+            VALUES ('delete', old.rowid, {", ".join(f"old.{f}" for f in SEARCH_FIELDS)});
+        INSERT INTO cases_fts (rowid, {_FTS_COLUMNS})
+            VALUES (new.rowid, {", ".join(f"new.{f}" for f in SEARCH_FIELDS)});
+    END""",
+    # Indexes the cases stored before the index existed
+    "INSERT INTO cases_fts (cases_fts) VALUES ('rebuild')",
+)
+
+
+def _has_fts5() -> bool:
+    conn = sqlite3.connect(":memory:")
+    try:
+        return any(option == "ENABLE_FTS5" for (option,) in conn.execute("PRAGMA compile_options"))
+    finally:
+        conn.close()
+
+
+# Without FTS5 in the SQLite build, text search falls back to scanning with LIKE
+FTS5 = _has_fts5()
+
+
+def _init_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(_SCHEMA)
+    # Added to existing databases once, by whichever worker gets there first
+    with transaction(conn):
+        existing = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ('case_counts', 'cases_fts')")}
+        for name, statements in (("case_counts", _COUNTS_SCHEMA), ("cases_fts", _FTS_SCHEMA if FTS5 else ())):
+            if name not in existing:
+                for statement in statements:
+                    conn.execute(statement)
+
+
+class SqliteCaseRepository(CaseRepository):
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("cases.db")
+        self._db = ThreadLocalConnection(self.path, _init_schema)
+
+    def create(self, case: dict) -> dict:
+        row = {f: case.get(f) for f in CASE_FIELDS}
+        self._db.get().execute(
+            f"INSERT INTO cases ({', '.join(CASE_FIELDS)}) VALUES ({', '.join('?' * len(CASE_FIELDS))})",
+            tuple(row.values()),
+        )
+        return row
+
+    def get(self, case_id: str) -> Optional[dict]:
+        row = self._db.get().execute("SELECT * FROM cases WHERE caseId = ?", (case_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, case_id: str, **fields) -> Optional[dict]:
+        unknown = set(fields) - set(CASE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown case fields: {sorted(unknown)}")
+        conn = self._db.get()
+        with transaction(conn):
+            cur = conn.execute(
+                f"UPDATE cases SET {', '.join(f'{k} = ?' for k in fields)} WHERE caseId = ?",
+                (*fields.values(), case_id),
+            )
+            if cur.rowcount == 0:
+                return None
+            row = conn.execute("SELECT * FROM cases WHERE caseId = ?", (case_id,)).fetchone()
+        return dict(row)
+
+    def list_by_customer(self, customer_id: str, status: Optional[str] = None, limit: Optional[int] = None) -> list:
+        sql = "SELECT * FROM cases WHERE customerId = ?"
+        args: list = [customer_id]
+        if status is not None:
+            sql += " AND status = ?"
+            args.append(status)
+        sql += " ORDER BY updatedAt DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return [dict(r) for r in self._db.get().execute(sql, args)]
+
+    @staticmethod
+    def _where(status=None, case_type=None, customer_id: Optional[str] = None,
+               created_before: Optional[str] = None, updated_before: Optional[str] = None,
+               created_after: Optional[str] = None, table: str = "") -> tuple:
+        """SQL condition and arguments for the criteria; table qualifies the column names, e.g. "c."."""
+        clauses, args = [], []
+        for column, values in (("status", _as_tuple(status)), ("type", _as_tuple(case_type))):
+            if values is not None:
+                clauses.append(f"{table}{column} IN ({', '.join('?' * len(values))})")
+                args.extend(values)
+        for clause, value in (("customerId = ?", customer_id), ("createdAt < ?", created_before),
+                              ("updatedAt < ?", updated_before), ("createdAt >= ?", created_after)):
+            if value is not None:
+                clauses.append(table + clause)
+                args.append(value)
+        return " AND ".join(clauses) or "1", args
+
+    def _select(self, conn, limit: Optional[int], criteria: dict) -> list:
+        where, args = self._where(**criteria)
+        sql = f"SELECT * FROM cases WHERE {where} ORDER BY createdAt"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return [dict(r) for r in conn.execute(sql, args)]
+
+    def find(self, limit: Optional[int] = None, **criteria) -> list:
+        return self._select(self._db.get(), limit, criteria)
+
+    def count_by_agent(self, status: str = "ESCALATED") -> dict:
+        rows = self._db.get().execute(
+            "SELECT assignedAgent, COUNT(*) FROM cases WHERE status = ? AND assignedAgent IS NOT NULL "
+            "GROUP BY assignedAgent",
+            (status,),
+        )
+        return {agent: n for agent, n in rows}
+
+    def update_where(self, transition: Callable[[dict], Optional[dict]], limit: Optional[int] = None,
+                     **criteria) -> list:
+        conn = self._db.get()
+        results = []
+        # Changes grouped by the set of fields they touch, so each group is one executemany
+        batches: dict = {}
+        with transaction(conn):
+            for case in self._select(conn, limit, criteria):
+                changes = transition(dict(case))
+                if changes:
+                    unknown = set(changes) - set(CASE_FIELDS)
+                    if unknown:
+                        raise ValueError(f"Unknown case fields: {sorted(unknown)}")
+                    fields = tuple(sorted(changes))
+                    batches.setdefault(fields, []).append((*(changes[f] for f in fields), case["caseId"]))
+                results.append((case, changes or None))
+            for fields, rows in batches.items():
+                conn.executemany(f"UPDATE cases SET {', '.join(f'{k} = ?' for k in fields)} WHERE caseId = ?", rows)
+        return results
+
+    def search(self, text: Optional[str] = None, limit: int = 20, offset: int = 0, order: str = RECENT,
+               **criteria) -> dict:
+        statuses, types = _as_tuple(criteria.pop("status", None)), _as_tuple(criteria.pop("case_type", None))
+        items = parse_query(text)
+        conn = self._db.get()
+        where, args = self._where(status=statuses, case_type=types, table="c.", **criteria)
+        if items and FTS5:
+            source, row_order = "cases_fts JOIN cases c ON c.rowid = cases_fts.rowid", "cases_fts.rowid DESC"
+            match = " ".join('"' + " ".join(tokens) + '"' + ("*" if prefix else "") for tokens, prefix in items)
+            where, args = f"cases_fts MATCH ? AND {where}", [match, *args]
+            if order == RELEVANCE:
+                row_order = "bm25(cases_fts), cases_fts.rowid DESC"
+        else:
+            source, row_order = "cases c", "c.createdAt DESC"
+            for tokens, prefix in items:
+                pattern = "%" + "%".join(tokens) + "%"
+                where += " AND (" + " OR ".join(f"c.{f} LIKE ?" for f in SEARCH_FIELDS) + ")"
+                args.extend([pattern] * len(SEARCH_FIELDS))
+
+        exact = True
+        if items or any(value is not None for value in criteria.values()):
+            counted = source
+            if source == "cases c" and criteria.get("customer_id") is None and (
+                    criteria.get("created_after") or criteria.get("created_before")):
+                # Left to itself the planner walks the status index and reads every row
+                counted += " INDEXED BY idx_cases_created_status_type"
+            rows = conn.execute(
+                f"SELECT status, type, COUNT(*) FROM (SELECT c.status AS status, c.type AS type FROM {counted} "
+                f"WHERE {where} LIMIT ?) GROUP BY 1, 2",
+                (*args, COUNT_LIMIT + 1),
+            )
+            pairs = {(status, case_type): n for status, case_type, n in rows}
+            exact = sum(pairs.values()) <= COUNT_LIMIT
+        else:
+            rows = conn.execute("SELECT status, type, n FROM case_counts WHERE n > 0")
+            pairs = {(status, case_type or None): n for status, case_type, n in rows
+                     if (statuses is None or status in statuses) and (types is None or case_type in types)}
+        total, facets = _facets(pairs)
+
+        cases = [dict(r) for r in conn.execute(
+            f"SELECT c.* FROM {source} WHERE {where} ORDER BY {row_order} LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        )] if total > offset else []
+        return {"total": total, "cases": cases, "facets": facets, "exact": exact}
+
+
+_repository: Optional[CaseRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> CaseRepository:
+    """Return the process-wide repository selected by CASE_STORE, creating it on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                if os.environ.get("CASE_STORE", "sqlite").lower() == "memory":
+                    _repository = DictCaseRepository()
+                else:
+                    _repository = SqliteCaseRepository(os.environ.get("CASE_DB_PATH"))
+    return _repository
+
+
+def set_repository(repository: CaseRepository) -> None:
+    """Swap the repository, e.g. for a DictCaseRepository in tests."""
+    global _repository
+    _repository = repository
@@ -7,19 +7,95 @@ Tools:
   - get_complaint_case      – retrieve status and details of an existing case
   - close_complaint_case    – mark a case as resolved/closed
   - escalate_complaint_case – escalate a case to a human agent with transcript
+  - list_complaint_cases    – list a customer's cases, optionally filtered by status
+  - get_case_timeline       – every status change of a case, with when, by whom and why
 
 Case states: OPEN → VERIFIED → CLOSED | ESCALATED
+
+Cases are persisted through case_repository (SQLite in WAL mode by default),
+so they survive restarts and are shared by every tool-server worker. Every
+change is also appended to the case event log (case_events), which keeps the
+transition history the repository overwrites.
+
+A case that names a cheque links it to the cheque watcher (cheque_watcher.py):
+once the watcher sees the cheque clear, the case is closed, and once it sees
+it returned, an OPEN case moves to VERIFIED for an agent to follow up.
+
+create, close and escalate are idempotent (idempotency.py): an identical call
+repeated within IDEMPOTENCY_WINDOW_SECONDS returns the original reply, so an
+agent retry does not open a duplicate case.
+
+escalate_complaint_case only opens a new case when it is given no case ID. An
+ID that does not exist, or belongs to another customer, gets "not found" and
+the customer's open cases, so a garbled ID never escalates a case the
+customer did not name.
+
+Back-office helpers (plain functions, not agent tools):
+  - find_cases             – select cases by status, type, customer and age
+  - bulk_transition_cases  – move every matching case to a new status in one transaction
+  - bulk_close_cases       – e.g. close all VERIFIED cases
+  - bulk_escalate_cases    – e.g. escalate every OPEN cheque case older than 48h
+  - search_cases           – full-text search with status/type facets and paging, for the agent console
+Each bulk call returns one result dict per matched case.
 """
 
+import datetime
+import logging
 import time
 import random
 import string
 from typing import Optional
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
 
-# In-memory case store (per-agent process lifetime, sufficient for demo)
-# Key: case_id → AgentCase dict
-_cases: dict = {}
+import cheque_watcher
+import idempotency
+import metrics
+import rate_limiter
+import response_templates as templates
+import token_budget
+import warmup
+from agent_assignment import get_engine
+from case_events import CREATED, TRANSITION, get_event_log
+from case_repository import CASE_TRANSITIONS, RECENT, RELEVANCE, get_repository
+
+logger = logging.getLogger(__name__)
+
+CASE_STATUSES = ("OPEN", "VERIFIED", "CLOSED", "ESCALATED")
+MAX_LISTED_CASES = 20
+MAX_TIMELINE_EVENTS = 50
+
+# Actor recorded in the event log for changes made through the agent tools
+TOOL_ACTOR = "assistant"
+
+
+templates.register("case_created", (
+    "✅ Complaint registered successfully!\n"
+    "\n"
+    "📁 Case Details:\n"
+    "• Case ID:        {caseId}\n"
+    "• Type:           {type:label}\n"
+    "• Status:         {status}\n"
+    "• Description:    {description}\n"
+    "?• Cheque Number:  {chequeNumber}\n"
+    "• Created At:     {createdAt:date}\n"
+    "\n"
+    "You will receive updates at your registered mobile/email. "
+    "Is this resolved to your satisfaction, or would you like to escalate to a human agent?"
+))
+templates.register("case_details", (
+    "📁 Case {caseId}:\n"
+    "• Status:         {status}\n"
+    "• Type:           {type:label}\n"
+    "• Description:    {description}\n"
+    "• Created:        {createdAt:date}\n"
+    "• Last Updated:   {updatedAt:date}\n"
+    "?• Assigned Agent: {assignedAgent}\n"
+    "?• Resolution:     {resolution}"
+))
+
+# Case fields shown to the customer (and returned in JSON output)
+CASE_FIELDS = ("caseId", "status", "type", "description", "chequeNumber", "assignedAgent", "resolution",
+               "createdAt", "updatedAt")
 
 
 def _make_case_id() -> str:
@@ -28,17 +104,27 @@ def _make_case_id() -> str:
 
 
 def _now_iso() -> str:
-    import datetime
     return datetime.datetime.utcnow().isoformat() + "Z"
 
 
+def _format_eta(minutes: int) -> str:
+    if minutes < 120:
+        return f"within {minutes} minutes"
+    return f"within about {round(minutes / 60)} hours"
+
+
 @tool()
+@metrics.instrumented
+@token_budget.budgeted
+@idempotency.idempotent()
+@rate_limiter.limited
 def create_complaint_case(
     customer_id: str,
     customer_name: str,
     complaint_type: str,
     description: str,
     cheque_number: Optional[str] = None,
+    output_format: Optional[str] = None,
 ) -> str:
     """Register a new complaint/case for the authenticated customer.
 
@@ -51,6 +137,7 @@ def create_complaint_case(
         complaint_type (str): Type of complaint. Use one of: CHEQUE_NOT_CREDITED, MISSING_TRANSACTION, CARD_ISSUE, GENERAL_COMPLAINT.
         description (str): Detailed description of the complaint as stated by the customer.
         cheque_number (str, optional): The cheque number, if the complaint relates to a cheque.
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
 
     Returns:
         str: Confirmation message with the new case ID, status, and next steps.
@@ -58,7 +145,7 @@ def create_complaint_case(
     case_id = _make_case_id()
     created_at = _now_iso()
 
-    _cases[case_id] = {
+    case = {
         "caseId": case_id,
         "customerId": customer_id,
         "customerName": customer_name,
@@ -71,33 +158,33 @@ def create_complaint_case(
         "createdAt": created_at,
         "updatedAt": created_at,
     }
-
-    cheque_note = f"\n• Cheque Number:  {cheque_number}" if cheque_number else ""
-    return (
-        f"✅ Complaint registered successfully!\n\n"
-        f"📁 Case Details:\n"
-        f"• Case ID:        {case_id}\n"
-        f"• Type:           {complaint_type.replace('_', ' ')}\n"
-        f"• Status:         OPEN\n"
-        f"• Description:    {description}{cheque_note}\n"
-        f"• Created At:     {created_at[:10]}\n\n"
-        "You will receive updates at your registered mobile/email. "
-        "Is this resolved to your satisfaction, or would you like to escalate to a human agent?"
+    get_repository().create(case)
+    get_event_log().append(
+        case_id, CREATED, to_status="OPEN", actor=TOOL_ACTOR, reason=description,
+        data={"customerId": customer_id, "type": complaint_type}, ts=created_at,
     )
+    if cheque_number:
+        cheque_watcher.watch(customer_id, cheque_number, case_id)
+
+    return templates.render("case_created", {k: case[k] for k in CASE_FIELDS}, output_format)
 
 
 @tool()
-def get_complaint_case(customer_id: str, case_id: str) -> str:
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_complaint_case(customer_id: str, case_id: str, output_format: Optional[str] = None) -> str:
     """Retrieve the current status and details of an existing complaint case.
 
     Args:
         customer_id (str): The unique customer identifier from the authenticated session.
         case_id (str): The case ID to look up (format: CASE-XXXXXXXXXX-XXXXX).
+        output_format (str, optional): 'text' (default) for a customer-facing reply, or 'json' for compact machine-readable output.
 
     Returns:
         str: The case details including current status, description, and resolution.
     """
-    case = _cases.get(case_id)
+    case = get_repository().get(case_id)
 
     if not case:
         return f"Case {case_id} not found. Please verify the case ID and try again."
@@ -105,21 +192,16 @@ def get_complaint_case(customer_id: str, case_id: str) -> str:
     if case.get("customerId") != customer_id:
         return f"Case {case_id} does not belong to your account."
 
-    agent_note = f"\n• Assigned Agent: {case['assignedAgent']}" if case.get("assignedAgent") else ""
-    resolution_note = f"\n• Resolution:     {case['resolution']}" if case.get("resolution") else ""
-
-    return (
-        f"📁 Case {case_id}:\n"
-        f"• Status:         {case.get('status', 'OPEN')}\n"
-        f"• Type:           {case.get('type', '').replace('_', ' ')}\n"
-        f"• Description:    {case.get('description', 'N/A')}\n"
-        f"• Created:        {case.get('createdAt', '')[:10]}\n"
-        f"• Last Updated:   {case.get('updatedAt', '')[:10]}"
-        f"{agent_note}{resolution_note}"
-    )
+    values = {k: case.get(k) for k in CASE_FIELDS}
+    values["status"] = values["status"] or "OPEN"
+    return templates.render("case_details", values, output_format)
 
 
 @tool()
+@metrics.instrumented
+@token_budget.budgeted
+@idempotency.idempotent()
+@rate_limiter.limited
 def close_complaint_case(customer_id: str, case_id: str, resolution_note: str = "Resolved – customer satisfied") -> str:
     """Close a complaint case when the customer is satisfied with the resolution.
 
@@ -131,7 +213,8 @@ def close_complaint_case(customer_id: str, case_id: str, resolution_note: str =
     Returns:
         str: Confirmation that the case has been closed.
     """
-    case = _cases.get(case_id)
+    repo = get_repository()
+    case = repo.get(case_id)
 
     if not case:
         return f"Case {case_id} not found."
@@ -139,9 +222,14 @@ def close_complaint_case(customer_id: str, case_id: str, resolution_note: str =
     if case.get("customerId") != customer_id:
         return f"Case {case_id} does not belong to your account."
 
-    case["status"] = "CLOSED"
-    case["resolution"] = resolution_note
-    case["updatedAt"] = _now_iso()
+    updated_at = _now_iso()
+    repo.update(case_id, status="CLOSED", resolution=resolution_note, updatedAt=updated_at)
+    get_event_log().append(
+        case_id, TRANSITION, from_status=case.get("status"), to_status="CLOSED",
+        actor=TOOL_ACTOR, reason=resolution_note, ts=updated_at,
+    )
+    if case.get("status") == "ESCALATED":
+        get_engine().release(case.get("assignedAgent"))
 
     return (
         f"✅ Case {case_id} has been CLOSED.\n"
@@ -151,6 +239,10 @@ def close_complaint_case(customer_id: str, case_id: str, resolution_note: str =
 
 
 @tool()
+@metrics.instrumented
+@token_budget.budgeted
+@idempotency.idempotent()
+@rate_limiter.limited
 def escalate_complaint_case(
     customer_id: str,
     case_id: str,
@@ -163,18 +255,28 @@ def escalate_complaint_case(
 
     Args:
         customer_id (str): The unique customer identifier from the authenticated session.
-        case_id (str): The case ID to escalate.
+        case_id (str): The case ID to escalate. Leave empty when the customer has no case yet,
+            to open one and escalate it.
         reason (str): Reason for escalation.
 
     Returns:
         str: Confirmation of escalation with the assigned human agent name and expected contact time.
     """
-    case = _cases.get(case_id)
+    repo = get_repository()
+    case_id = (case_id or "").strip()
+    case = repo.get(case_id) if case_id else None
+    engine = get_engine()
+
+    # Another customer's case gets the same reply as an unknown ID, so case IDs cannot be probed
+    if case_id and (not case or case.get("customerId") != customer_id):
+        return (f"Error – case {case_id} was not found. Please verify the case ID and try again.\n\n"
+                + _open_cases_note(customer_id))
 
-    # Create a new case if case_id not yet in memory (e.g., first message is escalation)
+    # No case yet (e.g., first message is escalation): open one
     if not case:
         case_id = _make_case_id()
-        _cases[case_id] = {
+        created_at = _now_iso()
+        repo.create({
             "caseId": case_id,
             "customerId": customer_id,
             "customerName": "Customer",
@@ -183,24 +285,365 @@ def escalate_complaint_case(
             "status": "OPEN",
             "resolution": None,
             "assignedAgent": None,
-            "createdAt": _now_iso(),
-            "updatedAt": _now_iso(),
-        }
-        case = _cases[case_id]
-
-    agents = ["Priya Verma", "Rohit Sharma", "Anita Desai", "Karan Mehta"]
-    assigned = random.choice(agents)
-
-    case["status"] = "ESCALATED"
-    case["assignedAgent"] = assigned
-    case["updatedAt"] = _now_iso()
+            "createdAt": created_at,
+            "updatedAt": created_at,
+        })
+        get_event_log().append(
+            case_id, CREATED, to_status="OPEN", actor=TOOL_ACTOR, reason=reason,
+            data={"customerId": customer_id, "type": "GENERAL_COMPLAINT"}, ts=created_at,
+        )
+
+    # Re-escalating keeps the agent already working the case
+    if case and case.get("status") == "ESCALATED" and case.get("assignedAgent") in engine.agents:
+        assignment = engine.current(case["assignedAgent"])
+    else:
+        assignment = engine.assign(case.get("type") if case else "GENERAL_COMPLAINT")
+    assigned = assignment.agent
+
+    updated_at = _now_iso()
+    repo.update(case_id, status="ESCALATED", assignedAgent=assigned, updatedAt=updated_at)
+    get_event_log().append(
+        case_id, TRANSITION, from_status=case.get("status") if case else "OPEN", to_status="ESCALATED",
+        actor=TOOL_ACTOR, reason=reason, data={"assignedAgent": assigned}, ts=updated_at,
+    )
 
     return (
         f"🔴 Case {case_id} has been ESCALATED to a senior agent.\n\n"
         f"• Assigned Agent:  {assigned}\n"
         f"• Reason:          {reason}\n"
         f"• Escalation Time: {_now_iso()[:10]}\n\n"
-        "Our agent will contact you within 30 minutes on your registered mobile number. "
+        f"Our agent will contact you {_format_eta(assignment.eta_minutes)} on your registered mobile number. "
         "The full conversation transcript has been forwarded. "
         "Is there anything else you'd like to note for the agent?"
     )
+
+
+def _open_cases_note(customer_id: str) -> str:
+    """The customer's cases that are not closed, most recently updated first, for a "not found" reply."""
+    repo = get_repository()
+    cases = [c for status in ("OPEN", "VERIFIED", "ESCALATED")
+             for c in repo.list_by_customer(customer_id, status=status, limit=MAX_LISTED_CASES)]
+    if not cases:
+        return "You have no open complaint cases."
+    cases.sort(key=lambda c: c.get("updatedAt") or "", reverse=True)
+    lines = [
+        f"• {c['caseId']} | {c.get('status', 'OPEN')} | {(c.get('type') or '').replace('_', ' ')}"
+        for c in cases[:MAX_LISTED_CASES]
+    ]
+    return "Your open complaint cases:\n" + "\n".join(lines)
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def list_complaint_cases(customer_id: str, status: Optional[str] = None) -> str:
+    """List the complaint cases registered for the authenticated customer, most recently updated first.
+
+    Use this tool when the customer asks about their cases without giving a case ID,
+    e.g. "what complaints do I have open?".
+
+    Args:
+        customer_id (str): The unique customer identifier from the authenticated session.
+        status (str, optional): Only list cases in this status. One of: OPEN, VERIFIED, CLOSED, ESCALATED.
+
+    Returns:
+        str: One line per case with its ID, status, type and last update date.
+    """
+    if status:
+        status = status.strip().upper()
+        if status not in CASE_STATUSES:
+            return f"Unknown case status '{status}'. Use one of: {', '.join(CASE_STATUSES)}."
+
+    cases = get_repository().list_by_customer(customer_id, status=status or None, limit=MAX_LISTED_CASES + 1)
+    status_label = f"{status} " if status else ""
+
+    if not cases:
+        return f"No {status_label}complaint cases found for your account."
+
+    lines = [
+        f"• {c['caseId']} | {c.get('status', 'OPEN')} | {(c.get('type') or '').replace('_', ' ')} | "
+        f"Updated {(c.get('updatedAt') or '')[:10]}"
+        for c in cases[:MAX_LISTED_CASES]
+    ]
+    more = f"\nShowing the {MAX_LISTED_CASES} most recently updated cases." if len(cases) > MAX_LISTED_CASES else ""
+    return f"📁 Your {status_label}complaint cases:\n" + "\n".join(lines) + more
+
+
+def _format_event(i: int, event: dict) -> str:
+    when = (event.get("ts") or "")[:16].replace("T", " ")
+    if event.get("type") == CREATED:
+        change = "Case opened"
+    else:
+        change = f"{event.get('from') or '?'} → {event.get('to') or '?'}"
+    agent = (event.get("data") or {}).get("assignedAgent")
+    agent_note = f" (assigned to {agent})" if agent else ""
+    reason_note = f" – {event['reason']}" if event.get("reason") else ""
+    return f"{i}. {when} UTC | {change}{agent_note} | by {event.get('actor', 'system')}{reason_note}"
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
+def get_case_timeline(customer_id: str, case_id: str) -> str:
+    """Show the full history of a complaint case: every status change with when it happened, who made it and why.
+
+    Use this tool when the customer or an agent asks what has happened on a case so far,
+    e.g. "when was my case escalated?" or "who closed this case?".
+
+    Args:
+        customer_id (str): The unique customer identifier from the authenticated session.
+        case_id (str): The case ID to look up (format: CASE-XXXXXXXXXX-XXXXX).
+
+    Returns:
+        str: The case's events in chronological order, followed by its current status.
+    """
+    case = get_repository().get(case_id)
+
+    if not case:
+        return f"Case {case_id} not found. Please verify the case ID and try again."
+
+    if case.get("customerId") != customer_id:
+        return f"Case {case_id} does not belong to your account."
+
+    events = get_event_log().timeline(case_id)
+    if not events:
+        return (
+            f"No recorded history for case {case_id} yet.\n"
+            f"Current status: {case.get('status', 'OPEN')} (last updated {(case.get('updatedAt') or '')[:10]})"
+        )
+
+    lines = [_format_event(i, e) for i, e in enumerate(events[-MAX_TIMELINE_EVENTS:], 1)]
+    older = len(events) - MAX_TIMELINE_EVENTS
+    older_note = f"\n({older} earlier events not shown)" if older > 0 else ""
+    return (
+        f"🕒 Timeline for case {case_id}:\n" + "\n".join(lines) + older_note
+        + f"\n\nCurrent status: {case.get('status', 'OPEN')}"
+    )
+
+
+# ── Back-office bulk operations ───────────────────────────────────────────────
+
+def _statuses(status) -> Optional[tuple]:
+    if status is None:
+        return None
+    values = tuple(v.strip().upper() for v in ([status] if isinstance(status, str) else status))
+    unknown = [v for v in values if v not in CASE_STATUSES]
+    if unknown:
+        raise ValueError(f"Unknown case status {unknown}. Use one of: {', '.join(CASE_STATUSES)}")
+    return values
+
+
+def _criteria(status=None, complaint_type=None, customer_id: Optional[str] = None,
+              older_than_hours: Optional[float] = None) -> dict:
+    created_before = None
+    if older_than_hours is not None:
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=older_than_hours)
+        created_before = cutoff.isoformat() + "Z"
+    return {
+        "status": _statuses(status),
+        "case_type": [complaint_type] if isinstance(complaint_type, str) else complaint_type,
+        "customer_id": customer_id,
+        "created_before": created_before,
+    }
+
+
+def find_cases(
+    status=None,
+    complaint_type=None,
+    customer_id: Optional[str] = None,
+    older_than_hours: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> list:
+    """Return cases matching every given criterion, oldest first.
+
+    Args:
+        status: One status or a list of statuses.
+        complaint_type: One complaint type or a list of types, e.g. "CHEQUE_NOT_CREDITED".
+        customer_id: Only this customer's cases.
+        older_than_hours: Only cases created more than this many hours ago.
+        limit: Maximum number of cases to return.
+    """
+    return get_repository().find(limit=limit, **_criteria(status, complaint_type, customer_id, older_than_hours))
+
+
+def bulk_transition_cases(
+    new_status: str,
+    status=None,
+    complaint_type=None,
+    customer_id: Optional[str] = None,
+    older_than_hours: Optional[float] = None,
+    limit: Optional[int] = None,
+    resolution: Optional[str] = None,
+    assign=None,
+    actor: str = "back-office",
+    reason: Optional[str] = None,
+) -> list:
+    """Move every matching case to new_status in a single transaction.
+
+    Cases whose current status cannot move to new_status (see CASE_TRANSITIONS)
+    are left untouched and reported as SKIPPED. assign runs after that
+    transaction commits, once per updated case, and each agent is written with
+    its own update: assign may count the escalation against the agent, which a
+    rolled-back transaction would otherwise leave counted.
+
+    Args:
+        new_status: Target status.
+        status, complaint_type, customer_id, older_than_hours, limit: Selection, as in find_cases.
+        resolution: Resolution note to set on every updated case.
+        assign: Optional callable(case) returning the agent to assign to each updated case.
+            If writing the agent fails, it is handed to get_engine().release() and the case
+            is reported UPDATED with a reason instead of an assignedAgent.
+        actor: Who made the change, as recorded in the case event log.
+        reason: Why, as recorded in the case event log (defaults to the resolution note).
+
+    Returns:
+        list: One dict per matched case with caseId, customerId, previousStatus,
+        status, result (UPDATED or SKIPPED) and, when relevant, reason and assignedAgent.
+    """
+    (new_status,) = _statuses(new_status)
+    now = _now_iso()
+
+    def transition(case: dict) -> Optional[dict]:
+        if new_status not in CASE_TRANSITIONS.get(case.get("status"), ()):
+            return None
+        changes = {"status": new_status, "updatedAt": now}
+        if resolution is not None:
+            changes["resolution"] = resolution
+        return changes
+
+    repo = get_repository()
+    matched = repo.update_where(
+        transition, limit=limit, **_criteria(status, complaint_type, customer_id, older_than_hours),
+    )
+    engine = get_engine()
+    unassigned = set()
+    if assign is not None:
+        for case, changes in matched:
+            if changes:
+                agent = assign(case)
+                try:
+                    repo.update(case["caseId"], assignedAgent=agent)
+                except Exception:
+                    logger.warning("Could not assign case %s to %s", case["caseId"], agent, exc_info=True)
+                    engine.release(agent)
+                    unassigned.add(case["caseId"])
+                    continue
+                changes["assignedAgent"] = agent
+
+    get_event_log().append_many(
+        {
+            "caseId": case["caseId"], "type": TRANSITION, "from": case.get("status"), "to": new_status,
+            "actor": actor, "reason": reason or resolution, "ts": now,
+            "data": {"assignedAgent": changes["assignedAgent"]} if "assignedAgent" in changes else None,
+        }
+        for case, changes in matched if changes
+    )
+
+    results = []
+    for case, changes in matched:
+        if changes and case.get("status") == "ESCALATED" and new_status != "ESCALATED":
+            engine.release(case.get("assignedAgent"))
+        result = {
+            "caseId": case["caseId"],
+            "customerId": case.get("customerId"),
+            "previousStatus": case.get("status"),
+            "status": changes["status"] if changes else case.get("status"),
+            "result": "UPDATED" if changes else "SKIPPED",
+        }
+        if changes is None:
+            result["reason"] = f"Cannot move a {case.get('status')} case to {new_status}"
+        elif case["caseId"] in unassigned:
+            result["reason"] = "No agent could be assigned"
+        elif "assignedAgent" in changes:
+            result["assignedAgent"] = changes["assignedAgent"]
+        results.append(result)
+    return results
+
+
+def bulk_close_cases(resolution_note: str = "Closed by back-office review", **criteria) -> list:
+    """Close every case matching the criteria (see find_cases). Returns per-case results."""
+    return bulk_transition_cases("CLOSED", resolution=resolution_note, **criteria)
+
+
+def bulk_escalate_cases(**criteria) -> list:
+    """Escalate every case matching the criteria (see find_cases) to the least-loaded qualified agents.
+
+    Returns per-case results including the assigned agent.
+    """
+    engine = get_engine()
+    return bulk_transition_cases("ESCALATED", assign=lambda case: engine.assign(case.get("type")).agent, **criteria)
+
+
+# ── Agent console search ──────────────────────────────────────────────────────
+
+MAX_SEARCH_PAGE_SIZE = 100
+SEARCH_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+case_search_seconds = metrics.Histogram(
+    "swiftbank_case_search_seconds", "Latency of agent console case searches.", (), SEARCH_BUCKETS,
+)
+metrics.register(case_search_seconds)
+
+
+def search_cases(
+    text: Optional[str] = None,
+    status=None,
+    complaint_type=None,
+    customer_id: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    newer_than_hours: Optional[float] = None,
+    page: int = 1,
+    page_size: int = 20,
+    order: str = RECENT,
+) -> dict:
+    """Search cases across all customers, e.g. CHEQUE_NOT_CREDITED cases mentioning HDFC from the last week:
+
+        search_cases("HDFC", complaint_type="CHEQUE_NOT_CREDITED", newer_than_hours=7 * 24)
+
+    Args:
+        text: Words that must all appear in the description, resolution, type, status or cheque
+            number; "quoted phrases" and prefix* words are supported. None matches every case.
+        status, complaint_type, customer_id: Selection, as in find_cases.
+        created_after, created_before: ISO dates or timestamps bounding createdAt.
+        newer_than_hours: Only cases created within this many hours.
+        page: 1-based page number.
+        page_size: Cases per page (at most MAX_SEARCH_PAGE_SIZE).
+        order: "recent" (newest first) or "relevance" (best match first).
+
+    Returns:
+        {"total", "exact", "page", "pageSize", "pages", "cases", "facets"}. facets holds counts by
+        status and by type of the same cases as total, with every filter applied. When exact is False
+        the search matched more than CASE_SEARCH_COUNT_LIMIT cases, and total, pages and facets are
+        lower bounds ("10,000+").
+    """
+    if order not in (RECENT, RELEVANCE):
+        raise ValueError(f"Unknown order {order!r}. Use {RECENT!r} or {RELEVANCE!r}")
+    page, page_size = max(1, page), min(max(1, page_size), MAX_SEARCH_PAGE_SIZE)
+    criteria = _criteria(status, complaint_type, customer_id)
+    del criteria["created_before"]
+    if newer_than_hours is not None:
+        cutoff = (datetime.datetime.utcnow() - datetime.timedelta(hours=newer_than_hours)).isoformat() + "Z"
+        created_after = max(created_after or "", cutoff)
+
+    start = time.perf_counter()
+    result = get_repository().search(
+        text, limit=page_size, offset=(page - 1) * page_size, order=order,
+        created_after=created_after or None, created_before=created_before, **criteria,
+    )
+    case_search_seconds.observe(time.perf_counter() - start)
+    return {
+        "total": result["total"],
+        "exact": result["exact"],
+        "page": page,
+        "pageSize": page_size,
+        "pages": -(-result["total"] // page_size),
+        "cases": result["cases"],
+        "facets": result["facets"],
+    }
+
+
+# Runs the warm-up if SWIFTBANK_WARMUP asks for it, then marks the instance ready
+warmup.start()
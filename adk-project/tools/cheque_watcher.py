@@ -0,0 +1,607 @@
+"""
+Cheque clearance watcher
+
+Customers ask "has my cheque cleared?" again and again, and every question
+used to be a fresh /cheque/{n} call. The watcher keeps the last known status
+of every pending cheque, re-checks it in the background and answers
+get_cheque_status from that state:
+
+  - a cheque is watched once get_cheque_status sees it still pending, when a
+    complaint case names it (create_complaint_case), when a deposit is
+    registered with watch(), and on start-up for every open case that has a
+    chequeNumber
+  - a background thread claims due cheques in batches of CHEQUE_POLL_BATCH
+    every CHEQUE_POLL_INTERVAL_SECONDS, at most CHEQUE_POLL_CONCURRENCY at a
+    time. A claim is a lease in the shared store, so several workers never
+    poll the same cheque at once
+  - before its expectedClearanceDate a cheque is re-checked when that date
+    starts, or at least every CHEQUE_MAX_INTERVAL_SECONDS. After that date the
+    interval doubles from CHEQUE_MIN_INTERVAL_SECONDS with every poll that
+    finds it still pending. Failed polls back off the same way
+  - get_cheque_status is answered from the state while it is younger than
+    CHEQUE_STATUS_MAX_AGE_SECONDS, and always once the cheque has cleared or
+    been returned, since those outcomes are final
+
+When a status changes, the watcher moves the linked case on itself: it
+closes the case when the cheque clears and moves an OPEN case to VERIFIED,
+for an agent to follow up, when it is returned. It does this in whichever
+process saw the change, whether or not case_tools is loaded there. The
+registered listeners are then called with an update dict (see
+register_listener). With CHEQUE_WEBHOOK_URL set, every change is also pushed
+there as JSON. Only changes the watcher actually observed are
+reported: a cheque that had already cleared when it was first seen is
+recorded but not announced.
+
+Backends:
+  - SqliteChequeStore – default; WAL-mode SQLite shared by all workers
+  - MemoryChequeStore – in-process dict, for tests
+
+Configuration (environment variables):
+  - CHEQUE_WATCHER                 – "false" to disable background polling (default on)
+  - CHEQUE_STORE                   – "sqlite" (default) or "memory"
+  - CHEQUE_DB_PATH                 – SQLite file path (default: $SWIFTBANK_DATA_DIR/cheques.db)
+  - CHEQUE_POLL_INTERVAL_SECONDS   – seconds between poll batches (default 10)
+  - CHEQUE_POLL_BATCH              – cheques claimed per batch and worker (default 20)
+  - CHEQUE_POLL_CONCURRENCY        – upstream calls in flight per batch (default 5)
+  - CHEQUE_MIN_INTERVAL_SECONDS    – first re-check interval once a cheque is due (default 300)
+  - CHEQUE_MAX_INTERVAL_SECONDS    – longest re-check interval (default 21600)
+  - CHEQUE_STATUS_MAX_AGE_SECONDS  – how old a pending status may be and still answer
+                                     get_cheque_status (default 300)
+  - CHEQUE_WATCH_DAYS              – stop watching a cheque after this many days (default 30)
+  - CHEQUE_WEBHOOK_URL             – POST every status change here (default unset)
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+import bankmock_client as bankmock
+import metrics
+import response_templates as templates
+from agent_assignment import get_engine
+from case_events import TRANSITION, get_event_log
+from case_repository import CASE_TRANSITIONS, get_repository
+from storage import ThreadLocalConnection, data_path, transaction
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("CHEQUE_WATCHER", "true").lower() not in ("0", "false", "no")
+POLL_INTERVAL_SECONDS = float(os.environ.get("CHEQUE_POLL_INTERVAL_SECONDS", 10))
+POLL_BATCH = int(os.environ.get("CHEQUE_POLL_BATCH", 20))
+POLL_CONCURRENCY = int(os.environ.get("CHEQUE_POLL_CONCURRENCY", 5))
+MIN_INTERVAL_SECONDS = float(os.environ.get("CHEQUE_MIN_INTERVAL_SECONDS", 300))
+MAX_INTERVAL_SECONDS = float(os.environ.get("CHEQUE_MAX_INTERVAL_SECONDS", 6 * 3600))
+STATUS_MAX_AGE_SECONDS = float(os.environ.get("CHEQUE_STATUS_MAX_AGE_SECONDS", 300))
+WATCH_SECONDS = float(os.environ.get("CHEQUE_WATCH_DAYS", 30)) * 86400
+WEBHOOK_URL = os.environ.get("CHEQUE_WEBHOOK_URL")
+# A claimed cheque is not handed to another worker for this long
+LEASE_SECONDS = 60
+SWEEP_INTERVAL_SECONDS = 3600
+# Actor recorded in the case event log for the case changes the watcher makes
+WATCHER_ACTOR = "cheque-watcher"
+
+# Outcomes (the upstream status itself is kept as reported)
+PENDING = "PENDING"
+CLEARED = "CLEARED"
+RETURNED = "RETURNED"
+NOT_FOUND = "NOT_FOUND"
+
+CLEARED_STATUSES = ("CLEARED", "CREDITED", "COMPLETED", "SUCCESS")
+RETURNED_STATUSES = ("RETURNED", "BOUNCED", "REJECTED", "DISHONOURED", "DISHONORED")
+
+polls = metrics.Counter("swiftbank_cheque_polls_total", "Background cheque status checks.", ("outcome",))
+served = metrics.Counter(
+    "swiftbank_cheque_status_served_total", "get_cheque_status answers by where they came from.", ("source",),
+)
+for _metric in (polls, served):
+    metrics.register(_metric)
+
+
+def outcome_of(status: Optional[str]) -> str:
+    """Map an upstream cheque status (e.g. "Processing", "Cleared") to PENDING, CLEARED or RETURNED."""
+    normalised = (status or "").strip().upper()
+    if normalised in CLEARED_STATUSES:
+        return CLEARED
+    if normalised in RETURNED_STATUSES:
+        return RETURNED
+    return PENDING
+
+
+def _parse_date(value) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def next_check_delay(expected_date: Optional[str], polls_unchanged: int, now: float) -> float:
+    """Seconds until a pending cheque is re-checked.
+
+    Before the expected clearance date: when that date starts (UTC), capped at
+    MAX_INTERVAL_SECONDS. From that date on: MIN_INTERVAL_SECONDS doubled for
+    every poll that found the cheque unchanged, capped the same way.
+    """
+    expected = _parse_date(expected_date)
+    if expected is not None:
+        starts = datetime.datetime.combine(expected, datetime.time(), datetime.timezone.utc).timestamp()
+        if starts > now:
+            return min(MAX_INTERVAL_SECONDS, max(MIN_INTERVAL_SECONDS, starts - now))
+    return _backoff(polls_unchanged)
+
+
+def _backoff(attempts: int) -> float:
+    return min(MAX_INTERVAL_SECONDS, MIN_INTERVAL_SECONDS * 2 ** min(attempts, 32))
+
+
+# ── stores ───────────────────────────────────────────────────────────────────
+# A record: customer_id, cheque_number, status, outcome, amount, expected_date,
+# case_id, created_at, checked_at, next_check, polls, failures
+
+
+class ChequeStore(ABC):
+    """Storage interface used by the watcher."""
+
+    @abstractmethod
+    def watch(self, customer_id: str, cheque_number: str, case_id: Optional[str] = None,
+              now: Optional[float] = None) -> dict:
+        """Start watching a cheque (a no-op if it is already watched, apart from linking case_id). Returns it."""
+
+    @abstractmethod
+    def get(self, customer_id: str, cheque_number: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def save(self, record: dict) -> None:
+        """Write back a record returned by watch(), get() or claim_due(), keeping a case linked since."""
+
+    @abstractmethod
+    def claim_due(self, now: float, limit: int, lease: float = LEASE_SECONDS) -> list:
+        """Return up to limit pending records due by now, pushing their next_check out by lease."""
+
+    @abstractmethod
+    def pending_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop records older than CHEQUE_WATCH_DAYS. Returns the count removed."""
+
+
+def _new_record(customer_id: str, cheque_number: str, case_id: Optional[str], now: float) -> dict:
+    return {
+        "customer_id": customer_id, "cheque_number": cheque_number, "status": None, "outcome": PENDING,
+        "amount": None, "expected_date": None, "case_id": case_id, "created_at": now, "checked_at": None,
+        "next_check": now, "polls": 0, "failures": 0,
+    }
+
+
+class MemoryChequeStore(ChequeStore):
+    def __init__(self):
+        self._records: dict = {}
+        self._lock = threading.Lock()
+
+    def watch(self, customer_id: str, cheque_number: str, case_id: Optional[str] = None,
+              now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        with self._lock:
+            record = self._records.get((customer_id, cheque_number))
+            if record is None:
+                record = self._records[(customer_id, cheque_number)] = _new_record(
+                    customer_id, cheque_number, case_id, now)
+            elif case_id:
+                record["case_id"] = case_id
+            return dict(record)
+
+    def get(self, customer_id: str, cheque_number: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get((customer_id, cheque_number))
+            return dict(record) if record else None
+
+    def save(self, record: dict) -> None:
+        key = (record["customer_id"], record["cheque_number"])
+        with self._lock:
+            linked = self._records.get(key, {}).get("case_id")
+            self._records[key] = dict(record, case_id=record["case_id"] or linked)
+
+    def claim_due(self, now: float, limit: int, lease: float = LEASE_SECONDS) -> list:
+        with self._lock:
+            due = sorted(
+                (r for r in self._records.values() if r["outcome"] == PENDING and r["next_check"] <= now),
+                key=lambda r: r["next_check"],
+            )[:limit]
+            for record in due:
+                record["next_check"] = now + lease
+            return [dict(r) for r in due]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(r["outcome"] == PENDING for r in self._records.values())
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            doomed = [k for k, r in self._records.items() if r["created_at"] < now - WATCH_SECONDS]
+            for key in doomed:
+                del self._records[key]
+        return len(doomed)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cheques (
+    customer_id    TEXT NOT NULL,
+    cheque_number  TEXT NOT NULL,
+    status         TEXT,
+    outcome        TEXT NOT NULL,
+    amount         REAL,
+    expected_date  TEXT,
+    case_id        TEXT,
+    created_at     REAL NOT NULL,
+    checked_at     REAL,
+    next_check     REAL NOT NULL,
+    polls          INTEGER NOT NULL DEFAULT 0,
+    failures       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (customer_id, cheque_number)
+);
+CREATE INDEX IF NOT EXISTS idx_cheques_due ON cheques (outcome, next_check);
+CREATE INDEX IF NOT EXISTS idx_cheques_created_at ON cheques (created_at);
+"""
+
+_COLUMNS = ("customer_id", "cheque_number", "status", "outcome", "amount", "expected_date", "case_id",
+            "created_at", "checked_at", "next_check", "polls", "failures")
+
+
+class SqliteChequeStore(ChequeStore):
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("cheques.db")
+        self._db = ThreadLocalConnection(self.path, lambda conn: conn.executescript(_SCHEMA))
+
+    def watch(self, customer_id: str, cheque_number: str, case_id: Optional[str] = None,
+              now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        record = _new_record(customer_id, cheque_number, case_id, now)
+        conn = self._db.get()
+        with transaction(conn):
+            conn.execute(
+                f"INSERT INTO cheques ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                "ON CONFLICT (customer_id, cheque_number) DO UPDATE SET case_id = COALESCE(excluded.case_id, case_id)",
+                tuple(record[c] for c in _COLUMNS),
+            )
+            row = conn.execute(
+                "SELECT * FROM cheques WHERE customer_id = ? AND cheque_number = ?", (customer_id, cheque_number),
+            ).fetchone()
+        return dict(row)
+
+    def get(self, customer_id: str, cheque_number: str) -> Optional[dict]:
+        row = self._db.get().execute(
+            "SELECT * FROM cheques WHERE customer_id = ? AND cheque_number = ?", (customer_id, cheque_number),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save(self, record: dict) -> None:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in _COLUMNS[2:] if c != "case_id")
+        self._db.get().execute(
+            f"INSERT INTO cheques ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+            f"ON CONFLICT (customer_id, cheque_number) DO UPDATE SET {updates}, "
+            "case_id = COALESCE(excluded.case_id, case_id)",
+            tuple(record[c] for c in _COLUMNS),
+        )
+
+    def claim_due(self, now: float, limit: int, lease: float = LEASE_SECONDS) -> list:
+        conn = self._db.get()
+        with transaction(conn):
+            rows = conn.execute(
+                "SELECT * FROM cheques WHERE outcome = ? AND next_check <= ? ORDER BY next_check LIMIT ?",
+                (PENDING, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE cheques SET next_check = ? WHERE customer_id = ? AND cheque_number = ?",
+                [(now + lease, r["customer_id"], r["cheque_number"]) for r in rows],
+            )
+        return [dict(r, next_check=now + lease) for r in rows]
+
+    def pending_count(self) -> int:
+        (count,) = self._db.get().execute("SELECT COUNT(*) FROM cheques WHERE outcome = ?", (PENDING,)).fetchone()
+        return count
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return self._db.get().execute("DELETE FROM cheques WHERE created_at < ?", (now - WATCH_SECONDS,)).rowcount
+
+
+_store: Optional[ChequeStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ChequeStore:
+    """Return the process-wide store selected by CHEQUE_STORE, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.environ.get("CHEQUE_STORE", "sqlite").lower() == "memory":
+                    _store = MemoryChequeStore()
+                else:
+                    _store = SqliteChequeStore(os.environ.get("CHEQUE_DB_PATH"))
+    return _store
+
+
+def set_store(store: ChequeStore) -> None:
+    """Swap the store, e.g. for a MemoryChequeStore in tests."""
+    global _store
+    _store = store
+
+
+# ── listeners ────────────────────────────────────────────────────────────────
+_listeners: list = []
+
+
+def register_listener(listener: Callable[[dict], None]) -> None:
+    """Call listener(update) on every observed status change.
+
+    update has customerId, chequeNumber, caseId, previousStatus, status,
+    outcome (PENDING, CLEARED, RETURNED or NOT_FOUND), amount and
+    expectedClearanceDate.
+    """
+    _listeners.append(listener)
+
+
+def _notify(update: dict) -> None:
+    for listener in _listeners:
+        try:
+            listener(update)
+        except Exception:
+            logger.warning("Cheque listener %r failed for cheque %s", listener, update["chequeNumber"], exc_info=True)
+
+
+async def _post_webhook(update: dict) -> None:
+    async with bankmock.async_session().post(WEBHOOK_URL, json={"event": "cheque.status_changed", **update}) as resp:
+        if resp.status >= 400:
+            logger.warning("Cheque webhook answered %s for cheque %s", resp.status, update["chequeNumber"])
+
+
+def _push_webhook(update: dict) -> None:
+    bankmock.submit(_post_webhook(update))
+
+
+if WEBHOOK_URL:
+    register_listener(_push_webhook)
+
+
+# ── state updates ────────────────────────────────────────────────────────────
+def _apply(record: dict, cheque: Optional[dict], now: float) -> Optional[dict]:
+    """Fold one upstream answer (None for a 404) into record. Returns the update to announce, if any."""
+    previous = record["status"]
+    if cheque is None:
+        status, outcome = NOT_FOUND, NOT_FOUND
+    else:
+        status = cheque.get("status")
+        outcome = outcome_of(status)
+        record["amount"] = cheque.get("amount", record["amount"])
+        record["expected_date"] = cheque.get("expectedClearanceDate") or record["expected_date"]
+    changed = status != previous
+    record.update(status=status, outcome=outcome, checked_at=now, failures=0,
+                  polls=0 if changed else record["polls"] + 1)
+    if outcome == PENDING:
+        record["next_check"] = now + next_check_delay(record["expected_date"], record["polls"], now)
+    # The first answer is the baseline; only changes seen after it are announced
+    if not changed or previous is None:
+        return None
+    return {
+        "customerId": record["customer_id"], "chequeNumber": record["cheque_number"], "caseId": record["case_id"],
+        "previousStatus": previous, "status": status, "outcome": outcome,
+        "amount": record["amount"], "expectedClearanceDate": record["expected_date"],
+    }
+
+
+def _advance_case(update: dict) -> None:
+    """Close the linked case when its cheque clears; move an OPEN one to VERIFIED when it is returned."""
+    case_id = update.get("caseId")
+    outcome = update["outcome"]
+    if not case_id or outcome not in (CLEARED, RETURNED):
+        return
+    repo = get_repository()
+    case = repo.get(case_id)
+    if not case or case.get("customerId") != update["customerId"]:
+        return
+
+    amount = templates.money_formatter()(update.get("amount"))
+    if outcome == CLEARED:
+        new_status = "CLOSED"
+        note = f"Cheque #{update['chequeNumber']} cleared ({amount} credited)"
+    else:
+        new_status = "VERIFIED"
+        note = f"Cheque #{update['chequeNumber']} was returned unpaid ({update.get('status')}); needs agent follow-up"
+    if new_status not in CASE_TRANSITIONS.get(case.get("status"), ()):
+        return
+
+    updated_at = datetime.datetime.utcnow().isoformat() + "Z"
+    changes = {"status": new_status, "updatedAt": updated_at}
+    if new_status == "CLOSED":
+        changes["resolution"] = note
+    repo.update(case_id, **changes)
+    get_event_log().append(
+        case_id, TRANSITION, from_status=case.get("status"), to_status=new_status,
+        actor=WATCHER_ACTOR, reason=note, ts=updated_at,
+    )
+    if case.get("status") == "ESCALATED":
+        get_engine().release(case.get("assignedAgent"))
+
+
+def _save_and_announce(store: ChequeStore, record: dict, update: Optional[dict]) -> None:
+    store.save(record)
+    if update:
+        # A case may have been linked while the cheque was being checked
+        saved = store.get(record["customer_id"], record["cheque_number"])
+        update["caseId"] = saved["case_id"] if saved else record["case_id"]
+        try:
+            _advance_case(update)
+        except Exception:
+            logger.warning("Could not update case %s for cheque %s", update["caseId"], update["chequeNumber"],
+                           exc_info=True)
+        _notify(update)
+
+
+def watch(customer_id: str, cheque_number: str, case_id: Optional[str] = None) -> dict:
+    """Watch a cheque (e.g. a new deposit, or the cheque named in a complaint case)."""
+    record = get_store().watch(customer_id, str(cheque_number).strip(), case_id)
+    ensure_started()
+    return record
+
+
+def observe(customer_id: str, cheque_number: str, cheque: Optional[dict]) -> None:
+    """Record a status fetched outside the watcher, e.g. by get_cheque_status. Pending cheques start being watched."""
+    store = get_store()
+    cheque_number = str(cheque_number).strip()
+    record = store.get(customer_id, cheque_number)
+    if record is None:
+        if cheque is None or outcome_of(cheque.get("status")) != PENDING:
+            return
+        record = store.watch(customer_id, cheque_number)
+        ensure_started()
+    _save_and_announce(store, record, _apply(record, cheque, time.time()))
+
+
+def lookup(customer_id: str, cheque_number: str, max_age: float = STATUS_MAX_AGE_SECONDS) -> Optional[dict]:
+    """Known status of a cheque as {chequeNumber, amount, status, expectedClearanceDate, checkedAt}.
+
+    Returns None (so the caller asks BankMOCK) when the cheque is not watched,
+    has not been checked yet, or is still pending and was last checked more
+    than max_age seconds ago.
+    """
+    record = get_store().get(customer_id, str(cheque_number).strip())
+    if record is None or record["checked_at"] is None or record["outcome"] == NOT_FOUND:
+        return None
+    if record["outcome"] == PENDING and time.time() - record["checked_at"] > max_age:
+        return None
+    served.inc("watcher")
+    return {
+        "chequeNumber": record["cheque_number"], "amount": record["amount"], "status": record["status"],
+        "expectedClearanceDate": record["expected_date"], "checkedAt": record["checked_at"],
+    }
+
+
+# ── polling ──────────────────────────────────────────────────────────────────
+async def _fetch(record: dict, limit: asyncio.Semaphore):
+    """The cheque's current data, None if BankMOCK does not know it, or the exception that stopped the check."""
+    async with limit:
+        try:
+            data = await bankmock.aget_json(record["customer_id"], f"/cheque/{record['cheque_number']}",
+                                            use_cache=False)
+        except Exception as e:
+            if getattr(getattr(e, "response", None), "status_code", None) == 404:
+                return None
+            return e
+    return data.get("data", data)
+
+
+async def _fetch_all(records: list) -> list:
+    limit = asyncio.Semaphore(max(POLL_CONCURRENCY, 1))
+    return await asyncio.gather(*(_fetch(r, limit) for r in records))
+
+
+def poll_once(now: Optional[float] = None) -> int:
+    """Claim one batch of due cheques, check them and apply the results. Returns how many were checked."""
+    store = get_store()
+    now = time.time() if now is None else now
+    records = store.claim_due(now, POLL_BATCH)
+    if not records:
+        return 0
+    # Attribute the upstream calls to the watcher in the tool latency metrics
+    token = metrics.current_tool.set("cheque_watcher")
+    try:
+        results = bankmock.run_sync(_fetch_all(records))
+    finally:
+        metrics.current_tool.reset(token)
+    checked = time.time()
+    for record, result in zip(records, results):
+        if isinstance(result, Exception):
+            record["failures"] += 1
+            record["next_check"] = checked + _backoff(record["failures"])
+            polls.inc("error")
+            store.save(record)
+            continue
+        update = _apply(record, result, checked)
+        polls.inc(record["outcome"].lower())
+        _save_and_announce(store, record, update)
+    return len(records)
+
+
+def seed_from_cases() -> int:
+    """Watch the cheque of every open case that names one. Returns how many cases were linked."""
+    store = get_store()
+    linked = 0
+    for case in get_repository().find(status=("OPEN", "VERIFIED", "ESCALATED")):
+        if case.get("chequeNumber") and case.get("customerId"):
+            store.watch(case["customerId"], str(case["chequeNumber"]).strip(), case["caseId"])
+            linked += 1
+    return linked
+
+
+class ChequeWatcher:
+    """Background thread that runs poll_once() every POLL_INTERVAL_SECONDS."""
+
+    def __init__(self, interval: float = POLL_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_sweep = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="cheque-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            seed_from_cases()
+        except Exception:
+            logger.warning("Could not seed the cheque watcher from open cases", exc_info=True)
+        while not self._stop.is_set():
+            try:
+                # A full batch means more cheques are due; take the next one right away
+                full = poll_once() >= POLL_BATCH
+                now = time.time()
+                if now - self._last_sweep > SWEEP_INTERVAL_SECONDS:
+                    self._last_sweep = now
+                    get_store().sweep(now)
+            except Exception:
+                logger.warning("Cheque poll failed", exc_info=True)
+                full = False
+            if not full:
+                self._stop.wait(self.interval)
+
+
+_watcher: Optional[ChequeWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def ensure_started() -> None:
+    """Start this process's watcher thread unless CHEQUE_WATCHER is off or it already runs."""
+    global _watcher
+    if not ENABLED or _watcher is not None:
+        return
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = ChequeWatcher()
+            _watcher.start()
+
+
+def _collect_metrics() -> list:
+    if _store is None:
+        return []
+    return metrics.gauge_lines("swiftbank_cheques_watched", "Pending cheques being watched.",
+                               {(): _store.pending_count()})
+
+
+metrics.register_collector(_collect_metrics)
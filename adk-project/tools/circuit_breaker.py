@@ -0,0 +1,193 @@
+"""
+Per-endpoint circuit breaker and adaptive read timeouts for BankMOCK
+
+bankmock_client keeps one CircuitBreaker per endpoint ('/balance',
+'/generate-otp', ...) and asks it before every upstream attempt:
+
+  - CLOSED     requests flow; outcomes go into a rolling time window. Once the
+               window holds min_requests calls and the share of failures
+               (connection errors, timeouts, 5xx, or calls slower than
+               slow_call_seconds) reaches failure_rate, the breaker opens.
+  - OPEN       requests fail fast with CircuitOpenError for open_seconds, so a
+               brown-out costs callers nothing instead of a full read timeout.
+  - HALF_OPEN  one probe request is let through; success closes the breaker,
+               failure opens it again.
+
+The breaker also tracks recent latencies and derives the read timeout from
+them: p99 × timeout_multiplier, clamped between min_timeout and the configured
+per-endpoint timeout. A healthy endpoint that normally answers in 80 ms
+therefore times out after a second or so, not after ten. Timed-out calls are
+sampled at the time they waited, so when an endpoint's latency steps up the
+timeout climbs after it instead of cutting every call short. Opening the
+breaker drops the samples: the half-open probe, and the calls after it until
+enough new samples exist, get the configured timeout.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric encoding used by the metrics gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+LATENCY_SAMPLES = 256
+MIN_LATENCY_SAMPLES = 20
+# Recompute the cached p99 after this many new samples
+P99_REFRESH_EVERY = 16
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling an endpoint whose breaker is open.
+
+    Subclasses the built-in ConnectionError rather than requests' so that
+    importing the breaker does not pull in requests (see lazy_imports.py).
+    """
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"BankMOCK {endpoint} is unavailable (circuit open, retry in {max(retry_in, 0):.0f}s)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, endpoint: str, window_seconds: float = 30.0, min_requests: int = 10,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 5.0, open_seconds: float = 15.0,
+                 timeout_multiplier: float = 2.0, min_timeout: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.endpoint = endpoint
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        # (timestamp, failed) per completed call inside the window
+        self._window: deque = deque()
+        self._failures = 0
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._p99: Optional[float] = None
+        self._since_p99 = 0
+        self.rejected = 0
+        self.opened = 0
+
+    # ── admission ────────────────────────────────────────────────────────────
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = self._clock()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.endpoint, remaining)
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            # A probe that never reported back (e.g. cancelled) stops blocking after open_seconds
+            if self._probe_in_flight and now - self._probe_started < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(self.endpoint, self._probe_started + self.open_seconds - now)
+            self._probe_in_flight = True
+            self._probe_started = now
+
+    # ── outcomes ─────────────────────────────────────────────────────────────
+    def record(self, seconds: float, failed: bool, timed_out: bool = False) -> None:
+        """Record a finished call. Slow calls and timeouts count as failures.
+
+        Successful calls and timeouts feed the latency samples; other failures
+        (refused connections, 5xx) say nothing about how long a reply takes.
+        """
+        sample = timed_out or not failed
+        failed = failed or timed_out or seconds >= self.slow_call_seconds
+        with self._lock:
+            now = self._clock()
+            if sample:
+                self._latencies.append(seconds)
+                self._since_p99 += 1
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed:
+                    self._trip(now)
+                else:
+                    self.state = CLOSED
+                    self._window.clear()
+                    self._failures = 0
+                return
+            if self.state == OPEN:
+                return
+            self._window.append((now, failed))
+            self._failures += failed
+            self._expire(now)
+            if len(self._window) >= self.min_requests and self._failures / len(self._window) >= self.failure_rate:
+                self._trip(now)
+
+    def release(self) -> None:
+        """Forget an admitted call that ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._window and self._window[0][0] < cutoff:
+            _, failed = self._window.popleft()
+            self._failures -= failed
+
+    def _trip(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self.opened += 1
+        self._window.clear()
+        self._failures = 0
+        self._latencies.clear()
+        self._p99 = None
+
+    # ── adaptive timeout ─────────────────────────────────────────────────────
+    def p99(self) -> Optional[float]:
+        """p99 of recent successful call latencies, or None until enough samples exist."""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            if self._p99 is None or self._since_p99 >= P99_REFRESH_EVERY:
+                ordered = sorted(self._latencies)
+                self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+                self._since_p99 = 0
+            return self._p99
+
+    def read_timeout(self, configured: float) -> float:
+        """Read timeout to use for the next call: p99 × multiplier within [min_timeout, configured].
+
+        A half-open probe always gets the configured timeout.
+        """
+        p99 = self.p99()
+        if p99 is None or self.state != CLOSED:
+            return configured
+        return min(configured, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def stats(self) -> dict:
+        p99 = self.p99()
+        with self._lock:
+            self._expire(self._clock())
+            calls = len(self._window)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "failure_rate": round(self._failures / calls, 4) if calls else 0.0,
+                "p99_seconds": p99,
+                "rejected": self.rejected,
+                "opened": self.opened,
+            }
@@ -0,0 +1,281 @@
+"""
+Idempotency for write tools
+
+LLM agents retry tool calls, and a retried write must not act twice: a second
+create_complaint_case would open a duplicate case, a second generate_otp would
+replace a still-valid OTP and call BankMOCK again. @idempotent(window) keys
+each call on (tool, normalised arguments). The arguments include customer_id,
+and strings are compared case- and whitespace-insensitively. A repeat within
+the window gets the original reply instead of running the tool again.
+
+A call that is still running when its retry arrives is claimed as "pending";
+the retry waits for it (up to IDEMPOTENCY_WAIT_SECONDS, also across worker
+processes) and then returns its reply. Error replies are never stored, so a
+failed call can be retried for real. A valid(arguments) predicate can veto a
+stored reply that no longer holds, e.g. an OTP that has since been used.
+
+Backends:
+  - SqliteIdempotencyStore – default; WAL-mode SQLite shared by all workers
+  - MemoryIdempotencyStore – in-process, LRU-bounded dict, for tests
+Both expire records after their window and keep at most IDEMPOTENCY_MAX_ENTRIES.
+
+Configuration (environment variables):
+  - IDEMPOTENCY_STORE           – "sqlite" (default) or "memory"
+  - IDEMPOTENCY_DB_PATH         – SQLite file path (default: $SWIFTBANK_DATA_DIR/idempotency.db)
+  - IDEMPOTENCY_WINDOW_SECONDS  – default window for repeats (default 120)
+  - IDEMPOTENCY_MAX_ENTRIES     – cap on stored replies (default 10000)
+  - IDEMPOTENCY_WAIT_SECONDS    – how long a retry waits for the original call to finish (default 10)
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import metrics
+from storage import ThreadLocalConnection, data_path, transaction
+
+WINDOW_SECONDS = float(os.environ.get("IDEMPOTENCY_WINDOW_SECONDS", 120))
+MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000))
+WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 10))
+# A pending claim left behind by a crashed worker stops counting after this long
+PENDING_TTL_SECONDS = 30
+POLL_SECONDS = 0.05
+SWEEP_INTERVAL_SECONDS = 60
+
+# Record states
+PENDING = "pending"
+DONE = "done"
+
+replays = metrics.Counter(
+    "swiftbank_idempotent_replays_total", "Repeated write-tool calls answered with the original reply.", ("tool",),
+)
+metrics.register(replays)
+
+
+class IdempotencyStore(ABC):
+    """Storage interface used by @idempotent."""
+
+    @abstractmethod
+    def claim(self, key: str, now: Optional[float] = None) -> Optional[dict]:
+        """Mark key pending and return None, or return the live record ({status, result}) someone else holds."""
+
+    @abstractmethod
+    def complete(self, key: str, result: str, window: float) -> None:
+        ...
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Drop a pending claim whose call failed or produced an error reply."""
+
+    @abstractmethod
+    def discard(self, key: str) -> None:
+        """Drop a stored reply that is no longer valid."""
+
+    @abstractmethod
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete expired records and trim to MAX_ENTRIES. Returns the count removed."""
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        # key → {status, result, expires_at}, least recently written first
+        self._records: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, now: Optional[float] = None) -> Optional[dict]:
+        now = time.time() if now is None else now
+        with self._lock:
+            record = self._records.get(key)
+            if record and record["expires_at"] > now:
+                return dict(record)
+            self._put(key, {"status": PENDING, "result": None, "expires_at": now + PENDING_TTL_SECONDS})
+        return None
+
+    def complete(self, key: str, result: str, window: float) -> None:
+        with self._lock:
+            self._put(key, {"status": DONE, "result": result, "expires_at": time.time() + window})
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            record = self._records.get(key)
+            if record and record["status"] == PENDING:
+                del self._records[key]
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._records.pop(key, None)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            doomed = [k for k, r in self._records.items() if r["expires_at"] <= now]
+            for key in doomed:
+                del self._records[key]
+        return len(doomed)
+
+    def _put(self, key: str, record: dict) -> None:
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    key         TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    result      TEXT,
+    expires_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires_at ON idempotency (expires_at);
+"""
+
+
+class SqliteIdempotencyStore(IdempotencyStore):
+    def __init__(self, path: Optional[str] = None, max_entries: int = MAX_ENTRIES):
+        self.path = path or data_path("idempotency.db")
+        self.max_entries = max_entries
+        self._db = ThreadLocalConnection(self.path, lambda conn: conn.executescript(_SCHEMA))
+        self._last_sweep = 0.0
+
+    def claim(self, key: str, now: Optional[float] = None) -> Optional[dict]:
+        now = time.time() if now is None else now
+        conn = self._db.get()
+        with transaction(conn):
+            row = conn.execute(
+                "SELECT status, result, expires_at FROM idempotency WHERE key = ? AND expires_at > ?", (key, now),
+            ).fetchone()
+            if row:
+                return dict(row)
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, status, result, expires_at) VALUES (?, ?, NULL, ?)",
+                (key, PENDING, now + PENDING_TTL_SECONDS),
+            )
+        if now - self._last_sweep > SWEEP_INTERVAL_SECONDS:
+            self.sweep(now)
+        return None
+
+    def complete(self, key: str, result: str, window: float) -> None:
+        self._db.get().execute(
+            "INSERT OR REPLACE INTO idempotency (key, status, result, expires_at) VALUES (?, ?, ?, ?)",
+            (key, DONE, result, time.time() + window),
+        )
+
+    def release(self, key: str) -> None:
+        self._db.get().execute("DELETE FROM idempotency WHERE key = ? AND status = ?", (key, PENDING))
+
+    def discard(self, key: str) -> None:
+        self._db.get().execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        self._last_sweep = now
+        conn = self._db.get()
+        removed = conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,)).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM idempotency").fetchone()
+        if count > self.max_entries:
+            removed += conn.execute(
+                "DELETE FROM idempotency WHERE key IN "
+                "(SELECT key FROM idempotency ORDER BY expires_at LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        return removed
+
+
+_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> IdempotencyStore:
+    """Return the process-wide store selected by IDEMPOTENCY_STORE, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.environ.get("IDEMPOTENCY_STORE", "sqlite").lower() == "memory":
+                    _store = MemoryIdempotencyStore()
+                else:
+                    _store = SqliteIdempotencyStore(os.environ.get("IDEMPOTENCY_DB_PATH"))
+    return _store
+
+
+def set_store(store: IdempotencyStore) -> None:
+    """Swap the store, e.g. for a MemoryIdempotencyStore in tests."""
+    global _store
+    _store = store
+
+
+def _normalise(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+def make_key(tool_name: str, arguments: dict) -> str:
+    """Stable key for a call: hash of the tool name and its normalised arguments."""
+    payload = json.dumps([tool_name, {k: _normalise(v) for k, v in sorted(arguments.items())}], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _is_error(result) -> bool:
+    return not isinstance(result, str) or result.startswith(metrics.ERROR_REPLY_PREFIXES)
+
+
+def idempotent(window: Optional[float] = None, valid: Optional[Callable[[dict], bool]] = None):
+    """Return the original reply for repeats of a call within `window` seconds. Apply beneath @token_budget.budgeted.
+
+    Args:
+        window: Seconds a reply is reused for (default IDEMPOTENCY_WINDOW_SECONDS).
+        valid: Optional predicate on the call's arguments; when it returns False a
+            stored reply is discarded and the tool runs again.
+    """
+    def decorate(fn):
+        name = fn.__name__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            key = make_key(name, arguments)
+            store = get_store()
+
+            deadline = time.monotonic() + WAIT_SECONDS
+            while True:
+                record = store.claim(key)
+                if record is None:
+                    break
+                if record["status"] == DONE:
+                    if valid is None or valid(arguments):
+                        replays.inc(name)
+                        return record["result"]
+                    store.discard(key)
+                    continue
+                if time.monotonic() >= deadline:
+                    # The original call is stuck; run without a claim rather than fail
+                    return fn(*args, **kwargs)
+                time.sleep(POLL_SECONDS)
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                store.release(key)
+                raise
+            if _is_error(result):
+                store.release(key)
+            else:
+                store.complete(key, result, WINDOW_SECONDS if window is None else window)
+            return result
+
+        return wrapper
+
+    return decorate
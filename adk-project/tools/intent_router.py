@@ -0,0 +1,322 @@
+"""
+Deterministic intent pre-router
+
+Most customer messages are one of a handful of simple lookups ("what is my
+balance", "cheque status for 123456", "status of CASE-…"), yet every one of
+them costs a full LLM turn in the orchestrator before a tool runs. The
+pre-router sits in front of the orchestrator: dispatch(message, customer_id)
+either answers the message by calling the read-only tool directly, or returns
+None and the message goes to the orchestrator as before.
+
+The trigger phrases follow the ROUTING LOGIC in
+agents/swiftbank-orchestrator.yaml (keep the two in step). They are compiled
+into one alternation regex, so classifying is a single pass over the message
+whatever the number of phrases. Slots are extracted with their own patterns:
+cheque numbers (6+ digits), case IDs (CASE-<digits>-<5 chars>) and
+transaction counts ("last 10 transactions").
+
+A message is dispatched only when the decision is unambiguous:
+  - it has at most ROUTER_MAX_WORDS words
+  - it mentions nothing on the refusal list: fraud, unauthorized, dispute,
+    refund, charged twice, transfer, close, change, minimum. These look like
+    lookups ("unauthorized transactions", "transfer balance") but need an agent
+  - every intent it hits maps to a read-only tool; card actions, complaints,
+    escalations and spending analysis always need the LLM
+  - it has no negation or hedging ("not", "hasn't", "why", "but", …)
+  - it matches explicit lookup phrasing ("my balance", "recent transactions"),
+    never a bare keyword like "balance" or "branch"
+  - it hits exactly one intent, or only intents that get_account_snapshot
+    answers together ("balance and recent transactions")
+  - the intent's required slots are present, each exactly once
+Anything else falls through, with the reason and the sub-agent the phrases
+point at, e.g. ("needs_llm", "Card_Action_Agent").
+
+Coverage (share of messages dispatched) and the estimated LLM time saved
+(ROUTER_LLM_TURN_SECONDS per dispatched message) are exported as metrics
+and by stats(). bench/router_coverage.py reports them offline for a file of
+messages.
+
+Nothing in this tree calls dispatch() yet: the agents run in watsonx
+Orchestrate, which hands every message to the orchestrator. A host that
+fronts the orchestrator (a channel webhook or chat gateway) calls dispatch()
+first, as in the README.
+
+Configuration (environment variables):
+  - INTENT_ROUTER            – "false" to send every message to the orchestrator (default on)
+  - ROUTER_MAX_WORDS         – longer messages always fall through (default 16)
+  - ROUTER_LLM_TURN_SECONDS  – LLM turn latency a dispatched message saves, for the estimate (default 2.0)
+"""
+
+import importlib
+import inspect
+import os
+import re
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import metrics
+import response_templates as templates
+
+ENABLED = os.environ.get("INTENT_ROUTER", "true").lower() not in ("0", "false", "no")
+MAX_WORDS = int(os.environ.get("ROUTER_MAX_WORDS", 16))
+LLM_TURN_SECONDS = float(os.environ.get("ROUTER_LLM_TURN_SECONDS", 2.0))
+
+# The orchestrator's closing line, added to dispatched text replies
+CLOSING = "Is there anything else I can help you with today?"
+
+# Fall-through reasons
+NO_MATCH = "no_match"
+NEEDS_LLM = "needs_llm"
+AMBIGUOUS = "ambiguous"
+MULTIPLE_INTENTS = "multiple_intents"
+MISSING_SLOT = "missing_slot"
+REFUSED = "refused"
+TOO_LONG = "too_long"
+DISABLED = "disabled"
+
+BANKING_INFO = "Banking_Info_Agent"
+CARD_ACTION = "Card_Action_Agent"
+CASE_MANAGEMENT = "Case_Management_Agent"
+
+
+class Intent(NamedTuple):
+    name: str
+    # Sub-agent the orchestrator delegates this intent to
+    agent: str
+    # "module:function" of the read-only tool answering it, or None if it always needs the LLM
+    tool: Optional[str]
+    # Regex fragments, matched against the lower-cased message
+    phrases: tuple
+    # Slots the tool needs: cheque_number, case_id
+    required: tuple = ()
+
+
+INTENTS = (
+    Intent("balance", BANKING_INFO, "banking_info_tools:get_account_balance", (
+        r"\b(?:my|account|current|available) balance\b", r"^(?:check )?balance(?: please)?\W*$",
+        r"\bbalance (?:check|enquiry|inquiry)\b", r"^(?:my )?balance(?= and )", r"\bhow much (?:money )?(?:do i have|is (?:there )?in my account)\b", r"\bavailable funds\b",
+    )),
+    Intent("recent_transactions", BANKING_INFO, "banking_info_tools:get_recent_transactions", (
+        r"\b(?:recent|last|latest|show(?: me)?(?: my)?)\s+(?:\d{1,2}\s+)?transactions?\b",
+        r"\bmy transactions\b", r"\bmini statement\b",
+    )),
+    Intent("account_details", BANKING_INFO, "banking_info_tools:get_account_details", (
+        r"\baccount (?:number|details|type|info)\b", r"\bifsc\b",
+        r"\b(?:my |home )?branch (?:name|address|code|details)\b", r"\bwhich branch\b",
+    )),
+    Intent("cheque_status", BANKING_INFO, "banking_info_tools:get_cheque_status", (
+        r"\bcheque status\b", r"\bstatus of (?:my |the )?cheque\b", r"\bcheque (?:no\.?|number|#)?\s*\d{6,}\b",
+        r"\bhas (?:my |the )?cheque\b.*\bclear", r"\bcheque\b.*\bcleared\?",
+    ), required=("cheque_number",)),
+    Intent("card_status", BANKING_INFO, "card_tools:get_card_status", (
+        r"\bcard status\b", r"\bstatus of (?:my )?(?:atm |debit )?card\b",
+    )),
+    Intent("case_status", CASE_MANAGEMENT, "case_tools:get_complaint_case", (
+        r"\bcase-\d+-[a-z0-9]{5}\b",
+    ), required=("case_id",)),
+    Intent("case_list", CASE_MANAGEMENT, "case_tools:list_complaint_cases", (
+        r"\bcase status\b", r"\bmy (?:cases|complaints)\b", r"\bstatus of my (?:case|complaint)s?\b",
+    )),
+    Intent("case_timeline", CASE_MANAGEMENT, "case_tools:get_case_timeline", (
+        r"\b(?:timeline|history) of (?:my |the )?case\b", r"\bcase (?:timeline|history)\b",
+    ), required=("case_id",)),
+    # Always through the LLM: OTP-protected actions, free-text complaints, date ranges
+    Intent("card_action", CARD_ACTION, None, (
+        r"\b(?:block|unblock|unlock|freeze|unfreeze|lock)\b.*\bcard\b", r"\bcard\b.*\b(?:locked|blocked|frozen)\b",
+        r"\batm card\b",
+    )),
+    Intent("complaint", CASE_MANAGEMENT, None, (
+        r"\bcomplain(?:t|ts)?\b(?! status)", r"\bproblem\b", r"\bissue\b", r"\bescalat", r"\bnot credited\b",
+        r"\bmissing transactions?\b", r"\bnot received\b", r"\bwrong charge\b", r"\bhas(?:n't| not) cleared\b",
+        r"\b(?:human|real person|speak to an agent|talk to an agent)\b",
+    )),
+    Intent("spending", BANKING_INFO, None, (
+        r"\bstatement\b", r"\bspen[dt]\b", r"\bspending\b", r"\blast (?:week|month|year)\b", r"\bhistory\b",
+    )),
+)
+
+# Intents get_account_snapshot answers together in one call
+SNAPSHOT_INTENTS = frozenset({"balance", "recent_transactions", "account_details", "card_status"})
+SNAPSHOT_TOOL = "banking_info_tools:get_account_snapshot"
+
+# Requests that look like a lookup but need an agent: fraud and disputes go to the complaint
+# flow, money movement and account changes are not read-only
+_REFUSALS = re.compile(
+    r"\b(?:fraud\w*|unauthori[sz]ed|disput\w*|refund\w*|charged twice|double charged|transfer\w*"
+    r"|close|closed|closing|closure|chang\w*|minimum)\b"
+)
+_HEDGES = re.compile(r"\b(?:not|no|never|why|but|wrong|instead|except)\b|n't\b")
+_CHEQUE_NUMBER = re.compile(r"\b\d{6,}\b")
+_CASE_ID = re.compile(r"\bcase-\d+-[a-z0-9]{5}\b")
+_LIMIT = re.compile(r"\b(?:last|recent|latest|past|show(?: me)?)\s+(\d{1,2})\b|\b(\d{1,2})\s+(?:recent\s+)?transactions\b")
+
+
+def _compile(intents: tuple) -> tuple:
+    """One alternation regex over every phrase, and the group name → intent map."""
+    groups, owners = [], {}
+    for i, intent in enumerate(intents):
+        for j, phrase in enumerate(intent.phrases):
+            name = f"i{i}p{j}"
+            groups.append(f"(?P<{name}>{phrase})")
+            owners[name] = intent
+    return re.compile("|".join(groups)), owners
+
+
+_PHRASES, _OWNERS = _compile(INTENTS)
+
+
+class Decision(NamedTuple):
+    # "dispatch" or "fallthrough"
+    action: str
+    intent: Optional[str]
+    # Sub-agent the message points at (for fall-through, the orchestrator's likely route)
+    agent: Optional[str]
+    tool: Optional[str]
+    arguments: dict
+    reason: Optional[str] = None
+
+    @property
+    def dispatched(self) -> bool:
+        return self.action == "dispatch"
+
+
+def _fallthrough(reason: str, intent: Optional[Intent] = None) -> Decision:
+    return Decision("fallthrough", intent.name if intent else None, intent.agent if intent else None, None, {}, reason)
+
+
+def _slots(text: str) -> dict:
+    slots = {}
+    cases = set(_CASE_ID.findall(text))
+    if len(cases) == 1:
+        slots["case_id"] = cases.pop().upper()
+    # Digits inside a case ID are not cheque numbers
+    numbers = set(_CHEQUE_NUMBER.findall(_CASE_ID.sub(" ", text)))
+    if len(numbers) == 1:
+        slots["cheque_number"] = numbers.pop()
+    limit = _LIMIT.search(text)
+    if limit:
+        slots["limit"] = int(limit.group(1) or limit.group(2))
+    return slots
+
+
+def classify(message: str) -> Decision:
+    """Decide whether message can be answered by a tool directly. Pure: calls nothing upstream."""
+    text = " ".join(message.lower().split())
+    if not text:
+        return _fallthrough(NO_MATCH)
+    if _REFUSALS.search(text):
+        return _fallthrough(REFUSED)
+    hits: dict = {}
+    for match in _PHRASES.finditer(text):
+        intent = _OWNERS[match.lastgroup]
+        hits.setdefault(intent.name, intent)
+    if not hits:
+        return _fallthrough(NO_MATCH)
+    intents = list(hits.values())
+    llm_only = next((i for i in intents if i.tool is None), None)
+    if llm_only is not None:
+        return _fallthrough(NEEDS_LLM, llm_only)
+    if len(text.split()) > MAX_WORDS:
+        return _fallthrough(TOO_LONG, intents[0])
+    if _HEDGES.search(text):
+        return _fallthrough(AMBIGUOUS, intents[0])
+
+    slots = _slots(text)
+    # A case ID makes the case intents more specific than "case status"
+    if "case_status" in hits and len(hits) > 1:
+        hits.pop("case_list", None)
+        if "case_timeline" in hits:
+            hits.pop("case_status")
+        intents = list(hits.values())
+
+    if len(intents) > 1:
+        if set(hits) <= SNAPSHOT_INTENTS:
+            args = {"transaction_limit": slots["limit"]} if "limit" in slots else {}
+            return Decision("dispatch", "account_snapshot", BANKING_INFO, SNAPSHOT_TOOL, args)
+        return _fallthrough(MULTIPLE_INTENTS, intents[0])
+
+    intent = intents[0]
+    missing = [slot for slot in intent.required if slot not in slots]
+    if missing:
+        return _fallthrough(MISSING_SLOT, intent)
+    args = {slot: slots[slot] for slot in intent.required}
+    if intent.name == "recent_transactions" and "limit" in slots:
+        args["limit"] = slots["limit"]
+    return Decision("dispatch", intent.name, intent.agent, intent.tool, args)
+
+
+# ── stats ────────────────────────────────────────────────────────────────────
+CLASSIFY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025)
+
+classify_seconds = metrics.Histogram(
+    "swiftbank_router_classify_seconds", "Time to classify one message.", (), CLASSIFY_BUCKETS,
+)
+dispatched = metrics.Counter(
+    "swiftbank_router_dispatched_total", "Messages answered by a tool without an LLM turn.", ("intent",),
+)
+fallthrough = metrics.Counter(
+    "swiftbank_router_fallthrough_total", "Messages left to the orchestrator.", ("reason",),
+)
+seconds_saved = metrics.Counter(
+    "swiftbank_router_llm_seconds_saved_total", "Estimated LLM turn time saved by dispatching (ROUTER_LLM_TURN_SECONDS each).",
+)
+for _metric in (classify_seconds, dispatched, fallthrough, seconds_saved):
+    metrics.register(_metric)
+
+_stats_lock = threading.Lock()
+_totals = {"messages": 0, "dispatched": 0, "seconds_saved": 0.0}
+
+
+def _record(decision: Decision, elapsed: float) -> None:
+    classify_seconds.observe(elapsed)
+    saved = max(0.0, LLM_TURN_SECONDS - elapsed)
+    with _stats_lock:
+        _totals["messages"] += 1
+        if decision.dispatched:
+            _totals["dispatched"] += 1
+            _totals["seconds_saved"] += saved
+    if decision.dispatched:
+        dispatched.inc(decision.intent)
+        seconds_saved.inc(amount=saved)
+    else:
+        fallthrough.inc(decision.reason)
+
+
+def stats() -> dict:
+    """Messages seen, dispatched, coverage (share dispatched) and estimated LLM seconds saved."""
+    with _stats_lock:
+        totals = dict(_totals)
+    totals["coverage"] = totals["dispatched"] / totals["messages"] if totals["messages"] else 0.0
+    return totals
+
+
+# ── dispatch ─────────────────────────────────────────────────────────────────
+def _resolve(tool: str):
+    module, _, name = tool.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def route(message: str) -> Decision:
+    """classify() plus the coverage and latency metrics."""
+    if not ENABLED:
+        return _fallthrough(DISABLED)
+    start = time.perf_counter()
+    decision = classify(message)
+    _record(decision, time.perf_counter() - start)
+    return decision
+
+
+def dispatch(message: str, customer_id: str, output_format: Optional[str] = None) -> Optional[str]:
+    """Answer message with a tool call when the intent is unambiguous, or return None to send it to the orchestrator."""
+    decision = route(message)
+    if not decision.dispatched:
+        return None
+    arguments = {"customer_id": customer_id, **decision.arguments}
+    fn = _resolve(decision.tool)
+    if output_format and "output_format" in inspect.signature(fn).parameters:
+        arguments["output_format"] = output_format
+    reply = fn(**arguments)
+    if not templates.wants_json(output_format):
+        reply = f"{reply}\n\n{CLOSING}"
+    return reply
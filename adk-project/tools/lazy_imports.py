@@ -0,0 +1,86 @@
+"""
+Deferred imports for heavy third-party modules
+
+aiohttp, requests and numpy make up most of the tool server's import time but
+are not needed until the first upstream call or analytics query. Modules
+that use them bind a lazy proxy instead of importing them directly:
+
+    requests = lazy_module("requests")
+
+The proxy imports the real module on the first attribute read (under a lock,
+so concurrent first calls do not see a half-initialised module) and then
+copies its namespace, so later reads are plain attribute lookups. Names used
+only in annotations must be quoted: evaluating `requests.Session` at
+definition time would load the module right away.
+
+Off by default. Deferring does not remove the cost, it moves it: without
+warm-up the first tool call imports the modules itself, about 230 ms instead
+of 25 ms in bench/startup_profile.py. Turn it on where import time matters
+more than that first call, ideally with SWIFTBANK_WARMUP=background, since
+warmup.py calls load_all() to pay the cost before the instance takes traffic.
+
+Configuration (environment variables):
+  - SWIFTBANK_LAZY_IMPORTS – "true" to defer the heavy imports to first use (default off)
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import types
+
+ENABLED = os.environ.get("SWIFTBANK_LAZY_IMPORTS", "false").lower() in ("1", "true", "yes")
+
+_proxies: dict = {}
+_lock = threading.RLock()
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported when one of its attributes is first read."""
+
+    def __getattr__(self, attr: str):
+        return getattr(_load(self.__name__), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def _load(name: str) -> types.ModuleType:
+    with _lock:
+        module = importlib.import_module(name)
+        proxy = _proxies.get(name)
+        if proxy is not None and "__file__" not in proxy.__dict__:
+            proxy.__dict__.update(module.__dict__)
+        return module
+
+
+def lazy_module(name: str) -> types.ModuleType:
+    """Return a proxy for module `name` that defers importing it until an attribute is first read."""
+    if not ENABLED or name in sys.modules:
+        return importlib.import_module(name)
+    with _lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            if importlib.util.find_spec(name) is None:
+                raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+            proxy = _proxies[name] = _LazyModule(name)
+        return proxy
+
+
+def is_loaded(name: str) -> bool:
+    return name in sys.modules
+
+
+def load_all() -> list:
+    """Import every deferred module now. Returns the names that were still pending."""
+    names = pending()
+    for name in names:
+        _load(name)
+    return names
+
+
+def pending() -> list:
+    """Names of deferred modules that have not been imported yet."""
+    with _lock:
+        return [name for name in _proxies if name not in sys.modules]
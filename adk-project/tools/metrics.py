@@ -0,0 +1,350 @@
+"""
+Latency, throughput and error metrics for the SwiftBank tools
+
+Every @tool() function is wrapped with @instrumented, and bankmock_client
+records each upstream request. Metrics are rendered in the Prometheus text
+exposition format.
+
+Metrics:
+  - swiftbank_tool_duration_seconds{tool}                 histogram of total tool latency
+  - swiftbank_tool_calls_total{tool,outcome}              ok | error (an error reply string) | exception
+  - swiftbank_upstream_duration_seconds{tool,endpoint,method}
+                                                          histogram of BankMOCK request latency
+  - swiftbank_upstream_responses_total{endpoint,method,status}
+                                                          HTTP status, or connection_error / timeout
+  - swiftbank_fallback_total{tool,reason}                 hits on silent fallback paths
+  - swiftbank_cache_*{cache}                              response and analytics cache counters
+  - swiftbank_singleflight_*                              GET coalescing counters
+  - swiftbank_breaker_*{endpoint}                         circuit breaker state, failure rate, fast-fails
+  - swiftbank_upstream_read_timeout_seconds{endpoint}     adaptive read timeout in effect
+  - swiftbank_tool_output_tokens{tool}                    estimated reply tokens before trimming (token_budget.py)
+  - swiftbank_tool_tokens_saved_total{tool}               estimated tokens removed by trimming
+  - swiftbank_tool_trimmed_total{tool,strategy}           replies trimmed: list | line | cut
+  - swiftbank_ready                                       1 once the instance is marked ready
+  - swiftbank_warmup_seconds{step}                        time spent in each warm-up step (warmup.py)
+  - swiftbank_cheque_polls_total{outcome}                 background cheque checks (cheque_watcher.py)
+  - swiftbank_cheque_status_served_total{source}          cheque status answers: watcher | upstream
+  - swiftbank_cheques_watched                             pending cheques being watched
+  - swiftbank_rate_limit_wait_seconds{scope}               time queued for a rate limit: customer | endpoint (rate_limiter.py)
+  - swiftbank_rate_limited_total{scope,outcome}           calls over a limit: queued | rejected
+  - swiftbank_rate_limit_queue_depth{scope}               calls waiting for a rate limit, all workers
+  - swiftbank_case_search_seconds                         agent console case search latency (case_tools.py)
+  - swiftbank_traffic_recorded_total{tool}                tool calls appended to TRAFFIC_RECORD (traffic_recorder.py)
+  - swiftbank_router_classify_seconds                     intent pre-router classify latency (intent_router.py)
+  - swiftbank_router_dispatched_total{intent}             messages answered without an LLM turn
+  - swiftbank_router_fallthrough_total{reason}            messages left to the orchestrator
+  - swiftbank_router_llm_seconds_saved_total              estimated LLM time saved by dispatching
+
+Export (environment variables):
+  - SWIFTBANK_METRICS_PORT           – serve GET /metrics on this port (first worker to bind wins), plus
+                                       GET /ready: 503 until mark_ready() (see warmup.py), then 200
+  - SWIFTBANK_METRICS_FILE           – dump the exposition text to this path; "{pid}" is replaced
+                                       with the process id so workers do not overwrite each other
+  - SWIFTBANK_METRICS_DUMP_INTERVAL  – seconds between dumps (default 15)
+"""
+
+import atexit
+import contextvars
+import functools
+import http.server
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Reply prefixes the tools use when they swallow an exception
+ERROR_REPLY_PREFIXES = ("Error ", "Failed ", "Cannot ")
+
+# Name of the tool currently running, so upstream metrics can be attributed to it
+current_tool: contextvars.ContextVar = contextvars.ContextVar("current_tool", default="")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, values)} {v:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values → [per-bucket counts..., +Inf count, sum]
+        self._series: dict = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self, *label_values) -> Optional[dict]:
+        """Return {'count', 'sum', 'buckets': [(upper bound, cumulative count)]} for one series."""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                return None
+            series = list(series)
+        cumulative, out = 0, []
+        for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+            cumulative += n
+            out.append((bound, cumulative))
+        return {"count": cumulative, "sum": series[-1], "buckets": out}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            keys = sorted(self._series)
+        for values in keys:
+            snap = self.snapshot(*values)
+            for bound, n in snap["buckets"]:
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), values + (le,))} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {snap['sum']:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {snap['count']}")
+        return lines
+
+
+tool_duration = Histogram("swiftbank_tool_duration_seconds", "Total tool call latency.", ("tool",))
+tool_calls = Counter("swiftbank_tool_calls_total", "Tool calls by outcome.", ("tool", "outcome"))
+upstream_duration = Histogram(
+    "swiftbank_upstream_duration_seconds", "BankMOCK request latency.", ("tool", "endpoint", "method"),
+)
+upstream_responses = Counter(
+    "swiftbank_upstream_responses_total", "BankMOCK responses by status.", ("endpoint", "method", "status"),
+)
+fallbacks = Counter("swiftbank_fallback_total", "Hits on silent fallback paths.", ("tool", "reason"))
+
+_metrics: list = [tool_duration, tool_calls, upstream_duration, upstream_responses, fallbacks]
+# Callables returning extra exposition lines, evaluated at render time
+_collectors: list = []
+# cache name → stats() callable
+_caches: dict = {}
+_CACHE_FIELDS = (
+    ("hits", "counter", "Cache hits."),
+    ("misses", "counter", "Cache misses."),
+    ("evictions", "counter", "Entries evicted by the LRU caps."),
+    ("invalidations", "counter", "Entries dropped by write invalidation."),
+    ("entries", "gauge", "Entries currently cached."),
+    ("bytes", "gauge", "Approximate bytes currently cached."),
+)
+
+
+def register(metric) -> None:
+    _metrics.append(metric)
+
+
+def register_collector(collector: Callable[[], list]) -> None:
+    """Add a callable returning extra exposition lines, evaluated on every render()."""
+    _collectors.append(collector)
+
+
+def gauge_lines(name: str, help_text: str, samples: dict, label_names: tuple = (), kind: str = "gauge") -> list:
+    """Render {label values: value} as exposition lines, for use inside collectors."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(label_names, values)} {v:g}" for values, v in sorted(samples.items()))
+    return lines
+
+
+def register_cache(name: str, stats: Callable[[], dict]) -> None:
+    """Export a TTLCache-style stats() dict as swiftbank_cache_*{cache=name} series."""
+    _caches[name] = stats
+
+
+def _cache_lines() -> list:
+    snapshots = {}
+    for name, stats in _caches.items():
+        try:
+            snapshots[(name,)] = stats()
+        except Exception:
+            continue
+    lines = []
+    for field, kind, help_text in _CACHE_FIELDS:
+        samples = {k: s[field] for k, s in snapshots.items() if field in s}
+        name = f"swiftbank_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines.extend(gauge_lines(name, help_text, samples, ("cache",), kind))
+    return lines
+
+
+def render() -> str:
+    lines = gauge_lines("swiftbank_ready", "1 once the instance is marked ready.", {(): int(_ready.is_set())})
+    for metric in _metrics:
+        lines.extend(metric.render())
+    lines.extend(_cache_lines())
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception:
+            continue
+    return "\n".join(lines) + "\n"
+
+
+def record_fallback(tool_name: str, reason: str) -> None:
+    fallbacks.inc(tool_name, reason)
+
+
+def record_upstream(endpoint: str, method: str, status, seconds: float) -> None:
+    upstream_duration.observe(seconds, current_tool.get(), endpoint, method)
+    upstream_responses.inc(endpoint, method, str(status))
+
+
+def _outcome(result) -> str:
+    if isinstance(result, str) and result.startswith(ERROR_REPLY_PREFIXES):
+        return "error"
+    return "ok"
+
+
+_call_hooks: list = []
+
+
+def register_call_hook(hook: Callable) -> None:
+    """Call hook(name, fn, args, kwargs) as each instrumented tool call starts.
+
+    The hook may return a finisher, called with (result, seconds) when the call ends;
+    result is None when the tool raised. Used by traffic_recorder.py.
+    """
+    _call_hooks.append(hook)
+
+
+def instrumented(fn):
+    """Record latency and outcome of a tool call. Apply beneath @tool()."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = current_tool.set(name)
+        finishers = [f for f in (hook(name, fn, args, kwargs) for hook in _call_hooks) if f is not None]
+        start = time.perf_counter()
+        outcome = "exception"
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            outcome = _outcome(result)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            tool_duration.observe(elapsed, name)
+            tool_calls.inc(name, outcome)
+            for finish in reversed(finishers):
+                finish(result, elapsed)
+            current_tool.reset(token)
+
+    return wrapper
+
+
+_ready = threading.Event()
+
+
+def mark_ready() -> None:
+    """Report the instance ready on GET /ready."""
+    _ready.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/ready":
+            ready = _ready.is_set()
+            body = b"ready\n" if ready else b"warming up\n"
+            self.send_response(200 if ready else 503)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> Optional[http.server.ThreadingHTTPServer]:
+    """Serve /metrics in a daemon thread. Returns None if the port is already taken by another worker."""
+    try:
+        server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    except OSError:
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def dump(path: str) -> None:
+    path = path.replace("{pid}", str(os.getpid()))
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def _dump_periodically(path: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            dump(path)
+        except OSError:
+            pass
+
+
+def _autostart() -> None:
+    port = os.environ.get("SWIFTBANK_METRICS_PORT")
+    if port:
+        serve(int(port))
+    path = os.environ.get("SWIFTBANK_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("SWIFTBANK_METRICS_DUMP_INTERVAL", 15))
+        threading.Thread(target=_dump_periodically, args=(path, interval), name="metrics-dump", daemon=True).start()
+        atexit.register(dump, path)
+
+
+_autostart()
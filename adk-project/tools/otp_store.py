@@ -0,0 +1,282 @@
+"""
+OTP store for the OTP tools
+
+Backends:
+  - SqliteOtpStore – default; a WAL-mode SQLite file shared by every tool-server
+                     worker, so verify_otp works on whichever process the call
+                     lands on
+  - MemoryOtpStore – in-process dict, for tests
+
+There is one record per customer; issuing a new OTP replaces the previous one.
+Wrong guesses are counted per customer, not per OTP: the count carries over
+to a newly issued OTP until OTP_ATTEMPT_WINDOW_SECONDS after the first wrong
+guess, so asking for a new code does not buy more guesses. A correct guess
+clears it. verify() is an atomic check-and-mark-used: the SQLite backend runs
+it inside a BEGIN IMMEDIATE transaction, so two workers can never both accept
+the same OTP. Expired records are removed by sweep(), an indexed range delete
+on expires_at that issue(), verify() and consume_verification() run at most
+once per sweep interval. Records with wrong guesses inside the window are
+kept until it closes.
+
+A successful verify() also records when it happened. consume_verification()
+spends that once, atomically, within OTP_GRANT_SECONDS: the card tools call it,
+so one verified OTP authorises exactly one card action whichever worker runs it.
+
+Configuration (environment variables):
+  - OTP_STORE            – "sqlite" (default) or "memory"
+  - OTP_DB_PATH          – SQLite file path (default: $SWIFTBANK_DATA_DIR/otp.db)
+  - OTP_TTL_SECONDS      – OTP lifetime (default 300)
+  - OTP_MAX_ATTEMPTS     – wrong guesses allowed per customer within the attempt window (default 5)
+  - OTP_ATTEMPT_WINDOW_SECONDS – how long wrong guesses count against a customer, from the
+                           first one (default 900)
+  - OTP_SWEEP_GRACE      – seconds an expired record is kept so verify can still
+                           say "expired" rather than "not found" (default 300)
+  - OTP_GRANT_SECONDS    – how long a verified OTP authorises a card action (default 300)
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from storage import ThreadLocalConnection, data_path, transaction
+
+OTP_TTL_SECONDS = int(os.environ.get("OTP_TTL_SECONDS", 300))
+OTP_MAX_ATTEMPTS = int(os.environ.get("OTP_MAX_ATTEMPTS", 5))
+OTP_ATTEMPT_WINDOW_SECONDS = int(os.environ.get("OTP_ATTEMPT_WINDOW_SECONDS", 900))
+OTP_SWEEP_GRACE = int(os.environ.get("OTP_SWEEP_GRACE", 300))
+OTP_GRANT_SECONDS = int(os.environ.get("OTP_GRANT_SECONDS", 300))
+SWEEP_INTERVAL_SECONDS = 60
+
+# verify() results
+VERIFIED = "VERIFIED"
+NOT_FOUND = "NOT_FOUND"
+ALREADY_USED = "ALREADY_USED"
+EXPIRED = "EXPIRED"
+INCORRECT = "INCORRECT"
+LOCKED = "LOCKED"
+
+
+def _attempts(record: dict, now: float, window: float) -> int:
+    """Wrong guesses that still count: those since failed_since, while the window is open."""
+    failed_since = record.get("failed_since")
+    return record["attempts"] if failed_since is not None and failed_since >= now - window else 0
+
+
+def _check(record: Optional[dict], submitted_otp: str, now: float, max_attempts: int, window: float) -> str:
+    if not record:
+        return NOT_FOUND
+    if _attempts(record, now, window) >= max_attempts:
+        return LOCKED
+    if record["used"]:
+        return ALREADY_USED
+    if now > record["expires_at"]:
+        return EXPIRED
+    if record["otp"] != submitted_otp:
+        return INCORRECT
+    return VERIFIED
+
+
+class OtpStore(ABC):
+    """Storage interface used by otp_tools."""
+
+    max_attempts = OTP_MAX_ATTEMPTS
+    attempt_window = OTP_ATTEMPT_WINDOW_SECONDS
+    _last_sweep = 0.0
+
+    @abstractmethod
+    def issue(self, customer_id: str, otp: str, purpose: str, ttl: int = OTP_TTL_SECONDS) -> None:
+        ...
+
+    @abstractmethod
+    def verify(self, customer_id: str, submitted_otp: str) -> str:
+        """Check the OTP and mark it used on success. Returns one of the result constants."""
+
+    @abstractmethod
+    def get(self, customer_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def consume_verification(self, customer_id: str, max_age: float) -> bool:
+        """Spend a verification made in the last max_age seconds. True at most once per verified OTP."""
+
+    @abstractmethod
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete records that expired more than OTP_SWEEP_GRACE seconds ago and have no
+        wrong guesses still counting. Returns the count."""
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep > SWEEP_INTERVAL_SECONDS:
+            self.sweep(now)
+
+
+class MemoryOtpStore(OtpStore):
+    def __init__(self):
+        self._records: dict = {}
+        self._lock = threading.Lock()
+
+    def issue(self, customer_id: str, otp: str, purpose: str, ttl: int = OTP_TTL_SECONDS) -> None:
+        now = time.time()
+        with self._lock:
+            previous = self._records.get(customer_id)
+            attempts = _attempts(previous, now, self.attempt_window) if previous else 0
+            self._records[customer_id] = {
+                "otp": otp,
+                "purpose": purpose,
+                "expires_at": now + ttl,
+                "used": False,
+                "attempts": attempts,
+                "failed_since": previous["failed_since"] if attempts else None,
+                "verified_at": None,
+            }
+        self._maybe_sweep(now)
+
+    def verify(self, customer_id: str, submitted_otp: str) -> str:
+        now = time.time()
+        self._maybe_sweep(now)
+        with self._lock:
+            record = self._records.get(customer_id)
+            result = _check(record, submitted_otp, now, self.max_attempts, self.attempt_window)
+            if result == VERIFIED:
+                record.update(used=True, verified_at=now, attempts=0, failed_since=None)
+            elif result == INCORRECT:
+                if not _attempts(record, now, self.attempt_window):
+                    record.update(attempts=0, failed_since=now)
+                record["attempts"] += 1
+            return result
+
+    def get(self, customer_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(customer_id)
+            return dict(record) if record else None
+
+    def consume_verification(self, customer_id: str, max_age: float) -> bool:
+        self._maybe_sweep(time.time())
+        with self._lock:
+            record = self._records.get(customer_id)
+            if not record or record["verified_at"] is None or record["verified_at"] < time.time() - max_age:
+                return False
+            record["verified_at"] = None
+            return True
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        cutoff = now - OTP_SWEEP_GRACE
+        with self._lock:
+            self._last_sweep = now
+            doomed = [k for k, r in self._records.items()
+                      if r["expires_at"] < cutoff and not _attempts(r, now, self.attempt_window)]
+            for key in doomed:
+                del self._records[key]
+        return len(doomed)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS otps (
+    customer_id TEXT PRIMARY KEY,
+    otp         TEXT NOT NULL,
+    purpose     TEXT,
+    expires_at  REAL NOT NULL,
+    used        INTEGER NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    failed_since REAL,
+    verified_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_otps_expires_at ON otps (expires_at);
+"""
+
+
+def _init_schema(conn) -> None:
+    conn.executescript(_SCHEMA)
+    # otp.db files created before these columns existed
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(otps)")}
+    for column in ("verified_at", "failed_since"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE otps ADD COLUMN {column} REAL")
+
+
+class SqliteOtpStore(OtpStore):
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("otp.db")
+        self._db = ThreadLocalConnection(self.path, _init_schema)
+
+    def issue(self, customer_id: str, otp: str, purpose: str, ttl: int = OTP_TTL_SECONDS) -> None:
+        now = time.time()
+        # Wrong guesses still inside the window carry over to the new OTP
+        self._db.get().execute(
+            "INSERT INTO otps (customer_id, otp, purpose, expires_at, used, attempts, failed_since, verified_at) "
+            "VALUES (:customer_id, :otp, :purpose, :expires_at, 0, 0, NULL, NULL) "
+            "ON CONFLICT (customer_id) DO UPDATE SET otp = excluded.otp, purpose = excluded.purpose, "
+            "expires_at = excluded.expires_at, used = 0, verified_at = NULL, "
+            "attempts = CASE WHEN failed_since >= :window_start THEN attempts ELSE 0 END, "
+            "failed_since = CASE WHEN failed_since >= :window_start THEN failed_since END",
+            {"customer_id": customer_id, "otp": otp, "purpose": purpose, "expires_at": now + ttl,
+             "window_start": now - self.attempt_window},
+        )
+        self._maybe_sweep(now)
+
+    def verify(self, customer_id: str, submitted_otp: str) -> str:
+        now = time.time()
+        self._maybe_sweep(now)
+        conn = self._db.get()
+        with transaction(conn):
+            row = conn.execute("SELECT * FROM otps WHERE customer_id = ?", (customer_id,)).fetchone()
+            record = dict(row) if row else None
+            result = _check(record, submitted_otp, now, self.max_attempts, self.attempt_window)
+            if result == VERIFIED:
+                conn.execute(
+                    "UPDATE otps SET used = 1, verified_at = ?, attempts = 0, failed_since = NULL WHERE customer_id = ?",
+                    (now, customer_id),
+                )
+            elif result == INCORRECT:
+                attempts = _attempts(record, now, self.attempt_window)
+                conn.execute(
+                    "UPDATE otps SET attempts = ?, failed_since = ? WHERE customer_id = ?",
+                    (attempts + 1, record["failed_since"] if attempts else now, customer_id),
+                )
+        return result
+
+    def get(self, customer_id: str) -> Optional[dict]:
+        row = self._db.get().execute("SELECT * FROM otps WHERE customer_id = ?", (customer_id,)).fetchone()
+        return dict(row) if row else None
+
+    def consume_verification(self, customer_id: str, max_age: float) -> bool:
+        self._maybe_sweep(time.time())
+        cur = self._db.get().execute(
+            "UPDATE otps SET verified_at = NULL WHERE customer_id = ? AND verified_at >= ?",
+            (customer_id, time.time() - max_age),
+        )
+        return cur.rowcount == 1
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        self._last_sweep = now
+        cur = self._db.get().execute(
+            "DELETE FROM otps WHERE expires_at < ? AND (failed_since IS NULL OR failed_since < ?)",
+            (now - OTP_SWEEP_GRACE, now - self.attempt_window),
+        )
+        return cur.rowcount
+
+
+_store: Optional[OtpStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> OtpStore:
+    """Return the process-wide OTP store selected by OTP_STORE, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.environ.get("OTP_STORE", "sqlite").lower() == "memory":
+                    _store = MemoryOtpStore()
+                else:
+                    _store = SqliteOtpStore(os.environ.get("OTP_DB_PATH"))
+    return _store
+
+
+def set_store(store: OtpStore) -> None:
+    """Swap the store, e.g. for a MemoryOtpStore in tests."""
+    global _store
+    _store = store
@@ -7,51 +7,46 @@ Tools:
   - verify_otp    – validate the OTP entered by the customer
 
 The OTP is generated via the BankMOCK API which sends it to the registered
-mobile number (simulated in demo mode).
+mobile number (simulated in demo mode). OTPs are kept in otp_store (SQLite by
+default), so generate_otp and verify_otp may run in different worker processes. generate_otp is implemented as a
+coroutine (generate_otp_async); the @tool() function is a thin synchronous
+wrapper around it. A retried generate_otp returns the OTP already sent while it
+is still usable, instead of replacing it (see idempotency.py). Beyond that, each
+customer may request 3 OTPs and make 10 verification attempts per 5 minutes by
+default (see rate_limiter.py). A successful verify_otp is recorded in otp_store and
+authorises one card action.
 """
 
-import requests
 import random
 import time
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
 
-BANKMOCK_BASE = "https://bankmock-theta.vercel.app/api/v1"
+import bankmock_client as bankmock
+import idempotency
+import metrics
+import otp_store
+import rate_limiter
+import token_budget
+import warmup
 
-# In-memory OTP store (per-agent process lifetime)
-# Key: customer_id → {otp, expires_at, used}
-_otp_store: dict = {}
+# A repeated generate_otp within this window returns the OTP already sent, while it is still usable
+OTP_REPEAT_WINDOW_SECONDS = 60
 
 
-def _headers(customer_id: str) -> dict:
-    return {
-        "Content-Type": "application/json",
-        "X-Customer-ID": customer_id,
-    }
+def _otp_still_usable(arguments: dict) -> bool:
+    store = otp_store.get_store()
+    record = store.get(arguments["customer_id"])
+    return bool(
+        record and not record["used"]
+        and record["expires_at"] > time.time()
+        and record["attempts"] < store.max_attempts
+    )
 
 
-@tool()
-def generate_otp(customer_id: str, purpose: str = "CARD_ACTION") -> str:
-    """Generate and send a One-Time Password (OTP) to the customer's registered mobile number.
-
-    Call this tool when a secure action requires 2FA (e.g., card unlock, card block).
-    The OTP expires in 5 minutes. After generating, ask the customer to enter it.
-
-    Args:
-        customer_id (str): The unique customer identifier extracted from the authenticated session.
-        purpose (str): The reason for OTP generation, e.g. 'CARD_UNLOCK', 'CARD_BLOCK'. Defaults to 'CARD_ACTION'.
-
-    Returns:
-        str: Confirmation that the OTP was sent and instructions for the customer.
-    """
+async def generate_otp_async(customer_id: str, purpose: str = "CARD_ACTION") -> str:
+    """Async implementation of generate_otp."""
     try:
-        resp = requests.post(
-            f"{BANKMOCK_BASE}/generate-otp",
-            headers=_headers(customer_id),
-            json={"purpose": purpose},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        data = await bankmock.apost_json(customer_id, "/generate-otp", json={"purpose": purpose})
         otp_data = data.get("data", {})
 
         # BankMOCK may return the OTP in demo mode
@@ -64,12 +59,7 @@ def generate_otp(customer_id: str, purpose: str = "CARD_ACTION") -> str:
 
         # Store OTP locally for verification
         if otp_value:
-            _otp_store[customer_id] = {
-                "otp": str(otp_value),
-                "expires_at": time.time() + 300,
-                "used": False,
-                "purpose": purpose,
-            }
+            otp_store.get_store().issue(customer_id, str(otp_value), purpose)
             return (
                 f"✅ OTP sent to your registered mobile number.\n"
                 f"[DEMO MODE] Your OTP is: **{otp_value}**\n"
@@ -78,13 +68,9 @@ def generate_otp(customer_id: str, purpose: str = "CARD_ACTION") -> str:
             )
 
         # Fallback: generate locally if API doesn't return OTP
+        metrics.record_fallback("generate_otp", "no_otp_in_response")
         fallback_otp = str(random.randint(100000, 999999))
-        _otp_store[customer_id] = {
-            "otp": fallback_otp,
-            "expires_at": time.time() + 300,
-            "used": False,
-            "purpose": purpose,
-        }
+        otp_store.get_store().issue(customer_id, fallback_otp, purpose)
         return (
             f"✅ OTP sent to your registered mobile number.\n"
             f"[DEMO MODE] Your OTP is: **{fallback_otp}**\n"
@@ -92,15 +78,17 @@ def generate_otp(customer_id: str, purpose: str = "CARD_ACTION") -> str:
             "Please ask the customer to enter the 6-digit OTP to proceed."
         )
 
-    except Exception:
+    except Exception as e:
         # Complete fallback
+        if isinstance(e, bankmock.CircuitOpenError):
+            reason = "circuit_open"
+        elif isinstance(e, bankmock.RateLimitedError):
+            reason = "rate_limited"
+        else:
+            reason = "upstream_error"
+        metrics.record_fallback("generate_otp", reason)
         fallback_otp = str(random.randint(100000, 999999))
-        _otp_store[customer_id] = {
-            "otp": fallback_otp,
-            "expires_at": time.time() + 300,
-            "used": False,
-            "purpose": purpose,
-        }
+        otp_store.get_store().issue(customer_id, fallback_otp, purpose)
         return (
             f"✅ OTP sent to your registered mobile number.\n"
             f"[DEMO MODE] Your OTP is: **{fallback_otp}**\n"
@@ -110,6 +98,30 @@ def generate_otp(customer_id: str, purpose: str = "CARD_ACTION") -> str:
 
 
 @tool()
+@metrics.instrumented
+@token_budget.budgeted
+@idempotency.idempotent(window=OTP_REPEAT_WINDOW_SECONDS, valid=_otp_still_usable)
+@rate_limiter.limited
+def generate_otp(customer_id: str, purpose: str = "CARD_ACTION") -> str:
+    """Generate and send a One-Time Password (OTP) to the customer's registered mobile number.
+
+    Call this tool when a secure action requires 2FA (e.g., card unlock, card block).
+    The OTP expires in 5 minutes. After generating, ask the customer to enter it.
+
+    Args:
+        customer_id (str): The unique customer identifier extracted from the authenticated session.
+        purpose (str): The reason for OTP generation, e.g. 'CARD_UNLOCK', 'CARD_BLOCK'. Defaults to 'CARD_ACTION'.
+
+    Returns:
+        str: Confirmation that the OTP was sent and instructions for the customer.
+    """
+    return bankmock.run_sync(generate_otp_async(customer_id, purpose))
+
+
+@tool()
+@metrics.instrumented
+@token_budget.budgeted
+@rate_limiter.limited
 def verify_otp(customer_id: str, submitted_otp: str) -> str:
     """Verify the OTP entered by the customer.
 
@@ -126,22 +138,27 @@ def verify_otp(customer_id: str, submitted_otp: str) -> str:
     """
     submitted_otp = submitted_otp.strip()
 
-    record = _otp_store.get(customer_id)
+    # Check and mark-used happen atomically in the store
+    result = otp_store.get_store().verify(customer_id, submitted_otp)
 
-    if not record:
+    if result == otp_store.NOT_FOUND:
         return "OTP_VERIFIED:FAIL – No OTP found. Please generate a new OTP first."
 
-    if record.get("used"):
+    if result == otp_store.ALREADY_USED:
         return "OTP_VERIFIED:FAIL – This OTP has already been used. Please generate a new OTP."
 
-    if time.time() > record.get("expires_at", 0):
+    if result == otp_store.EXPIRED:
         return "OTP_VERIFIED:FAIL – The OTP has expired. Please generate a new OTP."
 
-    if record.get("otp") != submitted_otp:
-        return "OTP_VERIFIED:FAIL – Incorrect OTP. Please check and try again, or generate a new OTP."
+    if result == otp_store.LOCKED:
+        minutes = -(-otp_store.get_store().attempt_window // 60)
+        return f"OTP_VERIFIED:FAIL – Too many incorrect attempts. Please try again in up to {minutes} minutes."
 
-    # Mark as used
-    record["used"] = True
-    _otp_store[customer_id] = record
+    if result == otp_store.INCORRECT:
+        return "OTP_VERIFIED:FAIL – Incorrect OTP. Please check and try again, or generate a new OTP."
 
     return "OTP_VERIFIED:SUCCESS – Identity verified. You may now proceed with the card action."
+
+
+# Runs the warm-up if SWIFTBANK_WARMUP asks for it, then marks the instance ready
+warmup.start()
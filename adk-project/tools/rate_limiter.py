@@ -0,0 +1,538 @@
+"""
+Rate limits with fair queueing for tool calls and BankMOCK requests
+
+One chatty session or a retry storm could otherwise flood BankMOCK, e.g.
+through get_recent_transactions, or keep replacing a customer's OTP through
+generate_otp. Calls are held to token buckets:
+  - customer  – every tool call of one customer (RATE_LIMIT_CUSTOMER)
+  - tool      – calls of one tool by one customer, for the tools listed in
+                RATE_LIMIT_TOOLS (generate_otp, verify_otp and
+                get_recent_transactions by default)
+  - endpoint  – requests to one BankMOCK endpoint from all customers and all
+                workers (RATE_LIMIT_ENDPOINTS, "*" for the others)
+@limited checks the customer and tool buckets when a tool is called, and
+bankmock_client checks the endpoint bucket before every request.
+
+A call over its limit queues instead of failing. Each customer has a queue
+for the tools without a limit of their own and one per limited tool, so an
+exhausted generate_otp bucket holds up no other tool. Endpoint queues are fair:
+weighted round-robin by customer. Each queued call gets the tag
+max(queue's virtual time, customer's last queued tag) + 1 / weight, and the
+lowest tag goes next, so a customer with fifty queued requests delays someone
+with one by a single turn, not fifty. A call that cannot go within
+RATE_LIMIT_MAX_WAIT_SECONDS is turned away. This happens up front when its
+estimated wait is already longer. A tool then replies "Error – too many
+requests…", and an upstream request raises RateLimitedError, a
+ConnectionError the tools handle like other connection failures.
+
+Buckets and queues live in SQLite by default, shared by all worker processes
+like the other stores (see storage.py). Taking a token is a short write
+transaction that can wait on another worker's lock, so the async BankMOCK
+requests run it in the event loop's executor. Queued calls keep their place by
+polling, sleeping for about their estimated wait in between. A queued call
+whose worker died stops counting once its deadline has passed.
+
+Limits are written "count/seconds": "3/300" allows bursts of 3 and refills
+one token every 100 seconds.
+
+Configuration (environment variables):
+  - RATE_LIMIT                    – "false" to disable all limits (default on)
+  - RATE_LIMIT_STORE              – "sqlite" (default) or "memory" (one process only, for tests)
+  - RATE_LIMIT_DB_PATH            – SQLite file path (default: $SWIFTBANK_DATA_DIR/rate_limits.db)
+  - RATE_LIMIT_CUSTOMER           – tool calls per customer (default 30/60)
+  - RATE_LIMIT_TOOLS              – per-tool, per-customer limits, "tool=count/seconds,…"
+                                    (default generate_otp=3/300,verify_otp=10/300,get_recent_transactions=20/60)
+  - RATE_LIMIT_ENDPOINTS          – global per-endpoint limits, "/endpoint=count/seconds,…"
+                                    (default *=100/1,/statement=20/1,/generate-otp=20/1)
+  - RATE_LIMIT_CUSTOMER_WEIGHTS   – queue weights, "customer_id=weight,…" (default weight 1)
+  - RATE_LIMIT_MAX_WAIT_SECONDS   – longest a call queues before it is turned away (default 5)
+"""
+
+import asyncio
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+
+import metrics
+from storage import ThreadLocalConnection, data_path, transaction
+
+
+class Limit(NamedTuple):
+    # Tokens added per second
+    rate: float
+    # Bucket size
+    burst: float
+
+
+def parse_limit(spec: str) -> Limit:
+    """ "count/seconds" → Limit(count / seconds, count)."""
+    count, _, seconds = spec.partition("/")
+    count, seconds = float(count), float(seconds or 1)
+    if count <= 0 or seconds <= 0:
+        raise ValueError(f"invalid rate limit {spec!r}")
+    return Limit(count / seconds, count)
+
+
+def parse_limits(spec: str) -> dict:
+    """ "name=count/seconds,…" → {name: Limit}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, limit = item.partition("=")
+        limits[name.strip()] = parse_limit(limit.strip())
+    return limits
+
+
+def _parse_weights(spec: str) -> dict:
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        customer_id, _, weight = item.partition("=")
+        weights[customer_id.strip()] = float(weight)
+    return weights
+
+
+ENABLED = os.environ.get("RATE_LIMIT", "true").lower() not in ("0", "false", "no")
+CUSTOMER_LIMIT = parse_limit(os.environ.get("RATE_LIMIT_CUSTOMER", "30/60"))
+TOOL_LIMITS = parse_limits(os.environ.get(
+    "RATE_LIMIT_TOOLS", "generate_otp=3/300,verify_otp=10/300,get_recent_transactions=20/60",
+))
+ENDPOINT_LIMITS = parse_limits(os.environ.get("RATE_LIMIT_ENDPOINTS", "*=100/1,/statement=20/1,/generate-otp=20/1"))
+CUSTOMER_WEIGHTS = _parse_weights(os.environ.get("RATE_LIMIT_CUSTOMER_WEIGHTS", ""))
+MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", 5))
+# Bounds on the sleep between two attempts of a queued call
+MIN_POLL_SECONDS = 0.005
+MAX_POLL_SECONDS = 0.25
+SWEEP_INTERVAL_SECONDS = 60
+
+# Scopes, the first part of each queue's name
+CUSTOMER = "customer"
+ENDPOINT = "endpoint"
+
+WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+wait_seconds = metrics.Histogram(
+    "swiftbank_rate_limit_wait_seconds", "Time calls spent queued for a rate limit before going ahead.",
+    ("scope",), WAIT_BUCKETS,
+)
+limited_calls = metrics.Counter(
+    "swiftbank_rate_limited_total", "Calls over a rate limit: queued (then went ahead) or rejected.",
+    ("scope", "outcome"),
+)
+metrics.register(wait_seconds)
+metrics.register(limited_calls)
+
+
+class RateLimitedError(ConnectionError):
+    """A call could not go ahead within RATE_LIMIT_MAX_WAIT_SECONDS."""
+
+    def __init__(self, queue: str, retry_after: float):
+        self.queue = queue
+        self.retry_after = retry_after
+        super().__init__(f"rate limit reached for {queue}, retry in {math.ceil(retry_after)}s")
+
+
+def _refill(tokens: float, updated_at: float, limit: Limit, now: float) -> float:
+    return min(limit.burst, tokens + max(0.0, now - updated_at) * limit.rate)
+
+
+def _shortfall(tokens: dict, buckets: tuple) -> float:
+    """Seconds until every bucket holds a whole token (0 if they all do now)."""
+    return max((1 - tokens[key]) / limit.rate if tokens[key] < 1 else 0.0 for key, limit in buckets)
+
+
+class RateLimitStore(ABC):
+    """Storage interface for token buckets and the fair queues in front of them."""
+
+    # Whether acquire() can block on I/O or on locks held by other processes
+    blocking = True
+
+    @abstractmethod
+    def acquire(self, queue: str, buckets: tuple, customer_id: str, weight: float, deadline: float,
+                ticket: Optional[int] = None, now: Optional[float] = None) -> tuple:
+        """Take one token from every bucket if the caller may go now.
+
+        Args:
+            queue: Name of the queue the caller waits in when it may not.
+            buckets: ((key, Limit), …) to take a token from.
+            customer_id: Whose call it is, for fair ordering.
+            weight: Customer's share of the queue relative to others.
+            deadline: Wall-clock time after which a queued ticket no longer counts.
+            ticket: The caller's place in the queue from an earlier attempt.
+
+        Returns:
+            (granted, ticket, wait): whether the tokens were taken; otherwise the
+            caller's ticket (None if it could not go before its deadline anyway)
+            and the estimated seconds until it can.
+        """
+
+    @abstractmethod
+    def cancel(self, ticket: int) -> None:
+        """Give up a place in a queue."""
+
+    @abstractmethod
+    def queue_depths(self) -> dict:
+        """Scope → calls queued."""
+
+    @abstractmethod
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop expired tickets and refilled buckets. Returns the count removed."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    blocking = False
+
+    def __init__(self):
+        # key → (tokens, updated_at, full_at)
+        self._buckets: dict = {}
+        # queue → {ticket: (tag, customer_id, expires_at)}
+        self._queues: dict = {}
+        # queue → tag of the last ticket served
+        self._vtime: dict = {}
+        self._next_ticket = 1
+        self._lock = threading.Lock()
+
+    def acquire(self, queue, buckets, customer_id, weight, deadline, ticket=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            waiting = self._queues.setdefault(queue, {})
+            for expired in [t for t, entry in waiting.items() if entry[2] <= now]:
+                del waiting[expired]
+            order = sorted(waiting, key=lambda t: (waiting[t][0], t))
+            tokens = {}
+            for key, limit in buckets:
+                state = self._buckets.get(key)
+                tokens[key] = _refill(state[0], state[1], limit, now) if state else limit.burst
+            shortfall = _shortfall(tokens, buckets)
+            ahead = order.index(ticket) if ticket in waiting else len(order)
+            if ahead == 0 and shortfall == 0:
+                for key, limit in buckets:
+                    left = tokens[key] - 1
+                    self._buckets[key] = (left, now, now + (limit.burst - left) / limit.rate)
+                if ticket in waiting:
+                    self._vtime[queue] = waiting.pop(ticket)[0]
+                return True, None, 0.0
+            rate = min(limit.rate for _, limit in buckets)
+            if ticket is None:
+                if now + shortfall > deadline:
+                    return False, None, shortfall
+                last = max((tag for tag, cid, _ in waiting.values() if cid == customer_id), default=0.0)
+                tag = max(self._vtime.get(queue, 0.0), last) + 1 / weight
+                # Fair order may put the new ticket ahead of earlier ones
+                ahead = sum(1 for t, entry in waiting.items() if entry[0] <= tag)
+                if now + shortfall + ahead / rate > deadline:
+                    return False, None, shortfall + ahead / rate
+                ticket, self._next_ticket = self._next_ticket, self._next_ticket + 1
+                waiting[ticket] = (tag, customer_id, deadline)
+            return False, ticket, shortfall + ahead / rate
+
+    def cancel(self, ticket):
+        with self._lock:
+            for waiting in self._queues.values():
+                waiting.pop(ticket, None)
+
+    def queue_depths(self):
+        depths: dict = {}
+        with self._lock:
+            for queue, waiting in self._queues.items():
+                scope = queue.partition(":")[0]
+                depths[scope] = depths.get(scope, 0) + len(waiting)
+        return depths
+
+    def sweep(self, now=None):
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            for key in [k for k, state in self._buckets.items() if state[2] <= now]:
+                del self._buckets[key]
+                removed += 1
+            for queue, waiting in list(self._queues.items()):
+                for expired in [t for t, entry in waiting.items() if entry[2] <= now]:
+                    del waiting[expired]
+                    removed += 1
+                if not waiting:
+                    del self._queues[queue]
+        return removed
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key         TEXT PRIMARY KEY,
+    tokens      REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    full_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rate_buckets_full_at ON rate_buckets (full_at);
+CREATE TABLE IF NOT EXISTS rate_queue (
+    ticket       INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue        TEXT NOT NULL,
+    customer_id  TEXT NOT NULL,
+    tag          REAL NOT NULL,
+    expires_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rate_queue_order ON rate_queue (queue, tag, ticket);
+CREATE INDEX IF NOT EXISTS idx_rate_queue_expires_at ON rate_queue (expires_at);
+CREATE TABLE IF NOT EXISTS rate_queue_clock (
+    queue  TEXT PRIMARY KEY,
+    vtime  REAL NOT NULL
+);
+"""
+
+
+class SqliteRateLimitStore(RateLimitStore):
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("rate_limits.db")
+        self._db = ThreadLocalConnection(self.path, lambda conn: conn.executescript(_SCHEMA))
+        self._last_sweep = 0.0
+
+    def acquire(self, queue, buckets, customer_id, weight, deadline, ticket=None, now=None):
+        now = time.time() if now is None else now
+        conn = self._db.get()
+        with transaction(conn):
+            conn.execute("DELETE FROM rate_queue WHERE queue = ? AND expires_at <= ?", (queue, now))
+            tokens = {}
+            for key, limit in buckets:
+                row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens[key] = _refill(row["tokens"], row["updated_at"], limit, now) if row else limit.burst
+            shortfall = _shortfall(tokens, buckets)
+            mine = ticket and conn.execute(
+                "SELECT tag FROM rate_queue WHERE ticket = ?", (ticket,),
+            ).fetchone()
+            if mine:
+                (ahead,) = conn.execute(
+                    "SELECT COUNT(*) FROM rate_queue WHERE queue = ? AND (tag < ? OR (tag = ? AND ticket < ?))",
+                    (queue, mine["tag"], mine["tag"], ticket),
+                ).fetchone()
+            else:
+                (ahead,) = conn.execute("SELECT COUNT(*) FROM rate_queue WHERE queue = ?", (queue,)).fetchone()
+            if ahead == 0 and shortfall == 0:
+                for key, limit in buckets:
+                    left = tokens[key] - 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                        (key, left, now, now + (limit.burst - left) / limit.rate),
+                    )
+                if mine:
+                    conn.execute("DELETE FROM rate_queue WHERE ticket = ?", (ticket,))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rate_queue_clock (queue, vtime) VALUES (?, ?)", (queue, mine["tag"]),
+                    )
+                granted, ticket, wait = True, None, 0.0
+            else:
+                granted = False
+                rate = min(limit.rate for _, limit in buckets)
+                if not mine:
+                    tag = self._tag(conn, queue, customer_id, weight)
+                    # Fair order may put the new ticket ahead of earlier ones
+                    (ahead,) = conn.execute(
+                        "SELECT COUNT(*) FROM rate_queue WHERE queue = ? AND tag <= ?", (queue, tag),
+                    ).fetchone()
+                    ticket = None
+                    if now + shortfall + ahead / rate <= deadline:
+                        ticket = conn.execute(
+                            "INSERT INTO rate_queue (queue, customer_id, tag, expires_at) VALUES (?, ?, ?, ?)",
+                            (queue, customer_id, tag, deadline),
+                        ).lastrowid
+                wait = shortfall + ahead / rate
+        if now - self._last_sweep > SWEEP_INTERVAL_SECONDS:
+            self.sweep(now)
+        return granted, ticket, wait
+
+    @staticmethod
+    def _tag(conn, queue: str, customer_id: str, weight: float) -> float:
+        (vtime,) = conn.execute(
+            "SELECT COALESCE((SELECT vtime FROM rate_queue_clock WHERE queue = ?), 0)", (queue,),
+        ).fetchone()
+        (last,) = conn.execute(
+            "SELECT COALESCE(MAX(tag), 0) FROM rate_queue WHERE queue = ? AND customer_id = ?", (queue, customer_id),
+        ).fetchone()
+        return max(vtime, last) + 1 / weight
+
+    def cancel(self, ticket):
+        self._db.get().execute("DELETE FROM rate_queue WHERE ticket = ?", (ticket,))
+
+    def queue_depths(self):
+        rows = self._db.get().execute(
+            "SELECT substr(queue, 1, instr(queue, ':') - 1) AS scope, COUNT(*) AS depth "
+            "FROM rate_queue WHERE expires_at > ? GROUP BY scope", (time.time(),),
+        ).fetchall()
+        return {row["scope"]: row["depth"] for row in rows}
+
+    def sweep(self, now=None):
+        now = time.time() if now is None else now
+        self._last_sweep = now
+        conn = self._db.get()
+        with transaction(conn):
+            removed = conn.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,)).rowcount
+            removed += conn.execute("DELETE FROM rate_queue WHERE expires_at <= ?", (now,)).rowcount
+            conn.execute("DELETE FROM rate_queue_clock WHERE queue NOT IN (SELECT DISTINCT queue FROM rate_queue)")
+        return removed
+
+
+_store: Optional[RateLimitStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> RateLimitStore:
+    """Return the process-wide store selected by RATE_LIMIT_STORE, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.environ.get("RATE_LIMIT_STORE", "sqlite").lower() == "memory":
+                    _store = MemoryRateLimitStore()
+                else:
+                    _store = SqliteRateLimitStore(os.environ.get("RATE_LIMIT_DB_PATH"))
+    return _store
+
+
+def set_store(store: RateLimitStore) -> None:
+    """Swap the store, e.g. for a MemoryRateLimitStore in tests."""
+    global _store
+    _store = store
+
+
+class _Admission:
+    """One call's way through a queue. attempt() calls the store, so coroutines can run it off the event loop."""
+
+    def __init__(self, scope: str, queue: str, buckets: tuple, customer_id: str, max_wait: Optional[float]):
+        self.store = get_store()
+        self.scope = scope
+        self.queue = queue
+        self.buckets = buckets
+        self.customer_id = customer_id
+        self.weight = CUSTOMER_WEIGHTS.get(customer_id, 1.0)
+        self.deadline = time.time() + (MAX_WAIT_SECONDS if max_wait is None else max_wait)
+        self.ticket: Optional[int] = None
+        self.queued_at: Optional[float] = None
+
+    def attempt(self) -> Optional[float]:
+        """Take the tokens if the call may go: None when it may, else the seconds to sleep before the next
+        attempt. Raises RateLimitedError when it cannot go before its deadline."""
+        granted, self.ticket, wait = self.store.acquire(
+            self.queue, self.buckets, self.customer_id, self.weight, self.deadline, self.ticket,
+        )
+        if granted:
+            if self.queued_at is not None:
+                limited_calls.inc(self.scope, "queued")
+                wait_seconds.observe(time.monotonic() - self.queued_at, self.scope)
+            return None
+        if self.queued_at is None:
+            self.queued_at = time.monotonic()
+        if self.ticket is None or time.time() >= self.deadline:
+            self.abandon()
+            limited_calls.inc(self.scope, "rejected")
+            raise RateLimitedError(self.queue, wait)
+        return min(max(wait, MIN_POLL_SECONDS), MAX_POLL_SECONDS, max(0.0, self.deadline - time.time()))
+
+    def abandon(self) -> None:
+        """Give up the call's place in the queue, if it has one."""
+        if self.ticket is not None:
+            ticket, self.ticket = self.ticket, None
+            self.store.cancel(ticket)
+
+
+def admit(scope: str, queue: str, buckets: tuple, customer_id: str, max_wait: Optional[float] = None) -> None:
+    """Block until a token from every bucket is taken. Raises RateLimitedError."""
+    if not ENABLED:
+        return
+    admission = _Admission(scope, queue, buckets, customer_id, max_wait)
+    try:
+        delay = admission.attempt()
+        while delay is not None:
+            time.sleep(delay)
+            delay = admission.attempt()
+    except BaseException:
+        admission.abandon()
+        raise
+
+
+async def aadmit(scope: str, queue: str, buckets: tuple, customer_id: str, max_wait: Optional[float] = None) -> None:
+    """admit() for coroutines: neither the waits nor the store calls block the event loop.
+
+    SqliteRateLimitStore.acquire takes a write lock shared by every worker, so it runs
+    in the loop's default executor rather than stalling every tool on the loop.
+    """
+    if not ENABLED:
+        return
+    admission = _Admission(scope, queue, buckets, customer_id, max_wait)
+    loop = asyncio.get_running_loop()
+
+    async def attempt() -> Optional[float]:
+        if not admission.store.blocking:
+            return admission.attempt()
+        return await loop.run_in_executor(None, admission.attempt)
+
+    try:
+        delay = await attempt()
+        while delay is not None:
+            await asyncio.sleep(delay)
+            delay = await attempt()
+    except BaseException:
+        # Cancelled mid-attempt, the ticket may be taken after this; it lapses at its deadline
+        if admission.store.blocking:
+            loop.run_in_executor(None, admission.abandon)
+        else:
+            admission.abandon()
+        raise
+
+
+def _endpoint_buckets(endpoint: str) -> tuple:
+    limit = ENDPOINT_LIMITS.get(endpoint) or ENDPOINT_LIMITS.get("*")
+    return ((f"{ENDPOINT}:{endpoint}", limit),) if limit else ()
+
+
+def admit_upstream(endpoint: str, customer_id: str) -> None:
+    """Hold a BankMOCK request to its endpoint's global limit, queued fairly by customer."""
+    buckets = _endpoint_buckets(endpoint)
+    if buckets:
+        admit(ENDPOINT, buckets[0][0], buckets, customer_id)
+
+
+async def aadmit_upstream(endpoint: str, customer_id: str) -> None:
+    """admit_upstream() for coroutines."""
+    buckets = _endpoint_buckets(endpoint)
+    if buckets:
+        await aadmit(ENDPOINT, buckets[0][0], buckets, customer_id)
+
+
+def limited(fn):
+    """Hold a tool call to the customer's and the tool's limits. Apply beneath @idempotency.idempotent
+    (so replayed repeats cost nothing), or beneath @token_budget.budgeted on tools without it."""
+    name = fn.__name__
+    signature = inspect.signature(fn)
+    tool_limit = TOOL_LIMITS.get(name)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        customer_id = signature.bind_partial(*args, **kwargs).arguments.get("customer_id")
+        if not ENABLED or not customer_id:
+            return fn(*args, **kwargs)
+        queue = f"{CUSTOMER}:{customer_id}"
+        buckets = ((queue, CUSTOMER_LIMIT),)
+        if tool_limit:
+            buckets += ((f"tool:{name}:{customer_id}", tool_limit),)
+            # A call waiting on the tool's bucket must not hold up the customer's other tools
+            queue = f"{CUSTOMER}:{customer_id}:{name}"
+        try:
+            admit(CUSTOMER, queue, buckets, customer_id)
+        except RateLimitedError as e:
+            return f"Error – too many requests. Please wait {math.ceil(e.retry_after)} seconds and try again."
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _collect_metrics() -> list:
+    try:
+        depths = get_store().queue_depths()
+    except Exception:
+        return []
+    return metrics.gauge_lines("swiftbank_rate_limit_queue_depth", "Calls waiting for a rate limit, all workers.",
+                               {(scope,): depth for scope, depth in depths.items()}, ("scope",))
+
+
+metrics.register_collector(_collect_metrics)
@@ -0,0 +1,109 @@
+"""
+Per-customer read-through cache for BankMOCK GET responses
+
+Entries are keyed on (customer_id, endpoint path, params) and hold the parsed
+JSON body. The cache is bounded three ways:
+  - every entry expires after a short TTL
+  - least-recently-used entries are evicted past max_entries
+  - least-recently-used entries are evicted past max_bytes (approximate size
+    of the cached response bodies)
+
+Writes invalidate entries explicitly: bankmock_client fires its write hooks
+after every POST, and the hook drops the affected customer's cached reads.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+def make_key(customer_id: str, path: str, params: Optional[dict] = None) -> tuple:
+    return (customer_id, path, tuple(sorted((params or {}).items())))
+
+
+class TTLCache:
+    """Thread-safe TTL + LRU cache with an entry count and byte budget."""
+
+    def __init__(self, ttl: float = 15.0, max_entries: int = 4096, max_bytes: int = 8 * 1024 * 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key → (expires_at, size, value), oldest first
+        self._entries: OrderedDict = OrderedDict()
+        # customer_id → set of keys, so invalidation does not scan the whole cache
+        self._by_customer: dict = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> Any:
+        """Return the cached value for key, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: tuple, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), size, value)
+            self._by_customer.setdefault(key[0], set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, customer_id: str, paths: Optional[tuple] = None) -> int:
+        """Drop a customer's entries, optionally only those whose path starts with one of paths."""
+        with self._lock:
+            keys = self._by_customer.get(customer_id, ())
+            doomed = [k for k in keys if paths is None or k[1].startswith(paths)]
+            for key in doomed:
+                self._remove(key)
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_customer.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._by_customer.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_customer[key[0]]
@@ -0,0 +1,226 @@
+"""
+Response templates and cached formatters for tool replies
+
+Tool modules register one template per response type (and optionally per
+locale) at import time:
+
+    templates.register("account_details", "Account Details:\\n• Account Number: {accountNumber}\\n...")
+
+A template is compiled once per locale into literal text plus bound field
+formatters, so rendering is a single pass over pre-resolved parts instead of
+re-parsing a format string and re-chaining .get() defaults on every call.
+
+Field specs:
+  - {amount:money}   currency in the locale's symbol and digit grouping
+  - {createdAt:date} the YYYY-MM-DD part of an ISO timestamp
+  - {type:label}     CHEQUE_NOT_CREDITED → CHEQUE NOT CREDITED
+  - {x:...}          anything else is passed to format()
+Missing values render as N/A. A template line starting with "?" is only
+emitted when every field on it has a value (e.g. an optional cheque number).
+
+Output can also be compact JSON – {"response": <template name>, ...fields} –
+which carries the same data in far fewer tokens when the orchestrator only
+needs to read the result, not show it.
+
+Configuration (environment variables):
+  - SWIFTBANK_LOCALE         – en (default, ₹1,234,567.00) or en-IN (₹12,34,567.00)
+  - SWIFTBANK_OUTPUT_FORMAT  – text (default) or json; tools accepting output_format override it per call
+"""
+
+import functools
+import json
+import os
+import string
+from typing import Callable, NamedTuple, Optional
+
+DEFAULT_LOCALE = os.environ.get("SWIFTBANK_LOCALE", "en")
+OUTPUT_FORMAT = os.environ.get("SWIFTBANK_OUTPUT_FORMAT", "text").lower()
+MISSING = "N/A"
+
+
+class Locale(NamedTuple):
+    currency_symbol: str
+    # "western" → 1,234,567 ; "indian" → 12,34,567
+    grouping: str
+
+
+LOCALES = {
+    "en": Locale("₹", "western"),
+    "en-IN": Locale("₹", "indian"),
+}
+
+# (name, locale) → template text
+_sources: dict = {}
+
+
+def register(name: str, text: str, locale: str = "en") -> None:
+    """Register the template for a response type, for one locale ("en" is the fallback for all)."""
+    _sources[(name, locale)] = text
+    template.cache_clear()
+
+
+def _resolve_locale(locale: Optional[str]) -> str:
+    locale = locale or DEFAULT_LOCALE
+    if locale in LOCALES:
+        return locale
+    return locale.split("-")[0] if locale.split("-")[0] in LOCALES else "en"
+
+
+def wants_json(output_format: Optional[str] = None) -> bool:
+    return (output_format or OUTPUT_FORMAT).strip().lower() == "json"
+
+
+# ── formatters ───────────────────────────────────────────────────────────────
+def _group(digits: str, grouping: str) -> str:
+    if grouping == "indian" and len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        pairs = [head[max(0, i - 2):i] for i in range(len(head), 0, -2)]
+        return ",".join(reversed(pairs)) + "," + tail
+    return f"{int(digits):,}"
+
+
+@functools.lru_cache(maxsize=None)
+def money_formatter(locale: Optional[str] = None) -> Callable[[object], str]:
+    """Return the currency formatter for a locale (cached, so one closure per locale)."""
+    symbol, grouping = LOCALES[_resolve_locale(locale)]
+
+    def money(value) -> str:
+        try:
+            amount = float(value)
+        except (TypeError, ValueError):
+            return MISSING if value in (None, "") else str(value)
+        whole, cents = f"{abs(amount):.2f}".split(".")
+        return f"{'-' if amount < 0 else ''}{symbol}{_group(whole, grouping)}.{cents}"
+
+    return money
+
+
+@functools.lru_cache(maxsize=None)
+def number_formatter(locale: Optional[str] = None, decimals: int = 0) -> Callable[[object], str]:
+    """Return a grouped number formatter for a locale and number of decimals."""
+    grouping = LOCALES[_resolve_locale(locale)].grouping
+
+    def number(value) -> str:
+        try:
+            amount = float(value)
+        except (TypeError, ValueError):
+            return MISSING if value in (None, "") else str(value)
+        whole, _, frac = f"{abs(amount):.{decimals}f}".partition(".")
+        return f"{'-' if amount < 0 else ''}{_group(whole, grouping)}{'.' + frac if frac else ''}"
+
+    return number
+
+
+def _plain(value) -> str:
+    return MISSING if value is None else str(value)
+
+
+def _date(value) -> str:
+    return str(value or "")[:10]
+
+
+def _label(value) -> str:
+    return MISSING if value is None else str(value).replace("_", " ")
+
+
+def _field_formatter(spec: str, locale: str) -> Callable[[object], str]:
+    if not spec:
+        return _plain
+    if spec == "money":
+        return money_formatter(locale)
+    if spec == "number":
+        return number_formatter(locale)
+    if spec == "date":
+        return _date
+    if spec == "label":
+        return _label
+    return lambda value: MISSING if value is None else format(value, spec)
+
+
+# ── templates ────────────────────────────────────────────────────────────────
+def _compile_line(line: str, locale: str) -> tuple:
+    """Split one template line into a positional format string and its (field, formatter) pairs."""
+    pattern, fields = [], []
+    for literal, field, spec, _ in string.Formatter().parse(line):
+        pattern.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is not None:
+            pattern.append("{}")
+            fields.append((field, _field_formatter(spec, locale)))
+    return "".join(pattern), tuple(fields)
+
+
+def _field_slot(field: str, fmt: Callable[[object], str]) -> Callable:
+    return lambda get: fmt(get(field))
+
+
+def _optional_slot(line: str, locale: str, newline: str) -> Callable:
+    pattern, fields = _compile_line(line, locale)
+
+    def slot(get) -> str:
+        values = [get(field) for field, _ in fields]
+        if any(v in (None, "") for v in values):
+            return ""
+        return newline + pattern.format(*[fmt(v) for (_, fmt), v in zip(fields, values)])
+
+    return slot
+
+
+class Template:
+    """A template compiled for one locale into a single positional format string plus one slot per placeholder.
+
+    Optional lines become a single slot that renders to the line (with its
+    leading newline) or to nothing.
+    """
+
+    def __init__(self, name: str, text: str, locale: str):
+        self.name = name
+        self.locale = locale
+        pattern, slots = [], []
+        for i, line in enumerate(text.split("\n")):
+            if line.startswith("?"):
+                pattern.append("{}")
+                slots.append(_optional_slot(line[1:], locale, "\n" if i else ""))
+                continue
+            line_pattern, fields = _compile_line(line, locale)
+            pattern.append(("\n" if i else "") + line_pattern)
+            slots.extend(_field_slot(field, fmt) for field, fmt in fields)
+        self._pattern = "".join(pattern)
+        self._slots = tuple(slots)
+
+    def render(self, values: dict) -> str:
+        get = values.get
+        return self._pattern.format(*[slot(get) for slot in self._slots])
+
+
+@functools.lru_cache(maxsize=None)
+def template(name: str, locale: Optional[str] = None) -> Template:
+    """Compiled template for name in locale, falling back to the language and then to "en"."""
+    resolved = _resolve_locale(locale)
+    for candidate in (locale or DEFAULT_LOCALE, resolved, resolved.split("-")[0], "en"):
+        text = _sources.get((name, candidate))
+        if text is not None:
+            return Template(name, text, resolved)
+    raise KeyError(f"No response template registered for {name!r}")
+
+
+def compile_all(locale: Optional[str] = None) -> int:
+    """Compile every registered template for locale ahead of first use. Returns how many there are."""
+    names = {name for name, _ in list(_sources)}
+    for name in names:
+        template(name, locale)
+    return len(names)
+
+
+def to_json(kind: str, values: dict) -> str:
+    """Compact JSON for a response: {"response": kind, ...values} without empty fields."""
+    return json.dumps(
+        {"response": kind, **{k: v for k, v in values.items() if v is not None}},
+        separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+
+
+def render(name: str, values: dict, output_format: Optional[str] = None, locale: Optional[str] = None) -> str:
+    """Render a registered response as text, or as compact JSON when that output format is asked for."""
+    if wants_json(output_format):
+        return to_json(name, values)
+    return template(name, locale).render(values)
@@ -0,0 +1,78 @@
+"""
+Request coalescing ("single-flight") for duplicate concurrent BankMOCK reads
+
+When several callers ask for the same (customer_id, path, params) while a
+request for it is already in flight, only the first caller (the leader) goes
+upstream; everyone else waits for the leader's result or exception.
+
+Works for both threads (do) and asyncio tasks (ado). Async callers are
+grouped per event loop. The shared upstream call runs as its own task, so a
+cancelled waiter does not cancel it for the others.
+
+stats() reports calls, upstream executions and the dedup ratio
+(shared calls / total calls).
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict = {}
+        self._inflight_async: dict = {}
+        self.calls = 0
+        self.executions = 0
+
+    def do(self, key, fn: Callable[[], object]):
+        """Run fn() once for all threads that ask for key concurrently."""
+        with self._lock:
+            self.calls += 1
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = concurrent.futures.Future()
+                self._inflight[key] = fut
+                self.executions += 1
+        if not leader:
+            return fut.result()
+
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return fut.result()
+
+    async def ado(self, key, factory: Callable[[], Awaitable]):
+        """Await factory() once for all tasks on this event loop that ask for key concurrently."""
+        loop_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            self.calls += 1
+            task = self._inflight_async.get(loop_key)
+            if task is None:
+                task = asyncio.ensure_future(factory())
+                self._inflight_async[loop_key] = task
+                self.executions += 1
+                task.add_done_callback(lambda _: self._forget(loop_key))
+        return await asyncio.shield(task)
+
+    def _forget(self, loop_key) -> None:
+        with self._lock:
+            self._inflight_async.pop(loop_key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            shared = self.calls - self.executions
+            return {
+                "calls": self.calls,
+                "upstream_requests": self.executions,
+                "coalesced": shared,
+                "dedup_ratio": round(shared / self.calls, 4) if self.calls else 0.0,
+                "in_flight": len(self._inflight) + len(self._inflight_async),
+            }
@@ -0,0 +1,69 @@
+"""
+Local SQLite helpers shared by the tool-side stores
+
+Databases live under SWIFTBANK_DATA_DIR (default: <system temp dir>/swiftbank)
+and are opened in WAL mode so several tool-server worker processes can read
+and write the same file concurrently.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+def data_path(filename: str) -> str:
+    """Return the path of a data file under SWIFTBANK_DATA_DIR, creating the directory."""
+    base = os.environ.get("SWIFTBANK_DATA_DIR") or os.path.join(tempfile.gettempdir(), "swiftbank")
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, filename)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a SQLite connection tuned for many short transactions from several processes."""
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """BEGIN IMMEDIATE … COMMIT, rolled back on error. Takes the write lock up front."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class ThreadLocalConnection:
+    """One SQLite connection per thread, all pointing at the same database file.
+
+    init_schema runs once per process on the first connection.
+    """
+
+    def __init__(self, path: str, init_schema: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.path = path
+        self._init_schema = init_schema
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialised = False
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            if not self._initialised:
+                with self._lock:
+                    if not self._initialised and self._init_schema is not None:
+                        self._init_schema(conn)
+                    self._initialised = True
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,253 @@
+"""
+Per-tool token budgets for tool replies
+
+Every @tool() function is wrapped with @budgeted (beneath @metrics.instrumented).
+It estimates the tokens of the reply and, when it exceeds the tool's budget,
+trims it before it reaches the LLM:
+
+  1. overly long lines (e.g. descriptions echoed back verbatim) are clipped
+  2. list runs (numbered lines, "•" and "–" bullets) longer than
+     MIN_SHORTENED_RUN are shortened, longest run first, keeping the first
+     items and the last one and replacing the rest with "… N more not shown"
+  3. as a last resort the reply is cut at the budget
+
+Paged replies, those with a "cursor='…'" line, are never shortened in the
+middle: rows dropped there sit before the cursor and could not be reached by
+paging. The tool fits its page to the budget and moves the cursor back
+instead (see banking_info_tools._list_history). If a paged reply still has to
+be cut, the cursor lines are kept after the cut.
+
+JSON replies (output_format='json') are trimmed by shortening their longest
+arrays and clipping long strings, so they stay valid JSON.
+
+Tokens are estimated as UTF-8 bytes / 4, which is close enough for budgeting
+and costs nothing compared to a tokenizer. Raw reply sizes and the tokens
+saved are exported as metrics (see metrics.py) to help tune the budgets.
+
+Configuration (environment variables):
+  - TOOL_TOKEN_BUDGET   – default budget per reply in tokens (default 500; 0 disables trimming)
+  - TOOL_TOKEN_BUDGETS  – per-tool overrides, e.g. "get_transaction_history=1500,list_complaint_cases=400"
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+from typing import Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = int(os.environ.get("TOOL_TOKEN_BUDGET", 500))
+
+# Tools whose replies are long by design
+TOOL_BUDGETS = {
+    "get_transaction_history": 1500,
+    "summarize_transactions": 900,
+    "get_account_snapshot": 700,
+    "list_complaint_cases": 700,
+    "get_case_timeline": 900,
+}
+
+# Items always kept at the head of a shortened list run (the last item is kept too)
+MIN_LIST_ITEMS = 3
+# Shorter runs are field blocks (e.g. "• Status: OPEN"), not listings
+MIN_SHORTENED_RUN = 8
+# Approximate cost of the "… N more not shown" line that replaces dropped items
+_MARKER_TOKENS = 8
+MAX_LINE_CHARS = 240
+MAX_JSON_STRING_CHARS = 240
+
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200, 6400)
+
+_LIST_ITEM = re.compile(r"^\s*(?:\d+\.|•|–|-)\s")
+_CURSOR_LINE = re.compile(r"\bcursor='[^']*'")
+
+output_tokens = metrics.Histogram(
+    "swiftbank_tool_output_tokens", "Estimated tokens per tool reply before trimming.", ("tool",), TOKEN_BUCKETS,
+)
+tokens_saved = metrics.Counter("swiftbank_tool_tokens_saved_total", "Estimated tokens removed by trimming.", ("tool",))
+trimmed = metrics.Counter("swiftbank_tool_trimmed_total", "Replies trimmed to fit the token budget.", ("tool", "strategy"))
+for _metric in (output_tokens, tokens_saved, trimmed):
+    metrics.register(_metric)
+
+
+def _parse_budgets(spec: str) -> dict:
+    budgets = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip() and value.strip().isdigit():
+            budgets[name.strip()] = int(value)
+    return budgets
+
+
+TOOL_BUDGETS.update(_parse_budgets(os.environ.get("TOOL_TOKEN_BUDGETS", "")))
+
+
+def budget_for(tool_name: str) -> int:
+    return TOOL_BUDGETS.get(tool_name, DEFAULT_BUDGET)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: UTF-8 bytes / 4, rounded up."""
+    return -(-len(text.encode("utf-8")) // 4)
+
+
+# ── text ─────────────────────────────────────────────────────────────────────
+def _line_tokens(line: str) -> float:
+    """Share of estimate_tokens() a line accounts for, including its newline."""
+    return (len(line.encode("utf-8")) + 1) / 4
+
+
+def _list_runs(lines: list) -> list:
+    """(start, end) of every run of consecutive list-item lines."""
+    runs, start = [], None
+    for i, line in enumerate(lines + [""]):
+        if _LIST_ITEM.match(line):
+            start = i if start is None else start
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+    return runs
+
+
+def _shorten_lists(lines: list, excess: int) -> tuple:
+    """Drop list items (longest run first) until about `excess` tokens are saved."""
+    cuts = []
+    for start, end in sorted(_list_runs(lines), key=lambda r: r[1] - r[0], reverse=True):
+        if excess <= 0 or end - start <= MIN_SHORTENED_RUN:
+            break
+        # Keep the head of the run and its last item; drop from the end of the head
+        last = end - 1
+        drop_from = last
+        excess += _MARKER_TOKENS
+        while drop_from > start + MIN_LIST_ITEMS and excess > 0:
+            drop_from -= 1
+            excess -= _line_tokens(lines[drop_from])
+        if drop_from < last:
+            cuts.append((drop_from, last))
+    # Apply from the bottom so earlier indices stay valid
+    for drop_from, last in sorted(cuts, reverse=True):
+        line = lines[drop_from]
+        indent = line[: len(line) - len(line.lstrip())]
+        lines[drop_from:last] = [f"{indent}… {last - drop_from} more not shown"]
+    return lines, bool(cuts)
+
+
+def _trim_text(text: str, budget: int) -> tuple:
+    lines = text.split("\n")
+    strategies = []
+
+    clipped = [line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS - 1] + "…" for line in lines]
+    if clipped != lines:
+        strategies.append("line")
+        lines = clipped
+        text = "\n".join(lines)
+
+    cursors = [line for line in lines if _CURSOR_LINE.search(line)]
+    if estimate_tokens(text) > budget and not cursors:
+        lines, dropped = _shorten_lists(lines, estimate_tokens(text) - budget)
+        if dropped:
+            strategies.append("list")
+            text = "\n".join(lines)
+
+    if estimate_tokens(text) > budget:
+        strategies.append("cut")
+        body = [line for line in lines if line not in cursors]
+        kept, used = [], sum(_line_tokens(line) for line in cursors)
+        for line in body:
+            cost = _line_tokens(line)
+            if kept and used + cost > budget - _MARKER_TOKENS:
+                break
+            kept.append(line)
+            used += cost
+        text = "\n".join(kept + ["… (reply shortened)"] + cursors)
+    return text, strategies
+
+
+# ── JSON ─────────────────────────────────────────────────────────────────────
+def _longest_list(container) -> Optional[tuple]:
+    """(parent, key, list) of the longest array within two levels of the top."""
+    best = None
+    children = container.items() if isinstance(container, dict) else ()
+    for key, value in children:
+        candidates = [(container, key, value)]
+        if isinstance(value, dict):
+            candidates += [(value, k, v) for k, v in value.items()]
+        for parent, k, v in candidates:
+            if isinstance(v, list) and (best is None or len(v) > len(best[2])):
+                best = (parent, k, v)
+    return best
+
+
+def _dump(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _trim_json(text: str, budget: int) -> tuple:
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return _trim_text(text, budget)
+    strategies = []
+
+    while estimate_tokens(_dump(data)) > budget:
+        found = _longest_list(data)
+        if found is None or len(found[2]) <= MIN_LIST_ITEMS:
+            break
+        parent, key, items = found
+        keep = max(MIN_LIST_ITEMS, len(items) // 2)
+        parent[key] = items[:keep]
+        parent[f"{key}Omitted"] = parent.get(f"{key}Omitted", 0) + len(items) - keep
+        if "list" not in strategies:
+            strategies.append("list")
+
+    if estimate_tokens(_dump(data)) > budget:
+        def clip(value):
+            if isinstance(value, str) and len(value) > MAX_JSON_STRING_CHARS:
+                return value[:MAX_JSON_STRING_CHARS - 1] + "…"
+            if isinstance(value, dict):
+                return {k: clip(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [clip(v) for v in value]
+            return value
+        data = clip(data)
+        strategies.append("line")
+    return _dump(data), strategies
+
+
+def trim(text: str, budget: int) -> tuple:
+    """Fit text into budget tokens. Returns (text, strategies used); unchanged when it already fits."""
+    if budget <= 0 or estimate_tokens(text) <= budget:
+        return text, []
+    if text.startswith("{"):
+        return _trim_json(text, budget)
+    return _trim_text(text, budget)
+
+
+def budgeted(fn):
+    """Trim the tool's string reply to its token budget. Apply beneath @metrics.instrumented."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        if not isinstance(result, str):
+            return result
+        before = estimate_tokens(result)
+        output_tokens.observe(before, name)
+        budget = budget_for(name)
+        if budget <= 0 or before <= budget:
+            return result
+        result, strategies = trim(result, budget)
+        saved = before - estimate_tokens(result)
+        tokens_saved.inc(name, amount=saved)
+        for strategy in strategies:
+            trimmed.inc(name, strategy)
+        logger.info("Trimmed %s reply from %d to %d tokens (budget %d, %s)",
+                    name, before, before - saved, budget, "+".join(strategies) or "none")
+        return result
+
+    return wrapper
@@ -0,0 +1,160 @@
+"""
+Records tool traffic for offline replay
+
+When TRAFFIC_RECORD names a file, every tool call is appended to it as one
+JSON line, written when the call finishes:
+
+    {"ts": 1760000000.123, "tool": "get_account_balance", "module": "banking_info_tools",
+     "conversation": "…", "args": ["CUST001"], "kwargs": {}, "seconds": 0.041,
+     "reply": "Account balance for …",
+     "upstream": [{"customer": "CUST001", "method": "GET", "path": "/balance", "params": null,
+                   "json": null, "status": 200, "seconds": 0.038, "body": "{\"success\": true, …}"}]}
+
+upstream lists the BankMOCK exchanges the call made, in order, with the
+final response of each (after retries). Reads answered from the response
+cache made no exchange and are not listed. bench/replay.py serves these
+bodies back in place of BankMOCK and re-runs the calls against the tools.
+
+The file is append-only and shared by all workers: each line goes out in
+one O_APPEND write. Calls are sampled per call, so a recorded call always
+has all of its exchanges. Recordings hold customer data (arguments, replies,
+account bodies); keep them where production data may be kept.
+
+conversation is whatever the host bound with
+`with traffic_recorder.conversation(conversation_id):` around the turn, and
+null otherwise. Nothing in this tree binds it: watsonx Orchestrate does not
+hand the thread ID to the Python tools, so deployed recordings have no
+conversation and bench/replay.py groups their calls per customer. The ID
+travels in a context variable, so bankmock_client.run_sync carries it onto
+the event loop.
+
+The recorder is installed by warmup.start(), which every tool module calls
+once it is imported.
+
+Configuration (environment variables):
+  - TRAFFIC_RECORD         – file to append recorded calls to; unset (default) records nothing
+  - TRAFFIC_RECORD_SAMPLE  – share of tool calls recorded, 0–1 (default 1)
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import bankmock_client as bankmock
+import metrics
+
+logger = logging.getLogger(__name__)
+
+RECORD_PATH = os.environ.get("TRAFFIC_RECORD", "").strip()
+SAMPLE = float(os.environ.get("TRAFFIC_RECORD_SAMPLE", 1.0))
+
+# The exchanges of the tool call being recorded, or None outside one
+_exchanges: contextvars.ContextVar = contextvars.ContextVar("traffic_exchanges", default=None)
+current_conversation: contextvars.ContextVar = contextvars.ContextVar("current_conversation", default="")
+
+recorded_calls = metrics.Counter(
+    "swiftbank_traffic_recorded_total", "Tool calls appended to the traffic recording.", ("tool",),
+)
+metrics.register(recorded_calls)
+
+
+@contextmanager
+def conversation(conversation_id: str):
+    """Tag the tool calls recorded inside the block with a conversation ID."""
+    token = current_conversation.set(conversation_id)
+    try:
+        yield
+    finally:
+        current_conversation.reset(token)
+
+
+def _text(body) -> Optional[str]:
+    if body is None:
+        return None
+    return body.decode("utf-8", errors="replace") if isinstance(body, bytes) else str(body)
+
+
+class TrafficRecorder:
+    """Appends one JSON line per sampled tool call to path."""
+
+    def __init__(self, path: str, sample: float = SAMPLE):
+        self.path = path
+        self.sample = sample
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def on_call(self, name: str, fn, args: tuple, kwargs: dict):
+        """metrics call hook: start recording a call, return its finisher."""
+        if _exchanges.get() is not None or (self.sample < 1 and random.random() >= self.sample):
+            # A tool called from inside another tool is part of the outer call's record
+            return None
+        started = time.time()
+        exchanges: list = []
+        token = _exchanges.set(exchanges)
+
+        def finish(result, seconds: float) -> None:
+            _exchanges.reset(token)
+            self.write({
+                "ts": round(started, 6),
+                "tool": name,
+                "module": fn.__module__,
+                "conversation": current_conversation.get() or None,
+                "args": list(args),
+                "kwargs": kwargs,
+                "seconds": round(seconds, 6),
+                "reply": result,
+                "upstream": exchanges,
+            })
+            recorded_calls.inc(name)
+
+        return finish
+
+    def on_exchange(self, customer_id: str, method: str, path: str, params, json_body, status, body,
+                    seconds: float) -> None:
+        """bankmock_client exchange hook: add one upstream request/response to the current call."""
+        exchanges = _exchanges.get()
+        if exchanges is None:
+            return
+        exchanges.append({
+            "customer": customer_id,
+            "method": method,
+            "path": path,
+            "params": params,
+            "json": json_body,
+            "status": status,
+            "seconds": round(seconds, 6),
+            "body": _text(body),
+        })
+
+    def write(self, record: dict) -> None:
+        line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str) + "\n").encode()
+        try:
+            with self._lock:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+                os.write(self._fd, line)
+        except OSError:
+            logger.warning("Could not append to traffic recording %s", self.path, exc_info=True)
+
+
+_recorder: Optional[TrafficRecorder] = None
+_install_lock = threading.Lock()
+
+
+def install(path: Optional[str] = None, sample: float = SAMPLE) -> Optional[TrafficRecorder]:
+    """Start recording to path (default TRAFFIC_RECORD), once per process. Returns the recorder."""
+    global _recorder
+    path = path or RECORD_PATH
+    with _install_lock:
+        if _recorder is None and path:
+            _recorder = TrafficRecorder(path, sample)
+            metrics.register_call_hook(_recorder.on_call)
+            bankmock.register_exchange_hook(_recorder.on_exchange)
+            logger.info("Recording tool traffic to %s", path)
+    return _recorder
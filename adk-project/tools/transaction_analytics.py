@@ -0,0 +1,159 @@
+"""
+Vectorized transaction analytics for the banking information tools
+
+A date range of transactions is loaded once into a columnar TransactionFrame
+(NumPy arrays for amount, direction, day and group codes) and every statistic
+is computed in whole-array passes:
+  - totals and the credit/debit split
+  - per-group totals (description, category, day, week, month or type) via bincount
+  - daily debit totals and their trailing rolling average via a cumulative sum
+  - outlier debits, flagged with a median/MAD robust z-score
+
+Results are cached per (customer, from, to, group_by) in a TTLCache and
+dropped when bankmock_client reports a write for that customer.
+"""
+
+import datetime
+import os
+from typing import Optional
+
+import bankmock_client as bankmock
+import metrics
+from lazy_imports import lazy_module
+from response_cache import TTLCache, make_key
+from transaction_stream import TransactionStream
+
+# Only summaries need NumPy; defer it past startup (see lazy_imports.py)
+np = lazy_module("numpy")
+
+GROUP_BY_OPTIONS = ("description", "category", "day", "week", "month", "type")
+ROLLING_WINDOW_DAYS = 7
+# Robust z-score above which a debit is flagged as unusual
+OUTLIER_THRESHOLD = 3.5
+MIN_DEBITS_FOR_OUTLIERS = 5
+
+_cache = TTLCache(
+    ttl=float(os.environ.get("ANALYTICS_CACHE_TTL", 300)),
+    max_entries=int(os.environ.get("ANALYTICS_CACHE_MAX_ENTRIES", 1024)),
+    max_bytes=int(os.environ.get("ANALYTICS_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+)
+
+
+class TransactionFrame:
+    """Column arrays for one range of transactions."""
+
+    def __init__(self, txns: list):
+        n = len(txns)
+        self.size = n
+        self.amount = np.fromiter((float(t.get("amount") or 0) for t in txns), dtype=np.float64, count=n)
+        self.is_credit = np.fromiter((t.get("type") == "CREDIT" for t in txns), dtype=bool, count=n)
+        self.day = np.array([(t.get("timestamp") or "")[:10] or "1970-01-01" for t in txns], dtype="datetime64[D]")
+        self.description = np.array([t.get("description") or "Other" for t in txns], dtype=object)
+        self.category = np.array([t.get("category") or t.get("description") or "Other" for t in txns], dtype=object)
+        self.transaction_id = np.array([t.get("transactionId") or "" for t in txns], dtype=object)
+
+    @classmethod
+    def load(cls, customer_id: str, from_date: datetime.date, to_date: datetime.date) -> "TransactionFrame":
+        return cls(list(TransactionStream(customer_id, from_date, to_date)))
+
+    def group_keys(self, group_by: str) -> "np.ndarray":
+        if group_by == "description":
+            return self.description
+        if group_by == "category":
+            return self.category
+        if group_by == "day":
+            return self.day.astype(str)
+        if group_by == "week":
+            # Monday of the ISO week (1970-01-01 was a Thursday)
+            monday = self.day - ((self.day.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+            return monday.astype(str)
+        if group_by == "month":
+            return self.day.astype("datetime64[M]").astype(str)
+        if group_by == "type":
+            return np.where(self.is_credit, "CREDIT", "DEBIT")
+        raise ValueError(f"Unknown group_by '{group_by}'")
+
+
+def analyze(frame: TransactionFrame, from_date: datetime.date, to_date: datetime.date,
+            group_by: str = "description", top: int = 8) -> dict:
+    """Compute the summary for a frame. Every step is a whole-array operation."""
+    amount, credit = frame.amount, frame.is_credit
+    debit = ~credit
+    total_credit = float(amount[credit].sum())
+    total_debit = float(amount[debit].sum())
+
+    # Per-group debit and credit totals
+    keys, codes = np.unique(frame.group_keys(group_by).astype(str), return_inverse=True)
+    group_debit = np.bincount(codes, weights=np.where(debit, amount, 0.0), minlength=len(keys))
+    group_credit = np.bincount(codes, weights=np.where(credit, amount, 0.0), minlength=len(keys))
+    group_count = np.bincount(codes, minlength=len(keys))
+    order = np.argsort(-(group_debit + group_credit), kind="stable")[:top]
+    groups = [
+        {"key": str(keys[i]), "debit": float(group_debit[i]), "credit": float(group_credit[i]),
+         "count": int(group_count[i])}
+        for i in order
+    ]
+
+    # Daily debit totals over the whole range, then a trailing rolling mean via cumsum
+    start = np.datetime64(from_date.isoformat(), "D")
+    days = int((np.datetime64(to_date.isoformat(), "D") - start).astype(int)) + 1
+    offset = (frame.day - start).astype(np.int64)
+    in_range = (offset >= 0) & (offset < days)
+    daily_spend = np.bincount(offset[in_range & debit], weights=amount[in_range & debit], minlength=days)
+    window = min(ROLLING_WINDOW_DAYS, days)
+    csum = np.concatenate(([0.0], np.cumsum(daily_spend)))
+    rolling = (csum[window:] - csum[:-window]) / window
+
+    # Outlier debits: robust z-score using median absolute deviation
+    outliers = []
+    debit_amounts = amount[debit]
+    if debit_amounts.size >= MIN_DEBITS_FOR_OUTLIERS:
+        median = np.median(debit_amounts)
+        mad = np.median(np.abs(debit_amounts - median))
+        if mad > 0:
+            score = 0.6745 * (amount - median) / mad
+            flagged = np.flatnonzero(debit & (score > OUTLIER_THRESHOLD))
+            flagged = flagged[np.argsort(-amount[flagged], kind="stable")][:5]
+            outliers = [
+                {"amount": float(amount[i]), "description": str(frame.description[i]),
+                 "date": str(frame.day[i]), "transactionId": str(frame.transaction_id[i])}
+                for i in flagged
+            ]
+
+    return {
+        "count": frame.size,
+        "credits": int(credit.sum()),
+        "debits": int(debit.sum()),
+        "total_credit": total_credit,
+        "total_debit": total_debit,
+        "net": total_credit - total_debit,
+        "average_daily_spend": float(daily_spend.mean()) if days else 0.0,
+        "rolling_average_spend": float(rolling[-1]) if rolling.size else 0.0,
+        "peak_rolling_average_spend": float(rolling.max()) if rolling.size else 0.0,
+        "groups": groups,
+        "outliers": outliers,
+    }
+
+
+def summarize(customer_id: str, from_date: datetime.date, to_date: datetime.date,
+              group_by: str = "description") -> dict:
+    """Return the cached analysis for (customer, range, group_by), loading the frame on a miss."""
+    key = make_key(customer_id, "analytics", {"from": from_date.isoformat(), "to": to_date.isoformat(),
+                                              "group_by": group_by})
+    result = _cache.get(key)
+    if result is None:
+        frame = TransactionFrame.load(customer_id, from_date, to_date)
+        result = analyze(frame, from_date, to_date, group_by)
+        _cache.set(key, result, len(repr(result)))
+    return result
+
+
+def invalidate(customer_id: str, path: Optional[str] = None) -> None:
+    """Write hook: drop a customer's cached analyses when a write can change their transactions."""
+    stale = bankmock.WRITE_INVALIDATES.get(bankmock.endpoint_of(path)) if path else None
+    if stale is None or "/transactions" in stale:
+        _cache.invalidate(customer_id)
+
+
+bankmock.register_write_hook(invalidate)
+metrics.register_cache("analytics", _cache.stats)
@@ -0,0 +1,147 @@
+"""
+Lazy, paginated transaction history over BankMOCK
+
+iter_transactions() walks a customer's history newest first and yields one
+transaction dict at a time:
+  - without a date range it pages through /transactions?limit=&page=
+  - with a date range it walks /statement?startDate=&endDate= in windows of
+    STATEMENT_WINDOW_DAYS, from the end of the range backwards
+
+While the caller consumes one page, the next page is already being fetched on
+the BankMOCK client's event loop, so at most two pages are held in memory no
+matter how long the history is.
+
+Positions in the stream are expressed as opaque cursors ("<page key>:<offset>")
+that TransactionStream exposes, so a tool can return one slice per call and
+resume from the cursor on the next call.
+"""
+
+import datetime
+from typing import Iterator, Optional
+
+import bankmock_client as bankmock
+
+DEFAULT_PAGE_SIZE = 50
+STATEMENT_WINDOW_DAYS = 7
+DEFAULT_RANGE_DAYS = 30
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime.date]:
+    """Parse YYYY-MM-DD (or an ISO timestamp); raises ValueError on anything else."""
+    if not value:
+        return None
+    return datetime.date.fromisoformat(value.strip()[:10])
+
+
+def _extract_transactions(data) -> list:
+    raw = data.get("data", data) if isinstance(data, dict) else data
+    txns = raw.get("transactions", raw) if isinstance(raw, dict) else raw
+    return txns if isinstance(txns, list) else []
+
+
+class TransactionStream:
+    """Iterable over a customer's transactions with lazy, prefetched pages.
+
+    Iterating yields transaction dicts. After each item, `cursor` holds the
+    position of the next one (None once the stream is exhausted).
+    """
+
+    def __init__(self, customer_id: str, from_date: Optional[datetime.date] = None,
+                 to_date: Optional[datetime.date] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 cursor: Optional[str] = None, prefetch: bool = True):
+        self.customer_id = customer_id
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.by_statement = from_date is not None or to_date is not None
+        if self.by_statement:
+            self.to_date = to_date or datetime.date.today()
+            self.from_date = from_date or self.to_date - datetime.timedelta(days=DEFAULT_RANGE_DAYS)
+            if self.from_date > self.to_date:
+                raise ValueError("from_date is after to_date")
+        else:
+            self.from_date = self.to_date = None
+
+        self._start_key, self._start_offset = self._parse_cursor(cursor)
+        self.cursor: Optional[str] = cursor
+
+    # ── cursors ──────────────────────────────────────────────────────────────
+    def _first_key(self):
+        return self.to_date.isoformat() if self.by_statement else 1
+
+    def _parse_cursor(self, cursor: Optional[str]):
+        if not cursor:
+            return self._first_key(), 0
+        key, _, offset = cursor.rpartition(":")
+        try:
+            if self.by_statement:
+                parse_date(key)
+                return key, int(offset)
+            return int(key), int(offset)
+        except ValueError:
+            raise ValueError(f"Invalid cursor '{cursor}'")
+
+    # ── page fetching ────────────────────────────────────────────────────────
+    async def _fetch(self, key):
+        """Fetch one page. Returns (transactions, next page key or None)."""
+        if not self.by_statement:
+            data = await bankmock.aget_json(
+                self.customer_id, "/transactions", params={"limit": self.page_size, "page": key},
+            )
+            txns = _extract_transactions(data)
+            raw = data.get("data", data)
+            pagination = raw.get("pagination") if isinstance(raw, dict) else None
+            has_more = pagination.get("hasMore") if pagination else len(txns) == self.page_size
+            return txns, (key + 1 if has_more and txns else None)
+
+        end = parse_date(key)
+        start = max(self.from_date, end - datetime.timedelta(days=STATEMENT_WINDOW_DAYS - 1))
+        data = await bankmock.aget_json(
+            self.customer_id, "/statement", params={"startDate": start.isoformat(), "endDate": end.isoformat()},
+        )
+        lo, hi = start.isoformat(), end.isoformat()
+        txns = [t for t in _extract_transactions(data) if lo <= (t.get("timestamp") or "")[:10] <= hi]
+        txns.sort(key=lambda t: t.get("timestamp") or "", reverse=True)
+        next_key = (start - datetime.timedelta(days=1)).isoformat() if start > self.from_date else None
+        return txns, next_key
+
+    def pages(self) -> Iterator[tuple]:
+        """Yield (page key, transactions, next page key) while the next page is fetched in the background."""
+        key = self._start_key
+        pending = bankmock.submit(self._fetch(key))
+        previous_first = None
+        try:
+            while pending is not None:
+                txns, next_key = pending.result()
+                # Guard against an upstream that ignores ?page= and keeps returning page 1
+                first = txns[0].get("transactionId") if txns else None
+                if first is not None and first == previous_first:
+                    return
+                previous_first = first
+                pending = bankmock.submit(self._fetch(next_key)) if next_key is not None and self.prefetch else None
+                yield key, txns, next_key
+                if next_key is None:
+                    return
+                if pending is None:
+                    pending = bankmock.submit(self._fetch(next_key))
+                key = next_key
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def __iter__(self) -> Iterator[dict]:
+        offset = self._start_offset
+        for key, txns, next_key in self.pages():
+            for i in range(offset, len(txns)):
+                self.cursor = f"{key}:{i + 1}" if i + 1 < len(txns) else (
+                    f"{next_key}:0" if next_key is not None else None
+                )
+                yield txns[i]
+            offset = 0
+            if next_key is None:
+                self.cursor = None
+
+
+def iter_transactions(customer_id: str, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                      page_size: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Iterator[dict]:
+    """Yield a customer's transactions newest first, optionally limited to a YYYY-MM-DD date range."""
+    return iter(TransactionStream(customer_id, parse_date(from_date), parse_date(to_date), page_size, cursor))
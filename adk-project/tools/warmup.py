@@ -0,0 +1,125 @@
+"""
+Warm start for the tool server
+
+Without warm-up, the first customer message after a cold start pays for
+everything the tools set up lazily: importing aiohttp, requests and numpy
+(with SWIFTBANK_LAZY_IMPORTS=true), starting the client event loop, TCP+TLS
+handshakes with BankMOCK, opening the SQLite stores, catching up the case
+event index and starting the cheque watcher. warm_up() does all of it up front. Each step is timed and exported
+as swiftbank_warmup_seconds{step}; a step that fails is logged and skipped,
+since a cold instance is still better than one that does not start.
+
+Each tool module calls start() once it has been imported. start() runs the
+warm-up the first time (when enabled) and then marks the instance ready, so
+GET /ready on the metrics port (see metrics.py) answers 503 until the
+instance is warm and 200 after. The first start() also installs the traffic
+recorder when TRAFFIC_RECORD is set (see traffic_recorder.py).
+
+Configuration (environment variables):
+  - SWIFTBANK_WARMUP              – "true" to warm up while the first tool module is imported,
+                                    "background" to warm up in a thread, off by default
+  - SWIFTBANK_WARMUP_CONNECTIONS  – BankMOCK connections to pre-open (default 4)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import bankmock_client as bankmock
+import lazy_imports
+import metrics
+import response_templates as templates
+import traffic_recorder
+
+logger = logging.getLogger(__name__)
+
+MODE = os.environ.get("SWIFTBANK_WARMUP", "").strip().lower()
+CONNECTIONS = int(os.environ.get("SWIFTBANK_WARMUP_CONNECTIONS", 4))
+
+# step → seconds taken by the last warm-up
+_timings: dict = {}
+_started = False
+_start_lock = threading.Lock()
+
+
+def _open_stores() -> None:
+    import cheque_watcher
+    import idempotency
+    import otp_store
+    import rate_limiter
+    from agent_assignment import get_engine
+    from case_events import get_event_log
+    from case_repository import get_repository
+
+    otp_store.get_store()
+    idempotency.get_store().sweep()
+    rate_limiter.get_store().sweep()
+    get_repository()
+    # Indexes whatever was appended to the event log since the index's high-water mark
+    get_event_log()
+    # Seeds agent loads from the case store
+    get_engine()
+    # Resumes polling the cheques watched before a restart
+    cheque_watcher.ensure_started()
+
+
+STEPS = (
+    ("imports", lazy_imports.load_all),
+    ("connections", lambda: bankmock.warm_up(CONNECTIONS)),
+    ("stores", _open_stores),
+    ("templates", templates.compile_all),
+)
+
+
+def warm_up(steps: tuple = STEPS) -> dict:
+    """Run the warm-up steps in order. Returns {step: seconds}; failed steps are left out."""
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+            continue
+        _timings[name] = time.perf_counter() - start
+    logger.info("Warm-up finished: %s", ", ".join(f"{k} {v:.3f}s" for k, v in _timings.items()))
+    return dict(_timings)
+
+
+def _warm_up_then_ready() -> None:
+    try:
+        warm_up()
+    finally:
+        metrics.mark_ready()
+
+
+def start(mode: Optional[str] = None) -> None:
+    """Warm up once per process as SWIFTBANK_WARMUP asks, then mark the instance ready."""
+    global _started
+    mode = MODE if mode is None else mode
+    background = mode == "background"
+    enabled = background or mode in ("1", "true", "yes", "sync")
+    with _start_lock:
+        first = not _started
+        _started = True
+    if not first:
+        if enabled:
+            # Tool modules imported after the warm-up register more templates
+            templates.compile_all()
+        return
+    traffic_recorder.install()
+    if background:
+        threading.Thread(target=_warm_up_then_ready, name="warmup", daemon=True).start()
+    elif enabled:
+        _warm_up_then_ready()
+    else:
+        metrics.mark_ready()
+
+
+def _collect_metrics() -> list:
+    return metrics.gauge_lines("swiftbank_warmup_seconds", "Seconds spent in each warm-up step.",
+                               {(name,): seconds for name, seconds in _timings.items()}, ("step",))
+
+
+metrics.register_collector(_collect_metrics)